@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Load-test the read endpoints under three server setups, all served by
+uvicorn so only the Django side changes:
+
+- wsgi:       socialnetworkapi.wsgi through uvicorn's WSGI interface
+- asgi-sync:  socialnetworkapi.asgi with the DRF views (run in a thread
+              by Django's sync adapter)
+- asgi-async: socialnetworkapi.asgi with ASYNC_VIEWS=* (posts/async_views.py
+              and users/async_views.py)
+
+Every mode gets the same mix of GET /api/posts/, /api/posts/<id>/,
+/api/users/ and /api/users/<id>/ from ``--concurrency`` keep-alive
+clients for ``--duration`` seconds. Requests/sec and latency percentiles
+are printed and written to a JSON report. Requires uvicorn. The ASGI modes
+default to DATABASE_CONN_MAX_AGE=0 (see socialnetworkapi.asgi); run with
+DATABASE_POOL=psycopg to compare them with connection reuse.
+
+    python -m benchmarks.asgi_load --seed --concurrency 64 --duration 15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+django.setup()
+
+from benchmarks.report import environment
+from posts.models import Post
+from users.models import User
+
+MODES = {
+    'wsgi': (['socialnetworkapi.wsgi:application', '--interface', 'wsgi'], ''),
+    'asgi-sync': (['socialnetworkapi.asgi:application'], ''),
+    'asgi-async': (['socialnetworkapi.asgi:application'], '*'),
+}
+
+
+def request_paths():
+    post_ids = list(Post.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:50])
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True)[:50])
+    paths = ['/api/posts/', '/api/users/']
+    paths += [f'/api/posts/{pk}/' for pk in post_ids[:10]]
+    paths += [f'/api/users/{pk}/' for pk in user_ids[:10]]
+    return paths
+
+
+def start_server(mode, port, workers):
+    app_args, async_views = MODES[mode]
+    # The load comes from one address, so the rate limits would reject most writes.
+    env = dict(os.environ, ASYNC_VIEWS=async_views, DEBUG='False')
+    env.setdefault('THROTTLING_ENABLED', 'False')
+    command = [
+        sys.executable, '-m', 'uvicorn', *app_args,
+        '--port', str(port), '--workers', str(workers), '--no-access-log', '--log-level', 'warning',
+    ]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f'uvicorn exited with status {server.returncode}')
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'uvicorn did not start listening on port {port}')
+
+
+def client(port, paths, offset, stop_at, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    index = offset
+    while time.monotonic() < stop_at:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status != 200:
+            errors.append(path)
+    connection.close()
+
+
+def run_load(port, paths, concurrency, duration):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(port, paths, n, stop_at, latencies, errors))
+        for n in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 3)
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='Generate benchmark data first.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10_000)
+    parser.add_argument('--comments', type=int, default=50_000)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--concurrency', type=int, default=64, help='Concurrent keep-alive clients.')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds of load per mode.')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of unmeasured load per mode.')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', default='asgi_load_report.json', help='Where to write the JSON report.')
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from benchmarks.datagen import generate
+        generate(users=args.users, posts=args.posts, comments=args.comments)
+
+    if not Post.objects.exists():
+        print("❌ No posts in the database; run with --seed first.")
+        return 1
+
+    paths = request_paths()
+    report = {
+        'environment': environment(),
+        'concurrency': args.concurrency, 'duration': args.duration, 'workers': args.workers, 'modes': {},
+    }
+    for mode in args.modes:
+        server = start_server(mode, args.port, args.workers)
+        try:
+            run_load(args.port, paths, args.concurrency, args.warmup)
+            result = run_load(args.port, paths, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        report['modes'][mode] = result
+        print(f"  {mode:<11} {result['requests_per_sec']:>9.1f} req/s  "
+              f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}")
+
+    with open(args.output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✅ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
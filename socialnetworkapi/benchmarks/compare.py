@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Compare two benchmark reports, e.g. from the commit before and after a
+change:
+
+    git checkout main && python -m benchmarks.views --output before.json
+    git checkout my-branch && python -m benchmarks.views --output after.json
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Works with the reports of benchmarks.views, benchmarks.load,
+benchmarks.asgi_load and benchmarks.passwords. Latency percentiles (``p*_ms``) and errors are better
+lower, throughput (``*_per_sec``) higher. A metric that got worse by more
+than ``--threshold`` percent, or any increase in a query count, is flagged
+and the exit status is 1.
+"""
+
+import argparse
+import json
+import sys
+
+SKIP = {'environment', 'scenario', 'data'}
+
+
+def flatten(report, prefix=''):
+    """``{'cases.post_list.p50_ms': 4.2, ...}`` for every numeric leaf."""
+    metrics = {}
+    for key, value in report.items():
+        if not prefix and key in SKIP:
+            continue
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def direction(metric):
+    """+1 if higher is better, -1 if lower is better, None to ignore."""
+    leaf = metric.rsplit('.', 1)[-1]
+    if leaf.endswith('_per_sec'):
+        return 1
+    if (leaf.startswith('p') and leaf.endswith('_ms')) or leaf in ('queries', 'errors'):
+        return -1
+    return None
+
+
+def compare(before, after, threshold):
+    rows, regressions = [], 0
+    old, new = flatten(before), flatten(after)
+    for metric in sorted(set(old) & set(new)):
+        sign = direction(metric)
+        if sign is None:
+            continue
+        if old[metric]:
+            change = (new[metric] - old[metric]) / old[metric] * 100
+        else:
+            change = 0.0 if not new[metric] else float('inf')
+        if metric.endswith('.queries'):
+            worse = new[metric] > old[metric]
+        else:
+            worse = -sign * change > threshold
+        regressions += worse
+        rows.append((metric, old[metric], new[metric], change, worse))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='Allowed regression in percent (default: 10).')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as fh:
+        before = json.load(fh)
+    with open(args.after) as fh:
+        after = json.load(fh)
+
+    commits = (before.get('environment', {}).get('commit'), after.get('environment', {}).get('commit'))
+    print(f"Comparing {commits[0] or args.before} -> {commits[1] or args.after}")
+    rows, regressions = compare(before, after, args.threshold)
+    for metric, old, new, change, worse in rows:
+        mark = '❌' if worse else '  '
+        print(f"{mark} {metric:<48} {old:>12} -> {new:<12} {change:+7.1f}%")
+
+    if regressions:
+        print(f"❌ {regressions} metric(s) regressed by more than {args.threshold}%")
+        return 1
+    print(f"✅ No regressions above {args.threshold}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Synthetic data generator for benchmarks.
+
+Creates users, posts with tags and comments with bulk inserts, spreading
+timestamps over a time window so ordering and range queries see realistic
+data, and optionally django.contrib.auth accounts for the JWT endpoints.
+On an empty database the same arguments and seed produce the same rows.
+Requires Django to be set up before import.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Comment, Post, Tag
+from users.models import User
+
+# Password of the accounts created with auth_users; they are named bench0, bench1, ...
+AUTH_PASSWORD = 'benchmark-password'
+AUTH_USERNAME = 'bench{}'
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we assign."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(users=1000, posts=100_000, comments=1_000_000, tags=500, tags_per_post=3,
+             days=365, batch_size=10_000, seed=0, auth_users=0, log=print):
+    """
+    Insert the requested number of rows and return them as a dict of counts.
+    Post counters are reconciled at the end.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    epoch = now - timedelta(days=days)
+
+    def random_time(start):
+        return start + (now - start) * rng.random()
+
+    def post_rows():
+        for i in range(posts):
+            created = random_time(epoch)
+            yield Post(title=f'Post {i}', description=f'Benchmark post number {i}',
+                       author_id=rng.choice(user_ids), created_at=created, updated_at=created)
+
+    def comment_rows():
+        for i in range(comments):
+            post_id, post_created = rng.choice(post_times)
+            created = random_time(post_created)
+            yield Comment(postId_id=post_id, author_id=rng.choice(user_ids),
+                          content=f'Benchmark comment {i}', likes=rng.randint(0, 50),
+                          created_at=created, updated_at=created)
+
+    with explicit_timestamps(User, Post, Comment):
+        log(f'Creating {tags} tags and {users} users...')
+        Tag.objects.bulk_create(
+            [Tag(name=f'tag{i}') for i in range(tags)], batch_size=batch_size, ignore_conflicts=True,
+        )
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        User.objects.bulk_create(
+            [User(name=f'user{i}', password_hash=make_password(None), age=rng.randint(16, 80),
+                  created_at=epoch, updated_at=epoch) for i in range(users)],
+            batch_size=batch_size,
+        )
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        log(f'Creating {posts} posts...')
+        through = Post.tags.through
+        for batch in _batches(post_rows(), batch_size):
+            with transaction.atomic():
+                Post.objects.bulk_create(batch)
+                links = {
+                    (post.pk, tag_id)
+                    for post in batch
+                    for tag_id in rng.sample(tag_ids, min(tags_per_post, len(tag_ids)))
+                }
+                through.objects.bulk_create(
+                    [through(post_id=post_id, tag_id=tag_id) for post_id, tag_id in links],
+                    ignore_conflicts=True,
+                )
+
+        log(f'Creating {comments} comments...')
+        post_times = list(Post.objects.values_list('pk', 'created_at'))
+        for batch in _batches(comment_rows(), batch_size):
+            Comment.objects.bulk_create(batch)
+
+    if auth_users:
+        log(f'Creating {auth_users} auth accounts...')
+        # Hashing is deliberately slow; every account shares one hash.
+        password = make_password(AUTH_PASSWORD)
+        AuthUser.objects.bulk_create(
+            [AuthUser(username=AUTH_USERNAME.format(i), password=password) for i in range(auth_users)],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+
+    log('Reconciling post counters...')
+    call_command('reconcile_post_counters', batch_size=batch_size)
+    return {'users': users, 'posts': posts, 'comments': comments, 'tags': tags, 'auth_users': auth_users}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Measure what connection reuse saves per request.
+
+Each mode runs in its own process with the matching environment:
+
+- none:       DATABASE_CONN_MAX_AGE=0, a new connection (TCP + auth) per request
+- persistent: DATABASE_CONN_MAX_AGE=60, one connection per thread, reused
+- psycopg:    DATABASE_POOL=psycopg, connections borrowed from a pool
+
+and simulates ``--requests`` request cycles per thread (request_started,
+a short query, request_finished, which is when Django closes or returns
+connections). Latency percentiles and the number of connections opened
+are printed and written to a JSON report. Needs PostgreSQL.
+
+    python -m benchmarks.db_connections --requests 2000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+django.setup()
+
+from django.core import signals
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from socialnetworkapi.dbpool import pool_stats
+
+MODES = {
+    'none': {'DATABASE_POOL': '', 'DATABASE_CONN_MAX_AGE': '0'},
+    'persistent': {'DATABASE_POOL': '', 'DATABASE_CONN_MAX_AGE': '60'},
+    'psycopg': {'DATABASE_POOL': 'psycopg'},
+}
+
+
+def request_cycle():
+    signals.request_started.send(sender=None)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        signals.request_finished.send(sender=None)
+
+
+def run_child(requests, threads):
+    """Run in the per-mode process; returns the measurements as a dict."""
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False)
+    timings = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_cycle()
+            local.append((time.perf_counter() - start) * 1000)
+        connection.close()
+        with lock:
+            timings.extend(local)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    stats = pool_stats()
+    return {
+        'requests': len(timings),
+        'requests_per_sec': round(len(timings) / elapsed, 1),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        # With a pool Django signals every borrow, so count real connects from the pool stats.
+        'connections_opened': stats.get('connections_num', len(opened)),
+        'pool': stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--requests', type=int, default=2000, help='Request cycles per thread.')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads.')
+    parser.add_argument('--output', default='db_connections_report.json', help='Where to write the JSON report.')
+    parser.add_argument('--child', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run_child(args.requests, args.threads), sys.stdout)
+        return 0
+
+    if connection.vendor != 'postgresql':
+        print(f"❌ This benchmark needs PostgreSQL, not {connection.vendor}.")
+        return 1
+
+    report = {'requests_per_thread': args.requests, 'threads': args.threads, 'modes': {}}
+    for mode in args.modes:
+        env = dict(os.environ, **MODES[mode])
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_connections', '--child', mode,
+             '--requests', str(args.requests), '--threads', str(args.threads)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output)
+        report['modes'][mode] = result
+        print(f"  {mode:<10} {result['requests_per_sec']:>9.1f} req/s  p50 {result['p50_ms']} ms  "
+              f"p99 {result['p99_ms']} ms  connections opened {result['connections_opened']}")
+
+    with open(args.output, 'w') as fh:
+        json.dump(report, fh, indent=2, default=str)
+    print(f"✅ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
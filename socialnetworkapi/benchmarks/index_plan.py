@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+Benchmark the posts/comments access patterns with and without the
+composite indexes from posts/migrations/0007_access_pattern_indexes.py
+and 0009_comment_top_index.py.
+
+For every query shape the script records the EXPLAIN plan and latency
+percentiles twice: once with the indexes dropped ("before") and once with
+them recreated ("after"), and writes both to a JSON report.
+
+Run it against a disposable database; --seed inserts a lot of rows:
+
+    python -m benchmarks.index_plan --seed --posts 100000 --comments 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+
+from posts.models import Comment, Post, Tag
+
+INDEX_NAMES = {
+    'post_created_id_idx', 'post_author_created_idx', 'comment_post_created_idx', 'comment_post_top_idx',
+}
+THROUGH_INDEX = 'posts_post_tags_tag_post_idx'
+
+
+def benchmark_indexes():
+    """(model, index) pairs for the Meta.indexes added by the index plan."""
+    return [
+        (model, index)
+        for model in (Post, Comment)
+        for index in model._meta.indexes
+        if index.name in INDEX_NAMES
+    ]
+
+
+def drop_indexes():
+    with connection.schema_editor() as editor:
+        for model, index in benchmark_indexes():
+            editor.remove_index(model, index)
+        editor.execute(f'DROP INDEX {THROUGH_INDEX}')
+
+
+def create_indexes():
+    with connection.schema_editor() as editor:
+        for model, index in benchmark_indexes():
+            editor.add_index(model, index)
+        editor.execute(f'CREATE INDEX {THROUGH_INDEX} ON posts_post_tags (tag_id, post_id)')
+
+
+def refresh_statistics():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def query_shapes():
+    """Querysets mirroring what the API views run, with representative arguments."""
+    busiest_post = Post.objects.order_by('-comment_count').values_list('pk', flat=True).first()
+    author_id = Post.objects.values_list('author_id', flat=True).first()
+    tag_name = Tag.objects.values_list('name', flat=True).first()
+    total = Post.objects.count()
+    middle = Post.objects.order_by('-created_at', '-id').values('created_at', 'id')[total // 2]
+
+    return {
+        'post_list_first_page': lambda: Post.objects.order_by('-created_at', '-id')[:20],
+        'post_list_deep_page': lambda: Post.objects.filter(
+            Q(created_at__lt=middle['created_at'])
+            | Q(created_at=middle['created_at'], id__lt=middle['id'])
+        ).order_by('-created_at', '-id')[:20],
+        'comment_list_oldest': lambda: Comment.objects.filter(postId=busiest_post).order_by('created_at', 'id')[:20],
+        'comment_list_newest': lambda: Comment.objects.filter(postId=busiest_post).order_by('-created_at', '-id')[:20],
+        'comment_list_top': lambda: Comment.objects.filter(postId=busiest_post).with_like_rank()
+        .order_by(*Comment.TOP_ORDERING)[:20],
+        'posts_by_author': lambda: Post.objects.filter(author_id=author_id).order_by('-created_at')[:20],
+        'posts_by_tag': lambda: Post.objects.filter(tags__name=tag_name).order_by('-created_at', '-id')[:20],
+    }
+
+
+def measure(shapes, repeat):
+    results = {}
+    for name, build in shapes.items():
+        if connection.vendor == 'postgresql':
+            plan = build().explain(analyze=True, buffers=True)
+        else:
+            plan = build().explain()
+
+        list(build())  # warm up caches
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {
+            'plan': plan,
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(timings[len(timings) // 2], 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        }
+        print(f"  {name:<22} p50 {results[name]['p50_ms']:>9.3f} ms  p95 {results[name]['p95_ms']:>9.3f} ms")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='Generate benchmark data first.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=100_000)
+    parser.add_argument('--comments', type=int, default=1_000_000)
+    parser.add_argument('--tags', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50, help='Timed executions per query.')
+    parser.add_argument('--output', default='index_plan_report.json', help='Where to write the JSON report.')
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from benchmarks.datagen import generate
+        generate(users=args.users, posts=args.posts, comments=args.comments, tags=args.tags)
+
+    if not Post.objects.exists():
+        print("❌ No posts in the database; run with --seed first.")
+        return 1
+
+    shapes = query_shapes()
+    report = {
+        'database': connection.vendor,
+        'rows': {'posts': Post.objects.count(), 'comments': Comment.objects.count()},
+    }
+
+    print("Without composite indexes:")
+    drop_indexes()
+    try:
+        refresh_statistics()
+        report['before'] = measure(shapes, args.repeat)
+    finally:
+        create_indexes()
+
+    print("With composite indexes:")
+    refresh_statistics()
+    report['after'] = measure(shapes, args.repeat)
+
+    with open(args.output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✅ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
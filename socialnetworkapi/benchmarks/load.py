@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""
+Scripted HTTP load scenario against a running server.
+
+Each of ``--concurrency`` virtual users repeatedly picks an action, with
+fixed weights and a per-user seeded RNG so runs are reproducible:
+
+- browse:  GET /api/posts/, then follow ``next`` for up to two more pages
+- read:    GET /api/posts/<id>/ and its comments
+- profile: GET /api/users/<id>/
+- comment: POST /api/posts/<id>/comments/ (skipped with --read-only)
+- login:   POST /api/token/ and /api/token/refresh/ (needs the accounts
+           created by datagen's auth_users)
+
+Every request is timed under its step name. Throughput and latency
+percentiles per step and overall are printed and written to a JSON report,
+which ``python -m benchmarks.compare`` can diff against an earlier run.
+All virtual users share one address, so start the server with
+THROTTLING_ENABLED=False (``--serve`` does) or 429s count as errors.
+
+    THROTTLING_ENABLED=False python manage.py runserver --noreload &   # or any WSGI/ASGI server
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --duration 30
+    python -m benchmarks.load --serve asgi-async --concurrency 32   # starts uvicorn
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+django.setup()
+
+from benchmarks.datagen import AUTH_PASSWORD, AUTH_USERNAME
+from benchmarks.report import environment, percentiles, write_report
+from posts.models import Post
+from users.models import User
+
+WEIGHTS = {'browse': 40, 'read': 35, 'profile': 15, 'comment': 8, 'login': 2}
+
+
+class VirtualUser:
+    def __init__(self, host, port, seed, post_ids, user_ids, auth_users, read_only):
+        self.host, self.port = host, port
+        self.rng = random.Random(seed)
+        self.post_ids, self.user_ids = post_ids, user_ids
+        self.auth_users = auth_users
+        actions = {name: weight for name, weight in WEIGHTS.items()
+                   if not (read_only and name == 'comment') and not (name == 'login' and not auth_users)}
+        self.actions, self.weights = list(actions), list(actions.values())
+        self.connection = self.connect()
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, step, method, path, body=None):
+        """Send one request; returns ``(step, status, ms, json body or None)``."""
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = self.connect()
+            return step, None, None, None
+        elapsed = (time.perf_counter() - start) * 1000
+        data = None
+        if content and response.getheader('Content-Type', '').startswith('application/json'):
+            data = json.loads(content)
+        return step, response.status, elapsed, data
+
+    def run_action(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        return list(getattr(self, action)())
+
+    def browse(self):
+        path = '/api/posts/'
+        for _ in range(3):
+            result = self.request('browse', 'GET', path)
+            yield result
+            data = result[3]
+            if not data or not data.get('next'):
+                return
+            path = data['next'][data['next'].index('/api/'):]
+
+    def read(self):
+        post_id = self.rng.choice(self.post_ids)
+        yield self.request('read_post', 'GET', f'/api/posts/{post_id}/')
+        yield self.request('read_comments', 'GET', f'/api/posts/{post_id}/comments/')
+
+    def profile(self):
+        yield self.request('profile', 'GET', f'/api/users/{self.rng.choice(self.user_ids)}/')
+
+    def comment(self):
+        post_id = self.rng.choice(self.post_ids)
+        yield self.request('comment', 'POST', f'/api/posts/{post_id}/comments/',
+                           {'postId': post_id, 'content': 'Load test comment'})
+
+    def login(self):
+        username = AUTH_USERNAME.format(self.rng.randrange(self.auth_users))
+        result = self.request('login', 'POST', '/api/token/', {'username': username, 'password': AUTH_PASSWORD})
+        yield result
+        if result[3] and 'refresh' in result[3]:
+            yield self.request('refresh', 'POST', '/api/token/refresh/', {'refresh': result[3]['refresh']})
+
+
+def client(user, stop_at, latencies, errors, lock):
+    local_latencies, local_errors = defaultdict(list), defaultdict(int)
+    while time.monotonic() < stop_at:
+        for step, status, elapsed, _ in user.run_action():
+            if status is None or status >= 400:
+                local_errors[step] += 1
+            if elapsed is not None:
+                local_latencies[step].append(elapsed)
+    user.connection.close()
+    with lock:
+        for step, values in local_latencies.items():
+            latencies[step].extend(values)
+        for step, count in local_errors.items():
+            errors[step] += count
+
+
+def run_load(users, duration):
+    latencies, errors, lock = defaultdict(list), defaultdict(int), threading.Lock()
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=client, args=(user, stop_at, latencies, errors, lock)) for user in users]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    def summary(values, error_count):
+        return {
+            'requests': len(values),
+            'errors': error_count,
+            'requests_per_sec': round(len(values) / elapsed, 1),
+            **percentiles(values),
+        }
+
+    steps = {step: summary(values, errors[step]) for step, values in sorted(latencies.items())}
+    everything = [value for values in latencies.values() for value in values]
+    return {'total': summary(everything, sum(errors.values())), 'steps': steps}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load (default: %(default)s).')
+    parser.add_argument('--serve', choices=['wsgi', 'asgi-sync', 'asgi-async'],
+                        help='Start uvicorn in this mode on the --base-url port instead of using a running server.')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers with --serve.')
+    parser.add_argument('--seed', action='store_true', help='Generate benchmark data first.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10_000)
+    parser.add_argument('--comments', type=int, default=100_000)
+    parser.add_argument('--auth-users', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=16, help='Virtual users.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of measured load.')
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds of unmeasured load.')
+    parser.add_argument('--read-only', action='store_true', help='Leave out the comment step.')
+    parser.add_argument('--random-seed', type=int, default=0, help='Seed for the virtual users.')
+    parser.add_argument('--output', default='load_report.json', help='Where to write the JSON report.')
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from benchmarks.datagen import generate
+        generate(users=args.users, posts=args.posts, comments=args.comments, auth_users=args.auth_users)
+
+    post_ids = list(Post.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:1000])
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True)[:1000])
+    if not post_ids:
+        print("❌ No posts in the database; run with --seed first.")
+        return 1
+    from django.contrib.auth.models import User as AuthUser
+    auth_users = AuthUser.objects.filter(username__startswith=AUTH_USERNAME.format('')).count()
+
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+    server = None
+    if args.serve:
+        from benchmarks.asgi_load import start_server
+        server = start_server(args.serve, port, args.workers)
+    try:
+        def virtual_users(offset):
+            return [
+                VirtualUser(host, port, args.random_seed + offset + n, post_ids, user_ids, auth_users, args.read_only)
+                for n in range(args.concurrency)
+            ]
+
+        run_load(virtual_users(10_000), args.warmup)
+        result = run_load(virtual_users(0), args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'environment': environment(),
+        'scenario': {'weights': WEIGHTS, 'concurrency': args.concurrency, 'duration': args.duration,
+                     'read_only': args.read_only, 'server': args.serve or args.base_url},
+        **result,
+    }
+    for step, summary in [('total', result['total']), *result['steps'].items()]:
+        print(f"  {step:<14} {summary['requests_per_sec']:>9.1f} req/s  p50 {summary['p50_ms']} ms  "
+              f"p99 {summary['p99_ms']} ms  errors {summary['errors']}")
+    write_report(args.output, report)
+    return 0 if not result['total']['errors'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+Password hashing throughput: how many logins a core can verify per second.
+
+For every available hasher with the work factors from
+PASSWORD_HASHER_PARAMS (Argon2 needs argon2-cffi), one thread hashes and
+verifies ``--iterations`` times; verifications per second on one thread
+is the per-core login ceiling, before any database or HTTP work.
+
+Then ``--concurrency`` callers verify through the password hashing pool
+for ``--duration`` seconds with the configured hasher, reporting
+throughput, latency percentiles and how many calls were rejected for
+backpressure. With datagen's auth accounts (``--seed``) the same is
+measured end to end through authenticate(), user lookup included.
+
+    python -m benchmarks.passwords --iterations 20
+    PASSWORD_HASHER=scrypt python -m benchmarks.passwords --concurrency 32
+    python -m benchmarks.passwords --seed --auth-users 10 --output before.json
+
+Compare two reports with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher
+from django.db import connections
+
+from benchmarks.datagen import AUTH_PASSWORD, AUTH_USERNAME
+from benchmarks.report import environment, percentiles, write_report
+from socialnetworkapi.passwords import PasswordHashingBusy, get_pool, hash_password, verify_password
+
+PASSWORD = 'correct horse battery staple'
+
+
+def available_hashers():
+    for algorithm in settings.PASSWORD_HASHER_CLASSES:
+        try:
+            hasher = get_hasher(algorithm)
+            hasher.encode(PASSWORD, hasher.salt())
+        except (ValueError, ImportError) as exc:
+            print(f"  (skipping {algorithm}: {exc})")
+            continue
+        yield algorithm, hasher
+
+
+def timed(fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def single_thread(hasher, iterations):
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+    hashes = timed(lambda: hasher.encode(PASSWORD, hasher.salt()), iterations)
+    verifies = timed(lambda: hasher.verify(PASSWORD, encoded), iterations)
+    return {
+        'hash_per_sec': round(len(hashes) / (sum(hashes) / 1000), 2),
+        'verify_per_sec': round(len(verifies) / (sum(verifies) / 1000), 2),
+        **percentiles(verifies),
+    }
+
+
+def concurrent(call, concurrency, duration):
+    """Run ``call`` from ``concurrency`` threads for ``duration`` seconds."""
+    latencies, lock = [], threading.Lock()
+    rejected = [0]
+    stop_at = time.monotonic() + duration
+
+    def caller():
+        local, local_rejected = [], 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                call()
+            except PasswordHashingBusy:
+                local_rejected += 1
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        connections.close_all()
+        with lock:
+            latencies.extend(local)
+            rejected[0] += local_rejected
+
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {
+        'completed': len(latencies),
+        'rejected': rejected[0],
+        'verify_per_sec': round(len(latencies) / elapsed, 2),
+        **percentiles(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='Create the auth accounts for the login case first.')
+    parser.add_argument('--auth-users', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=20, help='Hashes and verifications per hasher.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads calling the pool.')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of concurrent load.')
+    parser.add_argument('--output', default='passwords_report.json', help='Where to write the JSON report.')
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from benchmarks.datagen import generate
+        generate(users=0, posts=0, comments=0, auth_users=args.auth_users)
+
+    cores = os.cpu_count() or 1
+    workers = get_pool().workers
+    report = {'environment': environment(), 'data': {
+        'cores': cores, 'pool_workers': workers, 'hasher': settings.PASSWORD_HASHER,
+    }, 'hashers': {}}
+
+    for algorithm, hasher in available_hashers():
+        result = report['hashers'][algorithm] = single_thread(hasher, args.iterations)
+        print(f"✅ {algorithm:<14} {result['verify_per_sec']:>8} logins/s/core  "
+              f"{result['hash_per_sec']:>8} hashes/s/core  p50 {result['p50_ms']} ms")
+
+    encoded = hash_password(PASSWORD)
+    pool = report['pool'] = concurrent(lambda: verify_password(PASSWORD, encoded), args.concurrency, args.duration)
+    pool['verify_per_sec_per_worker'] = round(pool['verify_per_sec'] / min(workers, cores), 2)
+    print(f"✅ pool           {pool['verify_per_sec']:>8} logins/s with {workers} workers, "
+          f"{args.concurrency} callers  p99 {pool['p99_ms']} ms  rejected {pool['rejected']}")
+
+    username = AUTH_USERNAME.format(0)
+    if authenticate(username=username, password=AUTH_PASSWORD) is not None:
+        login = report['login'] = concurrent(
+            lambda: authenticate(username=username, password=AUTH_PASSWORD), args.concurrency, args.duration,
+        )
+        print(f"✅ authenticate   {login['verify_per_sec']:>8} logins/s  p99 {login['p99_ms']} ms  "
+              f"rejected {login['rejected']}")
+    else:
+        print(f"  (skipping the login case: no {username!r} account; seed with --auth-users)")
+
+    write_report(args.output, report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Helpers shared by the benchmark scripts for summarizing latencies and
+writing reports that can be compared across commits (see
+benchmarks.compare).
+"""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def percentiles(latencies_ms):
+    """p50/p90/p99/max of a list of latencies in milliseconds."""
+    ordered = sorted(latencies_ms)
+    if not ordered:
+        return {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+    return {'p50_ms': at(0.50), 'p90_ms': at(0.90), 'p99_ms': at(0.99), 'max_ms': round(ordered[-1], 3)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Where a report was produced: commit, time, interpreter and database."""
+    import django
+    from django.db import connection
+
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'platform': sys.platform,
+    }
+
+
+def write_report(path, report):
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✅ Report written to {path}")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks for the API views and serializers.
+
+Every case runs in-process (Django test client or a direct call, no HTTP
+server) ``--iterations`` times after ``--warmup`` unmeasured runs, and
+reports latency percentiles. Each case also has a query budget: the number
+of SQL queries one run may issue. A case over budget is reported as a
+failure and the script exits with status 1, so N+1 regressions are caught
+as well as slowdowns.
+
+    python -m benchmarks.views --seed --iterations 200
+    python -m benchmarks.views --cases post_list comment_list --output before.json
+
+Compare two reports with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import django
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialnetworkapi.settings')
+# Every case repeats its request from one client; time the views, not the rate limits.
+os.environ.setdefault('THROTTLING_ENABLED', 'False')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.datagen import AUTH_PASSWORD, AUTH_USERNAME
+from benchmarks.report import environment, percentiles, write_report
+from posts.cache import get_response_cache
+from posts.fast_serializers import comment_representation, comment_values, post_rows
+from posts.models import Comment, Post
+from posts.serializers import CommentSerializer, PostSerializer
+from socialnetworkapi.renderers import FastJSONRenderer
+from users.fast_serializers import user_rows
+from users.models import User
+from users.serializers import UserSerializer
+
+ROWS = 100
+
+
+class Case:
+    def __init__(self, name, run, query_budget, setup=None):
+        self.name = name
+        self.run = run
+        self.query_budget = query_budget
+        self.setup = setup
+
+
+def request(client, method, path, expected_status=200, **kwargs):
+    def run():
+        response = getattr(client, method)(path, **kwargs)
+        if response.status_code != expected_status:
+            raise AssertionError(f'{method.upper()} {path} answered {response.status_code}')
+        return response
+    return run
+
+
+def cases():
+    client = Client(HTTP_HOST='127.0.0.1')
+    cache = get_response_cache()
+    clear_cache = cache.backend.clear
+
+    busiest_post = Post.objects.order_by('-comment_count').values_list('pk', flat=True).first()
+    user_id = User.objects.order_by('pk').values_list('pk', flat=True).first()
+    second_page = client.get('/api/posts/').json()['next']
+    second_page = second_page[second_page.index('/api/'):]
+
+    posts = list(Post.objects.for_listing().order_by('-created_at', '-id')[:ROWS])
+    post_ids = [post.pk for post in posts]
+    comments = Comment.objects.filter(postId=busiest_post).order_by('created_at', 'id')[:ROWS]
+
+    def users():
+        return User.objects.order_by('pk')[:ROWS]
+
+    payload = PostSerializer(posts, many=True).data
+
+    yield Case('post_list', request(client, 'get', '/api/posts/'), 2)
+    yield Case('post_list_second_page', request(client, 'get', second_page), 2)
+    yield Case('post_detail_cold', request(client, 'get', f'/api/posts/{busiest_post}/'), 3, setup=clear_cache)
+    yield Case('post_detail_cached', request(client, 'get', f'/api/posts/{busiest_post}/'), 0)
+    yield Case('post_list_top_comments', request(client, 'get', '/api/posts/?top_comments=3'), 3)
+    yield Case('post_detail_top_comments', request(client, 'get', f'/api/posts/{busiest_post}/?top_comments=3'), 3,
+               setup=clear_cache)
+    yield Case('comment_list_cold', request(client, 'get', f'/api/posts/{busiest_post}/comments/'), 1,
+               setup=clear_cache)
+    yield Case('comment_list_cached', request(client, 'get', f'/api/posts/{busiest_post}/comments/'), 0)
+    yield Case('comment_list_top_cold', request(client, 'get', f'/api/posts/{busiest_post}/comments/?sort=top'), 1,
+               setup=clear_cache)
+    yield Case('user_detail', request(client, 'get', f'/api/users/{user_id}/'), 1)
+
+    username = AUTH_USERNAME.format(0)
+    tokens = client.post('/api/token/', {'username': username, 'password': AUTH_PASSWORD},
+                         content_type='application/json')
+    if tokens.status_code == 200:
+        credentials = {'username': username, 'password': AUTH_PASSWORD}
+        yield Case('token_obtain', request(client, 'post', '/api/token/', data=credentials,
+                                           content_type='application/json'), 1)
+        refresh = {'refresh': tokens.json()['refresh']}
+        yield Case('token_refresh', request(client, 'post', '/api/token/refresh/', data=refresh,
+                                            content_type='application/json'), 1)
+    else:
+        print(f"  (skipping JWT cases: no {username!r} account; seed with --auth-users)")
+
+    yield Case('serializer_posts', lambda: PostSerializer(
+        Post.objects.for_listing().filter(pk__in=post_ids), many=True).data, 2)
+    yield Case('fast_posts', lambda: post_rows(Post.objects.filter(pk__in=post_ids)), 1)
+    yield Case('serializer_comments', lambda: CommentSerializer(
+        comments.select_related('author'), many=True).data, 1)
+    yield Case('fast_comments', lambda: [comment_representation(row) for row in comment_values(comments)], 1)
+    yield Case('serializer_users', lambda: UserSerializer(users(), many=True).data, 1)
+    yield Case('fast_users', lambda: user_rows(users()), 1)
+    yield Case('render_posts_json', lambda: JSONRenderer().render(payload), 0)
+    yield Case('render_posts_orjson', lambda: FastJSONRenderer().render(payload), 0)
+
+
+class QueryCounter:
+    """Execute wrapper counting queries; unlike connection.queries it survives request_started."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(case, iterations, warmup):
+    for _ in range(warmup):
+        if case.setup:
+            case.setup()
+        case.run()
+
+    if case.setup:
+        case.setup()
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        case.run()
+
+    latencies = []
+    for _ in range(iterations):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    elapsed = sum(latencies) / 1000
+    return {
+        'queries': queries.count,
+        'query_budget': case.query_budget,
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 1) if elapsed else None,
+        **percentiles(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='Generate benchmark data first.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10_000)
+    parser.add_argument('--comments', type=int, default=100_000)
+    parser.add_argument('--auth-users', type=int, default=10, help='Accounts for the JWT cases.')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--cases', nargs='+', help='Only run these cases (default: all).')
+    parser.add_argument('--output', default='views_report.json', help='Where to write the JSON report.')
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from benchmarks.datagen import generate
+        generate(users=args.users, posts=args.posts, comments=args.comments, auth_users=args.auth_users)
+
+    if not Post.objects.exists():
+        print("❌ No posts in the database; run with --seed first.")
+        return 1
+
+    # token_obtain hashes a password on every run; don't log each one as slow.
+    logging.getLogger('socialnetworkapi.metrics').setLevel(logging.ERROR)
+    report = {'environment': environment(), 'data': {
+        'users': User.objects.count(), 'posts': Post.objects.count(), 'comments': Comment.objects.count(),
+    }, 'cases': {}}
+    failures = 0
+    for case in cases():
+        if args.cases and case.name not in args.cases:
+            continue
+        result = measure(case, args.iterations, args.warmup)
+        report['cases'][case.name] = result
+        over_budget = result['queries'] > case.query_budget
+        failures += over_budget
+        mark = '❌' if over_budget else '✅'
+        print(f"{mark} {case.name:<24} p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+              f"queries {result['queries']}/{case.query_budget}")
+
+    write_report(args.output, report)
+    if failures:
+        print(f"❌ {failures} case(s) over their query budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from posts.models import Post
+from users.models import User
+
+from .stores import get_timeline_store
+
+
+def _fanout_limit():
+    return getattr(settings, 'FEED', {}).get('FANOUT_LIMIT', 10000)
+
+
+def fan_out_post(post, batch_size=1000):
+    """
+    Push a new post into the timelines of its author and their followers.
+
+    Authors with more than FEED['FANOUT_LIMIT'] followers are skipped (only
+    their own timeline gets the post): pushing to every follower would make
+    a single write cost millions of inserts, so read_feed pulls their posts
+    at read time instead.
+    """
+    store = get_timeline_store()
+    store.push([post.author_id], post.pk)
+    follower_count = User.objects.values_list('follower_count', flat=True).get(pk=post.author_id)
+    if follower_count > _fanout_limit():
+        return
+    follower_ids = (
+        User.following.through.objects.filter(to_user_id=post.author_id)
+        .values_list('from_user_id', flat=True)
+    )
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(follower_id)
+        if len(batch) >= batch_size:
+            store.push(batch, post.pk)
+            batch = []
+    if batch:
+        store.push(batch, post.pk)
+
+
+def fan_out_posts(posts):
+    """
+    fan_out_post() for many new posts (a batch create): the followers of
+    all the authors are loaded with one query and every timeline is pushed
+    once with all of its new post ids, so the cost grows with the number
+    of timeline entries rather than with posts times followers' queries.
+    """
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(post.pk)
+    if not by_author:
+        return
+    timelines = defaultdict(list)
+    for author_id, post_ids in by_author.items():
+        timelines[author_id] += post_ids
+    fanned_out = (
+        User.objects.filter(pk__in=by_author, follower_count__lte=_fanout_limit())
+        .values_list('pk', flat=True)
+    )
+    followers = (
+        User.following.through.objects.filter(to_user_id__in=fanned_out)
+        .values_list('to_user_id', 'from_user_id')
+    )
+    for author_id, follower_id in followers.iterator():
+        timelines[follower_id] += by_author[author_id]
+    get_timeline_store().push_many(timelines)
+
+
+def backfill_timeline(user_id, author_id):
+    """
+    Push the FEED['BACKFILL'] newest posts of ``author_id`` into the
+    timeline of ``user_id``, who just followed them, so the feed shows the
+    author's recent posts rather than only those written from now on.
+    High-fanout authors are skipped: read_feed pulls their posts anyway.
+    """
+    follower_count = User.objects.values_list('follower_count', flat=True).get(pk=author_id)
+    if follower_count > _fanout_limit():
+        return
+    limit = getattr(settings, 'FEED', {}).get('BACKFILL', 50)
+    post_ids = list(Post.objects.filter(author_id=author_id).order_by('-id').values_list('id', flat=True)[:limit])
+    if post_ids:
+        get_timeline_store().add(user_id, post_ids)
+
+
+def unfollow_timeline(user_id, author_id):
+    """Remove the posts of ``author_id`` from the timeline of ``user_id``, who unfollowed them."""
+    get_timeline_store().remove_author(user_id, author_id)
+
+
+def read_feed(user_id, before=None, limit=20):
+    """
+    Return ``(post_ids, has_more)`` for one page of a user's home feed,
+    newest first, with post ids below ``before``.
+
+    Ids pushed into the user's timeline are merged with recent posts of the
+    high-fanout authors they follow, so the work is bounded by the page size
+    and the number of such authors rather than by the follow graph.
+    """
+    post_ids = set(get_timeline_store().page(user_id, before, limit + 1))
+    pulled_authors = (
+        User.following.through.objects
+        .filter(from_user_id=user_id, to_user__follower_count__gt=_fanout_limit())
+        .values_list('to_user_id', flat=True)
+    )
+    pulled = Post.objects.filter(author_id__in=pulled_authors)
+    if before is not None:
+        pulled = pulled.filter(id__lt=before)
+    post_ids.update(pulled.order_by('-id').values_list('id', flat=True)[:limit + 1])
+    post_ids = sorted(post_ids, reverse=True)
+    return post_ids[:limit], len(post_ids) > limit
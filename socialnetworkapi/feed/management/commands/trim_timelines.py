@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from feed.stores import get_timeline_store
+
+
+class Command(BaseCommand):
+    help = "Cap every home timeline at FEED['CAP'] entries (database timeline store only)."
+
+    def handle(self, *args, **options):
+        deleted = get_timeline_store().trim()
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} timeline entries."))
@@ -0,0 +1,17 @@
+from django.db import models
+from posts.models import Post
+from users.models import User
+
+# Create your models here.
+class TimelineEntry(models.Model):
+    """A post id pushed into a user's home timeline by fan-out-on-write."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.user_id}"
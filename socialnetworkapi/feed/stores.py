@@ -0,0 +1,225 @@
+import bisect
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+from users.models import User
+
+from .models import TimelineEntry
+
+
+class DatabaseTimelineStore:
+    """
+    Timelines as rows of (user_id, post_id) in feed_timelineentry.
+
+    Pages are read newest first from the (user_id, post_id) unique index.
+    Every write caps the timelines it touched in the same transaction: one
+    query finds the cap-th newest entry of each (an index scan of ``cap``
+    rows per timeline) and the entries below it are deleted. The
+    trim_timelines management command caps every timeline at once, e.g.
+    after lowering CAP.
+    """
+
+    # Timelines trimmed per DELETE; keeps the WHERE clause well under
+    # SQLite's expression depth limit.
+    TRIM_CHUNK = 100
+
+    def __init__(self, cap=800, batch_size=1000, **kwargs):
+        self.cap = cap
+        self.batch_size = batch_size
+
+    def push(self, user_ids, post_id):
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(user_id=user_id, post_id=post_id) for user_id in user_ids],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            self._cap(user_ids)
+
+    def add(self, user_id, post_ids):
+        """Push ``post_ids`` into one timeline (backfill after a follow)."""
+        self.push_many({user_id: post_ids})
+
+    def push_many(self, timelines):
+        """
+        Push ``{user_id: post_ids}`` (e.g. a batch of new posts grouped by
+        recipient) with one INSERT per ``batch_size`` entries and a single
+        cap pass over all the timelines. Only the ``cap`` newest ids of each
+        timeline are inserted; older ones would be trimmed right away.
+        """
+        entries = [
+            TimelineEntry(user_id=user_id, post_id=post_id)
+            for user_id, post_ids in timelines.items()
+            for post_id in sorted(set(post_ids))[-self.cap:]
+        ]
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(entries, batch_size=self.batch_size, ignore_conflicts=True)
+            self._cap(list(timelines))
+
+    def remove_author(self, user_id, author_id):
+        """Drop ``author_id``'s posts from the timeline of ``user_id`` (after an unfollow)."""
+        TimelineEntry.objects.filter(user_id=user_id, post__author_id=author_id).delete()
+
+    def _cap(self, user_ids):
+        boundary = (
+            TimelineEntry.objects.filter(user_id=OuterRef('pk'))
+            .order_by('-post_id').values('post_id')[self.cap:self.cap + 1]
+        )
+        oversized = []
+        for start in range(0, len(user_ids), self.batch_size):
+            oversized += (
+                User.objects.filter(pk__in=user_ids[start:start + self.batch_size])
+                .annotate(boundary=Subquery(boundary))
+                .filter(boundary__isnull=False).values_list('pk', 'boundary')
+            )
+        deleted = 0
+        for start in range(0, len(oversized), self.TRIM_CHUNK):
+            stale = Q()
+            for user_id, post_id in oversized[start:start + self.TRIM_CHUNK]:
+                stale |= Q(user_id=user_id, post_id__lte=post_id)
+            deleted += TimelineEntry.objects.filter(stale).delete()[0]
+        return deleted
+
+    def page(self, user_id, before, limit):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        if before is not None:
+            entries = entries.filter(post_id__lt=before)
+        return list(entries.order_by('-post_id').values_list('post_id', flat=True)[:limit])
+
+    def trim(self):
+        """Drop entries beyond ``cap`` from every timeline; returns rows deleted."""
+        deleted = 0
+        oversized = (
+            TimelineEntry.objects.values('user_id').annotate(size=Count('id'))
+            .filter(size__gt=self.cap).values_list('user_id', flat=True)
+        )
+        for user_id in oversized.iterator():
+            entries = TimelineEntry.objects.filter(user_id=user_id)
+            boundary = entries.order_by('-post_id').values_list('post_id', flat=True)[self.cap]
+            deleted += entries.filter(post_id__lte=boundary).delete()[0]
+        return deleted
+
+
+class InMemoryTimelineStore:
+    """
+    Process-local stand-in for RedisTimelineStore with the same semantics:
+    per-user capped sets of post ids, read newest first. Meant for
+    development and tests; timelines are lost on restart and not shared
+    between workers.
+    """
+
+    def __init__(self, cap=800, **kwargs):
+        self.cap = cap
+        self._timelines = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def push(self, user_ids, post_id):
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._timelines[user_id]
+                index = bisect.bisect_left(timeline, post_id)
+                if index < len(timeline) and timeline[index] == post_id:
+                    continue
+                timeline.insert(index, post_id)
+                if len(timeline) > self.cap:
+                    del timeline[:len(timeline) - self.cap]
+
+    def add(self, user_id, post_ids):
+        self.push_many({user_id: post_ids})
+
+    def push_many(self, timelines):
+        for user_id, post_ids in timelines.items():
+            for post_id in post_ids:
+                self.push([user_id], post_id)
+
+    def remove_author(self, user_id, author_id):
+        with self._lock:
+            timeline = list(self._timelines.get(user_id, []))
+        stale = set(Post.objects.filter(pk__in=timeline, author_id=author_id).values_list('pk', flat=True))
+        if stale:
+            with self._lock:
+                self._timelines[user_id] = [pk for pk in self._timelines[user_id] if pk not in stale]
+
+    def page(self, user_id, before, limit):
+        with self._lock:
+            timeline = self._timelines.get(user_id, [])
+            end = len(timeline) if before is None else bisect.bisect_left(timeline, before)
+            return timeline[max(0, end - limit):end][::-1]
+
+    def trim(self):
+        return 0
+
+
+class RedisTimelineStore:
+    """
+    Timelines as Redis sorted sets (member and score = post id), capped on
+    every push with ZREMRANGEBYRANK. Requires the ``redis`` package.
+    """
+
+    def __init__(self, cap=800, redis_url='redis://localhost:6379/0', key_prefix='timeline', **kwargs):
+        import redis
+        self.cap = cap
+        self.key_prefix = key_prefix
+        self.client = redis.Redis.from_url(redis_url)
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}:{user_id}'
+
+    def push(self, user_ids, post_id):
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            key = self._key(user_id)
+            pipe.zadd(key, {post_id: post_id})
+            pipe.zremrangebyrank(key, 0, -self.cap - 1)
+        pipe.execute()
+
+    def add(self, user_id, post_ids):
+        self.push_many({user_id: post_ids})
+
+    def push_many(self, timelines):
+        pipe = self.client.pipeline(transaction=False)
+        for user_id, post_ids in timelines.items():
+            if not post_ids:
+                continue
+            key = self._key(user_id)
+            pipe.zadd(key, {post_id: post_id for post_id in post_ids})
+            pipe.zremrangebyrank(key, 0, -self.cap - 1)
+        pipe.execute()
+
+    def remove_author(self, user_id, author_id):
+        key = self._key(user_id)
+        timeline = [int(member) for member in self.client.zrange(key, 0, -1)]
+        stale = list(Post.objects.filter(pk__in=timeline, author_id=author_id).values_list('pk', flat=True))
+        if stale:
+            self.client.zrem(key, *stale)
+
+    def page(self, user_id, before, limit):
+        upper = '+inf' if before is None else f'({before}'
+        members = self.client.zrevrangebyscore(self._key(user_id), upper, '-inf', start=0, num=limit)
+        return [int(member) for member in members]
+
+    def trim(self):
+        return 0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_timeline_store():
+    """Return the process-wide timeline store configured by settings.FEED."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = dict(getattr(settings, 'FEED', {}))
+                store_class = import_string(config.pop('BACKEND', 'feed.stores.DatabaseTimelineStore'))
+                options = {name.lower(): value for name, value in config.items()}
+                _store = store_class(**options)
+    return _store
@@ -0,0 +1,165 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from posts.cache import get_response_cache
+from posts.models import Post
+from users.models import User
+from . import stores
+from .fanout import fan_out_post, fan_out_posts
+from .models import TimelineEntry
+
+
+class FeedTestCase(TestCase):
+    def setUp(self):
+        stores._store = None
+        self.addCleanup(setattr, stores, '_store', None)
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+        self.reader = User.objects.create(name='reader', age=30)
+        self.author = User.objects.create(name='author', age=30)
+
+    def post(self, author, title='Post'):
+        post = Post.objects.create(title=title, description='text', author=author)
+        fan_out_post(post)
+        return post
+
+    def follow(self, method='post'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                f'/api/users/{self.author.pk}/follow/', {'followerId': self.reader.pk}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def feed(self, page_size=10):
+        response = self.client.get('/api/feed/', {'userId': self.reader.pk, 'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.json()['results']]
+
+
+@override_settings(FEED={'BACKEND': 'feed.stores.DatabaseTimelineStore', 'CAP': 3, 'FANOUT_LIMIT': 100, 'BACKFILL': 2})
+class DatabaseTimelineTests(FeedTestCase):
+    def test_timelines_are_capped_on_write(self):
+        self.follow()
+        posts = [self.post(self.author) for _ in range(5)]
+
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).order_by('-post_id').values_list('post_id', flat=True)),
+            [post.pk for post in reversed(posts[-3:])],
+        )
+        self.assertEqual(TimelineEntry.objects.filter(user=self.author).count(), 3)
+
+    def test_follow_backfills_recent_posts(self):
+        posts = [self.post(self.author) for _ in range(3)]
+
+        self.follow()
+
+        self.assertEqual(self.feed(), [posts[2].pk, posts[1].pk])
+
+    def test_unfollow_keeps_pages_full(self):
+        self.follow()
+        own = [self.post(self.reader, 'Own') for _ in range(2)]
+        self.post(self.author)
+
+        self.follow('delete')
+
+        self.assertEqual(self.feed(page_size=2), [own[1].pk, own[0].pk])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post__author=self.author).exists())
+
+    def test_batch_fan_out_pushes_each_timeline_once(self):
+        self.follow()
+        other = User.objects.create(name='other', age=30)
+        other.following.add(self.author)
+        User.objects.filter(pk=self.author.pk).update(follower_count=2)
+
+        def fan_out(count):
+            posts = Post.objects.bulk_create(
+                Post(title='Post', description='text', author=self.author) for _ in range(count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                fan_out_posts(posts)
+            return posts, len(queries)
+
+        fan_out(3)  # fills the timelines, so both measured pushes trim
+        _, few = fan_out(2)
+        posts, many = fan_out(20)
+
+        self.assertEqual(few, many)
+        newest = [post.pk for post in reversed(posts[-3:])]
+        for user in (self.reader, other, self.author):
+            self.assertEqual(
+                list(TimelineEntry.objects.filter(user=user).order_by('-post_id').values_list('post_id', flat=True)),
+                newest,
+            )
+
+    def test_new_post_reaches_the_timelines_of_author_and_followers(self):
+        fan = User.objects.create(name='fan', age=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{self.reader.pk}/follow/', {'followerId': fan.pk}, format='json')
+            # New posts are authored by the first user, the reader.
+            response = self.client.post('/api/posts/', {'title': 'New', 'description': 'text'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()['id']
+
+        self.assertEqual(self.feed(), [post_id])
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post_id=post_id).values_list('user_id', flat=True)),
+            {self.reader.pk, fan.pk},
+        )
+
+    def test_feed_pages_through_the_timeline(self):
+        self.follow()
+        posts = [self.post(self.author) for _ in range(3)]
+        own = self.post(self.reader, 'Own')
+
+        first = self.client.get('/api/feed/', {'userId': self.reader.pk, 'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual([post['id'] for post in first['results']], [own.pk, posts[2].pk])
+        self.assertEqual([post['id'] for post in second['results']], [posts[1].pk])
+        self.assertIsNone(second['next'])
+
+    def test_deleted_posts_are_skipped(self):
+        self.follow()
+        kept, deleted = self.post(self.author), self.post(self.author)
+        Post.objects.filter(pk=deleted.pk).delete()
+
+        self.assertEqual(self.feed(), [kept.pk])
+
+    def test_unknown_user_or_cursor(self):
+        self.assertEqual(self.client.get('/api/feed/', {'userId': 999}).status_code, 404)
+        self.assertEqual(self.client.get('/api/feed/', {'cursor': 'garbage'}).status_code, 404)
+
+
+@override_settings(FEED={'BACKEND': 'feed.stores.DatabaseTimelineStore', 'CAP': 3, 'FANOUT_LIMIT': 0, 'BACKFILL': 2})
+class HighFanoutFeedTests(FeedTestCase):
+    """
+    With FANOUT_LIMIT 0 every followed author is over the limit: their posts
+    are not pushed but pulled when the feed is read.
+    """
+
+    def test_posts_are_pulled_at_read_time(self):
+        self.follow()
+        posts = [self.post(self.author) for _ in range(4)]
+        own = self.post(self.reader, 'Own')
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post__author=self.author).exists())
+        self.assertEqual(self.feed(), [own.pk, *(post.pk for post in reversed(posts))])
+
+        first = self.client.get('/api/feed/', {'userId': self.reader.pk, 'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [post['id'] for post in first['results'] + second['results']],
+            [own.pk, posts[3].pk, posts[2].pk, posts[1].pk],
+        )
+
+    def test_follow_doesnt_backfill_and_unfollow_stops_pulling(self):
+        posts = [self.post(self.author) for _ in range(2)]
+
+        self.follow()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [post.pk for post in reversed(posts)])
+
+        self.follow('delete')
+        self.assertEqual(self.feed(), [])
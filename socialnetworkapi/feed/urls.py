@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('feed/', views.home_feed, name='home-feed'),
+]
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework import status
+
+from posts.models import Post
+from posts.pagination import KeysetPagination
+from posts.serializers import PostSerializer
+from users.models import User
+
+from .fanout import read_feed
+
+
+@api_view(['GET'])
+def home_feed(request):
+    """
+    Get a user's home feed: posts by the user and the users they follow.
+
+    * Requires no authentication
+    * Available to all users
+
+    GET: Returns one page of posts, newest first
+
+    Parameters:
+    - userId: Query parameter (optional) - Whose feed to read; defaults to the first user
+    - cursor: Query parameter (optional) - Opaque cursor from a previous 'next' link
+    - page_size: Query parameter (optional) - Posts per page
+
+    Responses:
+    - 200: {"next": url or null, "previous": null, "results": [posts]}
+    - 404: User not found or invalid cursor
+    """
+    user_id = request.query_params.get('userId')
+    try:
+        user = User.objects.get(id=user_id) if user_id is not None else User.objects.first()
+    except (User.DoesNotExist, ValueError):
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if user is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    paginator = KeysetPagination(ordering=('-id',))
+    paginator.request = request
+    page_size = paginator.get_page_size(request)
+    cursor = paginator.decode_cursor(request)
+    before = cursor[0][0] if cursor else None
+    if before is not None and not isinstance(before, int):
+        raise NotFound(paginator.invalid_cursor_message)
+
+    post_ids, has_more = read_feed(user.pk, before, page_size)
+    posts = Post.objects.for_listing().in_bulk(post_ids)
+    # Unfollowing removes the author's posts from the timeline (see
+    # users.views.user_follow), so only deleted posts can be missing here.
+    page = [posts[pk] for pk in post_ids if pk in posts]
+
+    next_link = None
+    if has_more:
+        next_link = paginator.build_link(SimpleNamespace(id=post_ids[-1]), reverse=False)
+    serializer = PostSerializer(page, many=True)
+    return Response({'next': next_link, 'previous': None, 'results': serializer.data})
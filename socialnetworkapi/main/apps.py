@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from django.core import checks
+        from socialnetworkapi.schema import check_schema_artifact
+
+        checks.register(check_schema_artifact, checks.Tags.urls)
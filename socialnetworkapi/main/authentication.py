@@ -0,0 +1,149 @@
+"""
+JWT authentication without a database hit per request.
+
+simplejwt's JWTAuthentication loads the auth.User row for every
+authenticated request. CachedJWTAuthentication builds request.user from the
+token claims instead (a simplejwt TokenUser) and runs the revocation checks
+against a small TTL cache:
+
+- the user still exists and is active, and, with SIMPLE_JWT
+  CHECK_REVOKE_TOKEN, still has the password the token was issued for;
+- the access token has not been revoked (POST /api/token/revoke/, stored
+  as a RevokedAccessToken until the token expires).
+
+Both are looked up once per TTL, so revoking access (deactivating a user,
+changing their password, revoking a token) takes effect within
+JWT_AUTH_CACHE['TIMEOUT'] seconds rather than immediately; a token revoked
+through this process is rejected by it right away.
+
+Views opt in with ``authentication_classes``; like the rest of the API,
+views without it ignore the Authorization header. Only the views that act
+on the token's own account use it: the image upload, the account list and
+token revocation. Creating posts and comments (one at a time or in
+batches) stays unauthenticated, because their authors are users.User rows,
+which have no link to the auth.User accounts tokens are issued for. Until
+such a link exists a token can't name an author there, and those views
+keep defaulting to the first user.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch, get_md5_hash_password
+
+from .models import RevokedAccessToken
+
+
+class RevocationCache:
+    """
+    TTL cache of the per-user and per-token facts the revocation checks
+    need. Values are always tuples, so a cached "not found" is told apart
+    from a miss.
+    """
+
+    def __init__(self, backend, timeout=30):
+        self.backend = backend
+        self.timeout = timeout
+
+    def user_state(self, user_id):
+        """``(is_active, password digest or None)``, or None if the user is gone."""
+        key = f'jwt:user:{user_id}'
+        entry = self.backend.get(key)
+        if entry is None:
+            row = (
+                get_user_model().objects
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values_list('is_active', 'password')
+                .first()
+            )
+            if row is None:
+                entry = (None,)
+            else:
+                is_active, password = row
+                digest = get_md5_hash_password(password) if api_settings.CHECK_REVOKE_TOKEN else None
+                entry = ((is_active, digest),)
+            self.backend.set(key, entry, self.timeout)
+        return entry[0]
+
+    def is_revoked(self, jti):
+        key = f'jwt:revoked:{jti}'
+        entry = self.backend.get(key)
+        if entry is None:
+            entry = (RevokedAccessToken.objects.filter(jti=jti).exists(),)
+            self.backend.set(key, entry, self.timeout)
+        return entry[0]
+
+    def mark_revoked(self, jti):
+        self.backend.set(f'jwt:revoked:{jti}', (True,), self.timeout)
+
+    def clear(self):
+        self.backend.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_revocation_cache():
+    """Return the process-wide RevocationCache configured by settings.JWT_AUTH_CACHE."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = dict(getattr(settings, 'JWT_AUTH_CACHE', {}))
+                backend_class = import_string(config.pop('BACKEND', 'posts.cache.LocMemLRUBackend'))
+                timeout = config.pop('TIMEOUT', 30)
+                options = {name.lower(): value for name, value in config.items()}
+                _cache = RevocationCache(backend_class(**options), timeout=timeout)
+    return _cache
+
+
+def revoke_access_token(token):
+    """
+    Revoke the validated access token ``token`` until it expires. Expired
+    revocations are purged on the way.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    RevokedAccessToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    try:
+        with transaction.atomic():
+            RevokedAccessToken.objects.create(
+                jti=jti,
+                user_id=str(token[api_settings.USER_ID_CLAIM]),
+                expires_at=datetime_from_epoch(token['exp']),
+            )
+    except IntegrityError:
+        pass  # Revoked already.
+    get_revocation_cache().mark_revoked(jti)
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticate with a JWT access token; request.user is a TokenUser built
+    from the claims, and revocation is checked through the RevocationCache.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        cache = get_revocation_cache()
+
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None and cache.is_revoked(jti):
+            raise InvalidToken(_("Token has been revoked"))
+
+        state = cache.user_state(validated_token[api_settings.USER_ID_CLAIM])
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, password_digest = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
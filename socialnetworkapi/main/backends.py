@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from socialnetworkapi.passwords import hash_password, verify_password
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords on the password hashing pool (see
+    socialnetworkapi.passwords). Used by /api/token/ and the admin login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, as ModelBackend does, so an unknown username takes
+            # as long as a wrong password.
+            hash_password(password)
+            return None
+
+        valid, must_update = verify_password(password, user.password)
+        if not (valid and self.user_can_authenticate(user)):
+            return None
+        if must_update:
+            # Rehash with the current algorithm and work factor.
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
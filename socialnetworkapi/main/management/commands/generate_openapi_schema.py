@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from socialnetworkapi.schema import SchemaDocument, generate_schema, write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI document served at /swagger.json and "
+        "/swagger.yaml into its artifact file (OPENAPI_SCHEMA['PATH']). Run it "
+        "on every deploy, after the code is in place and before the workers start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.OPENAPI_SCHEMA['PATH'],
+                            help='Where to write the document (default: OPENAPI_SCHEMA PATH).')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if the artifact is missing or differs from a fresh '
+                                 'document instead of writing it.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if options['check']:
+            current = SchemaDocument(generate_schema())
+            try:
+                with open(output, 'rb') as fh:
+                    stored = SchemaDocument(fh.read())
+            except FileNotFoundError:
+                raise CommandError(f"{output} does not exist; run generate_openapi_schema.")
+            if stored.digest != current.digest:
+                raise CommandError(f"{output} is out of date ({stored.digest[:12]}, "
+                                   f"expected {current.digest[:12]}); run generate_openapi_schema.")
+            self.stdout.write(self.style.SUCCESS(f"{output} is up to date ({current.digest[:12]})."))
+            return
+
+        document = write_schema(output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output}: API {document.version}, digest {document.digest[:12]}."
+        ))
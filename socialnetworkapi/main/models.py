@@ -1,3 +1,16 @@
 from django.db import models
 
-# Create your models here.
+
+class RevokedAccessToken(models.Model):
+    """
+    An access token revoked before it expired (see main.authentication).
+    Rows are only needed until ``expires_at``; expired ones are purged as
+    new tokens are revoked.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    user_id = models.CharField(max_length=255)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
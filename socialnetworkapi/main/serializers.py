@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from socialnetworkapi.passwords import hash_password
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -9,8 +11,8 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'password']
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            password=validated_data['password']
-        )
+        # Like User.objects.create_user(), with the hashing done on the pool.
+        user = User(username=User.normalize_username(validated_data['username']))
+        user.password = hash_password(validated_data['password'])
+        user.save()
         return user
@@ -1,3 +1,59 @@
+from django.contrib.auth.models import User as Account
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from posts.cache import get_response_cache
+from .authentication import get_revocation_cache
+from .models import RevokedAccessToken
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        get_response_cache().backend.clear()
+        get_revocation_cache().clear()
+        self.client = APIClient()
+        self.account = Account.objects.create_user('alice', password='secret')
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_public_reads_ignore_invalid_tokens(self):
+        expired = AccessToken.for_user(self.account)
+        expired.set_exp(lifetime=-AccessToken.lifetime)
+        for token in ('garbage', str(expired)):
+            with self.subTest(token=token[:10]):
+                self.authenticate(token)
+                self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+
+    def test_protected_view_requires_a_valid_token(self):
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 401)
+        self.authenticate('garbage')
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 401)
+
+    def test_revoked_token_is_rejected(self):
+        token = AccessToken.for_user(self.account)
+        self.authenticate(token)
+
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 204)
+
+        self.assertTrue(RevokedAccessToken.objects.filter(jti=token['jti']).exists())
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 401)
+        # Another token of the same user still works.
+        self.authenticate(AccessToken.for_user(self.account))
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 204)
+
+    def test_account_list_streams(self):
+        self.authenticate(AccessToken.for_user(self.account))
+
+        response = self.client.get('/api/accounts/', {'stream': 'ndjson'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"username":"alice"', b''.join(response.streaming_content))
+
+    def test_revocation_is_read_from_the_database(self):
+        token = AccessToken.for_user(self.account)
+        RevokedAccessToken.objects.create(jti=token['jti'], user_id=str(self.account.pk), expires_at=token.current_time)
+        self.authenticate(token)
+
+        self.assertEqual(self.client.post('/api/token/revoke/').status_code, 401)
@@ -1,11 +1,13 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import RegisterView  # Импортируем RegisterView
-from .views import UserListView
+from .views import TokenRevokeView, UserListView
 
 urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
     path('register/', RegisterView.as_view(), name='register'),  # Путь для регистрации
-    path('users/', UserListView.as_view(), name='user_list'),  # Новый путь
+    # users/ is taken by users.urls, included first.
+    path('accounts/', UserListView.as_view(), name='user_list'),
 ]
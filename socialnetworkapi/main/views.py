@@ -1,10 +1,12 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from .authentication import CachedJWTAuthentication, revoke_access_token
 from .serializers import RegisterSerializer
 from django.contrib.auth.models import User
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import serializers
+from socialnetworkapi.streaming import requested_stream_format, streaming_response
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -15,10 +17,25 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email']
 
+class TokenRevokeView(APIView):
+    """Revoke the access token the request is authenticated with (logout)."""
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_access_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class UserListView(APIView):
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # ?stream=json|ndjson streams the users instead of building the whole list.
+        stream_format = requested_stream_format(request)
+        if stream_format:
+            return streaming_response(User.objects.order_by('pk'), UserSerializer, stream_format)
+
         users = User.objects.all()
         serializer = UserSerializer(users, many=True)
         return Response(serializer.data)
\ No newline at end of file
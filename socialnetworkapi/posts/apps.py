@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from users.models import User
+        from .cache import user_saved
+
+        post_save.connect(user_saved, sender=User, dispatch_uid='posts.cache.user_saved')
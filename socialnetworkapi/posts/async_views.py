@@ -0,0 +1,89 @@
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from socialnetworkapi.async_views import fallback_to, json_response
+from socialnetworkapi.conditional import check_not_modified, with_validators
+from . import views
+from .cache import get_response_cache
+from .fast_serializers import order_by_ids, post_representation, post_values
+from .models import Post, Tag
+from .pagination import KeysetPagination
+from .serializers import PostSerializer
+
+
+@fallback_to(views.post_list)
+async def post_list(request):
+    """
+    Async GET for /api/posts/; same parameters, pages and validators as
+    views.post_list, which still handles POST.
+    """
+    if 'stream' in request.GET or 'top_comments' in request.GET:
+        # Exports stream from a sync iterator, and top comments previews are
+        # only built by the DRF view.
+        return await sync_to_async(views.post_list)(request)
+
+    tags = set(request.GET.getlist('tag'))
+    tag_match = request.GET.get('tag_match', 'all')
+    if tag_match not in ('all', 'any'):
+        return json_response({'tag_match': ['Must be "all" or "any".']}, status=400)
+
+    tag_ids = []
+    if tags:
+        tag_ids = [pk async for pk in Tag.objects.filter(name__in=tags).values_list('pk', flat=True)]
+
+    def filtered(queryset):
+        if tags:
+            queryset = queryset.with_tag_ids(tag_ids, len(tags), match_all=tag_match == 'all')
+        return queryset
+
+    # The paginator reads query_params and builds absolute links off a DRF request.
+    drf_request = Request(request)
+    paginator = KeysetPagination()
+    try:
+        versions = await paginator.apaginate_queryset(filtered(Post.objects.versions()), drf_request)
+    except NotFound as exc:
+        return json_response({'detail': exc.detail}, status=404)
+    etag, last_modified = views._post_page_validators(paginator, versions)
+    not_modified = check_not_modified(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    page_ids = [post.pk for post in versions]
+    posts = [post_representation(row) async for row in post_values(Post.objects.filter(pk__in=page_ids))]
+    posts = order_by_ids(posts, page_ids)
+    return with_validators(json_response(paginator.get_paginated_data(posts)), etag, last_modified)
+
+
+@fallback_to(views.post_detail)
+async def post_detail(request, pk):
+    """
+    Async GET for /api/posts/<pk>/ through the response cache; PUT and
+    DELETE, and top comments previews, are handled by views.post_detail.
+    """
+    if 'top_comments' in request.GET:
+        return await sync_to_async(views.post_detail)(request, pk)
+
+    cache = get_response_cache()
+    entry, version = await cache.aget('post', pk)
+    if entry is not None:
+        validators = entry['etag'], entry['last_modified']
+    else:
+        post = await Post.objects.versions().filter(pk=pk).afirst()
+        if post is None:
+            return json_response(status=404)
+        validators = views._post_validators(post)
+    not_modified = check_not_modified(request, *validators)
+    if not_modified:
+        return not_modified
+    if entry is not None:
+        return with_validators(json_response(entry['data']), *validators)
+
+    post = await Post.objects.for_listing().filter(pk=pk).afirst()
+    if post is None:
+        return json_response(status=404)
+    serializer = PostSerializer(post)
+    etag, last_modified = views._post_validators(post)
+    await cache.aset('post', pk, version, {
+        'data': serializer.data, 'etag': etag, 'last_modified': last_modified,
+    })
+    return with_validators(json_response(serializer.data), etag, last_modified)
@@ -0,0 +1,300 @@
+"""
+Batch create/update/delete for posts and comments.
+
+A batch request body holds up to three lists of items:
+
+    {"create": [...], "update": [{"id": 1, ...}], "delete": [2, 3]}
+
+Every item is validated on its own with one bound serializer, so a bad item
+is reported without rejecting the rest. The valid items are then written
+with bulk_create / bulk_update / a single DELETE per operation, and the
+denormalized post counters are adjusted with one UPDATE per chunk of posts.
+Each item gets a result: ``{"index": i, "status": 201, "id": 7}`` or
+``{"index": i, "status": 400, "errors": {...}}``.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from feed.fanout import fan_out_posts
+from .cache import invalidate_post
+from .images import IMAGE_FIELDS, delete_files, detach_image
+from .likes import _delta_case
+from .models import Comment, Post, Tag
+from .serializers import CommentBatchItemSerializer, PostBatchItemSerializer
+
+OPERATIONS = ('create', 'update', 'delete')
+
+# Rows per INSERT/UPDATE statement, and posts per counter UPDATE (each post
+# adds a WHEN branch with two parameters).
+BULK_BATCH_SIZE = 1000
+COUNTER_CHUNK_SIZE = 500
+
+
+def parse_batch(data):
+    """Return ``{operation: items}`` from a request body, or raise ValidationError."""
+    if not isinstance(data, dict):
+        raise ValidationError({'non_field_errors': ['Expected an object with "create", "update" or "delete" lists.']})
+    unknown = set(data) - set(OPERATIONS)
+    if unknown:
+        raise ValidationError({name: ['Unknown batch operation.'] for name in sorted(unknown)})
+    operations = {}
+    for name in OPERATIONS:
+        items = data.get(name, [])
+        if not isinstance(items, list):
+            raise ValidationError({name: ['Expected a list.']})
+        operations[name] = items
+    max_items = getattr(settings, 'BATCH_MAX_ITEMS', 10000)
+    if sum(len(items) for items in operations.values()) > max_items:
+        raise ValidationError({'non_field_errors': [f'A batch may hold at most {max_items} items.']})
+    return operations
+
+
+def batch_status(results):
+    """200 when every item succeeded, 207 Multi-Status otherwise."""
+    failed = any(item['status'] >= 400 for items in results.values() for item in items)
+    return status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK
+
+
+def _validate(serializer, items, with_id=False):
+    """
+    Run ``serializer`` over every item. Returns ``(valid, failed)``: a list
+    of ``(index, id or None, validated_data)`` and a list of error results.
+    """
+    valid, failed, seen = [], [], set()
+    for index, item in enumerate(items):
+        pk = None
+        if with_id:
+            pk = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                failed.append(_error(index, {'id': ['A valid integer is required.']}))
+                continue
+            if pk in seen:
+                failed.append(_error(index, {'id': ['Duplicate id in batch.']}))
+                continue
+            seen.add(pk)
+        try:
+            valid.append((index, pk, serializer.run_validation(item)))
+        except ValidationError as exc:
+            failed.append(_error(index, exc.detail))
+    return valid, failed
+
+
+def _validate_ids(ids):
+    valid, failed, seen = [], [], set()
+    for index, pk in enumerate(ids):
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            failed.append(_error(index, {'id': ['A valid integer is required.']}))
+        elif pk in seen:
+            failed.append(_error(index, {'id': ['Duplicate id in batch.']}))
+        else:
+            seen.add(pk)
+            valid.append((index, pk))
+    return valid, failed
+
+
+def _error(index, errors, code=status.HTTP_400_BAD_REQUEST):
+    return {'index': index, 'status': code, 'errors': errors}
+
+
+def _not_found(index):
+    return _error(index, {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+
+def _sorted(results):
+    return sorted(results, key=lambda result: result['index'])
+
+
+def adjust_post_counters(comment_deltas, like_deltas):
+    """
+    Apply ``{post_id: delta}`` mappings to Post.comment_count and
+    Post.likes_total, one UPDATE per chunk of posts.
+    """
+    post_ids = sorted(pk for pk in set(comment_deltas) | set(like_deltas)
+                      if comment_deltas.get(pk) or like_deltas.get(pk))
+    for start in range(0, len(post_ids), COUNTER_CHUNK_SIZE):
+        chunk = post_ids[start:start + COUNTER_CHUNK_SIZE]
+        Post.objects.filter(pk__in=chunk).update(
+            comment_count=F('comment_count') + _delta_case({pk: comment_deltas.get(pk, 0) for pk in chunk}),
+            likes_total=F('likes_total') + _delta_case({pk: like_deltas.get(pk, 0) for pk in chunk}),
+        )
+
+
+def _invalidate_on_commit(post_ids, comments=True):
+    post_ids = set(post_ids)
+    transaction.on_commit(lambda: [invalidate_post(pk, comments=comments) for pk in post_ids])
+
+
+def _add_tags(posts_with_names):
+    """Attach tag names to new or retagged posts with one tag resolve and one INSERT."""
+    posts_with_names = [(post, names) for post, names in posts_with_names if names]
+    if not posts_with_names:
+        return
+    tags = Tag.objects.resolve({name for _, names in posts_with_names for name in names})
+    through = Post.tags.through
+    through.objects.bulk_create(
+        [through(post_id=post.pk, tag_id=tags[name].pk) for post, names in posts_with_names for name in set(names)],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def create_posts(items, author):
+    valid, results = _validate(PostBatchItemSerializer(), items)
+    if not valid:
+        return _sorted(results)
+
+    posts, tag_names = [], []
+    for _, _, data in valid:
+        data = dict(data)
+        tag_names.append(data.pop('tags', []))
+        posts.append(Post(author=author, **data))
+    Post.objects.bulk_create(posts, batch_size=BULK_BATCH_SIZE)
+    _add_tags(zip(posts, tag_names))
+    transaction.on_commit(lambda: fan_out_posts(posts))
+
+    results += [
+        {'index': index, 'status': status.HTTP_201_CREATED, 'id': post.pk}
+        for (index, _, _), post in zip(valid, posts)
+    ]
+    return _sorted(results)
+
+
+def update_posts(items):
+    valid, results = _validate(PostBatchItemSerializer(partial=True), items, with_id=True)
+    if not valid:
+        return _sorted(results)
+
+    posts = Post.objects.select_for_update().defer('search_vector').in_bulk([pk for _, pk, _ in valid])
+    now = timezone.now()
+    changed, fields, retagged, stale_images = [], {'updated_at'}, [], []
+    for index, pk, data in valid:
+        post = posts.get(pk)
+        if post is None:
+            results.append(_not_found(index))
+            continue
+        data = dict(data)
+        if 'tags' in data:
+            retagged.append((post, data.pop('tags')))
+        if 'imageUrl' in data and data['imageUrl'] != post.imageUrl and post.image_original:
+            stale_images += detach_image(post)
+            fields.update(IMAGE_FIELDS)
+        for field, value in data.items():
+            setattr(post, field, value)
+            fields.add(field)
+        post.updated_at = now
+        changed.append(post)
+        results.append({'index': index, 'status': status.HTTP_200_OK, 'id': pk})
+
+    Post.objects.bulk_update(changed, sorted(fields), batch_size=BULK_BATCH_SIZE)
+    if retagged:
+        Post.tags.through.objects.filter(post_id__in=[post.pk for post, _ in retagged]).delete()
+        _add_tags(retagged)
+    _invalidate_on_commit([post.pk for post in changed], comments=False)
+    if stale_images:
+        transaction.on_commit(lambda: delete_files(stale_images))
+    return _sorted(results)
+
+
+def delete_posts(ids):
+    valid, results = _validate_ids(ids)
+    rows = Post.objects.filter(pk__in=[pk for _, pk in valid]).values_list('pk', 'image_original', 'image_variants')
+    existing, stale_images = set(), []
+    for pk, original, variants in rows:
+        existing.add(pk)
+        stale_images += [name for name in [original, *variants.values()] if name]
+    Post.objects.filter(pk__in=existing).delete()
+    if stale_images:
+        transaction.on_commit(lambda: delete_files(stale_images))
+    for index, pk in valid:
+        results.append({'index': index, 'status': status.HTTP_204_NO_CONTENT, 'id': pk}
+                       if pk in existing else _not_found(index))
+    _invalidate_on_commit(existing)
+    return _sorted(results)
+
+
+def create_comments(items, author):
+    valid, results = _validate(CommentBatchItemSerializer(), items)
+    post_ids = {data['postId'] for _, _, data in valid}
+    existing = set(Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True))
+
+    created, comments = [], []
+    for index, _, data in valid:
+        data = dict(data)
+        post_id = data.pop('postId')
+        if post_id not in existing:
+            results.append(_error(index, {'postId': [f'Invalid pk "{post_id}" - object does not exist.']}))
+            continue
+        created.append(index)
+        comments.append(Comment(author=author, postId_id=post_id, **data))
+    if not comments:
+        return _sorted(results)
+
+    Comment.objects.bulk_create(comments, batch_size=BULK_BATCH_SIZE)
+    comment_deltas, like_deltas = Counter(), Counter()
+    for comment in comments:
+        comment_deltas[comment.postId_id] += 1
+        like_deltas[comment.postId_id] += comment.likes or 0
+    adjust_post_counters(comment_deltas, like_deltas)
+    _invalidate_on_commit(comment_deltas)
+
+    results += [
+        {'index': index, 'status': status.HTTP_201_CREATED, 'id': comment.pk}
+        for index, comment in zip(created, comments)
+    ]
+    return _sorted(results)
+
+
+def update_comments(items):
+    valid, results = _validate(CommentBatchItemSerializer(partial=True), items, with_id=True)
+    if not valid:
+        return _sorted(results)
+
+    # Row locks make the likes deltas relative to the stored values.
+    comments = Comment.objects.select_for_update().in_bulk([pk for _, pk, _ in valid])
+    now = timezone.now()
+    changed, fields, like_deltas = [], {'updated_at'}, Counter()
+    for index, pk, data in valid:
+        comment = comments.get(pk)
+        if comment is None:
+            results.append(_not_found(index))
+            continue
+        data = dict(data)
+        data.pop('postId', None)  # comments don't move between posts
+        old_likes = comment.likes or 0
+        for field, value in data.items():
+            setattr(comment, field, value)
+            fields.add(field)
+        comment.updated_at = now
+        like_deltas[comment.postId_id] += (comment.likes or 0) - old_likes
+        changed.append(comment)
+        results.append({'index': index, 'status': status.HTTP_200_OK, 'id': pk})
+
+    Comment.objects.bulk_update(changed, sorted(fields), batch_size=BULK_BATCH_SIZE)
+    adjust_post_counters({}, like_deltas)
+    _invalidate_on_commit(comment.postId_id for comment in changed)
+    return _sorted(results)
+
+
+def delete_comments(ids):
+    valid, results = _validate_ids(ids)
+    rows = {
+        row['id']: row for row in
+        Comment.objects.select_for_update().filter(pk__in=[pk for _, pk in valid]).values('id', 'postId', 'likes')
+    }
+    Comment.objects.filter(pk__in=rows).delete()
+    comment_deltas, like_deltas = Counter(), Counter()
+    for row in rows.values():
+        comment_deltas[row['postId']] -= 1
+        like_deltas[row['postId']] -= row['likes'] or 0
+    adjust_post_counters(comment_deltas, like_deltas)
+    for index, pk in valid:
+        results.append({'index': index, 'status': status.HTTP_204_NO_CONTENT, 'id': pk}
+                       if pk in rows else _not_found(index))
+    _invalidate_on_commit(comment_deltas)
+    return _sorted(results)
@@ -0,0 +1,255 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from socialnetworkapi.db_router import max_lag, reading_from_replica
+
+# Bump when the shape of cached payloads changes so old entries are ignored.
+PAYLOAD_VERSION = 3
+
+
+class LocMemLRUBackend:
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Values are stored by reference, so callers must not mutate what they get
+    back. Entries live in a single worker process: with several workers use
+    DjangoCacheBackend on a shared cache so invalidation reaches all of them.
+    """
+
+    def __init__(self, max_entries=10000, **kwargs):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    # Lookups never block, so async views can call them on the event loop.
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, timeout):
+        self.set(key, value, timeout)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """Store entries in one of the caches configured in settings.CACHES."""
+
+    def __init__(self, alias='default', **kwargs):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value, timeout):
+        await self.cache.aset(key, value, timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class DummyBackend:
+    """Caches nothing; every read is a miss."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    async def aget(self, key):
+        return None
+
+    async def aset(self, key, value, timeout):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Read-through cache for serialized payloads, keyed by namespace, id and a
+    version token.
+
+    Each (namespace, id) has a version token stored next to the payloads.
+    Invalidation replaces the token instead of deleting entries, which makes
+    it race-free: a reader that loaded stale rows before a write committed
+    stores them under the token it saw, which the write has already retired.
+    Tokens are random, so a token evicted from an LRU can never resurrect an
+    older payload.
+
+    That guarantee needs the rows to be at least as new as the token. A
+    replica may lag the write that retired the previous token, so payloads
+    read from a replica are kept no longer than the tolerated replica lag
+    (see socialnetworkapi.db_router).
+
+    Usage:
+        entry, version = cache.get('post', pk)
+        if entry is None:
+            entry = serialize(...)
+            cache.set('post', pk, version, entry)
+
+    A ``variant`` (e.g. the URL of one page of a list) stores several
+    payloads under one version token, so they are invalidated together.
+    """
+
+    def __init__(self, backend, timeout=60, key_prefix='posts'):
+        self.backend = backend
+        self.timeout = timeout
+        self.key_prefix = f'{key_prefix}:p{PAYLOAD_VERSION}'
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    def _version_key(self, namespace, key):
+        return f'{self.key_prefix}:{namespace}:{key}:version'
+
+    def _current_version(self, namespace, key):
+        version = self.backend.get(self._version_key(namespace, key))
+        if version is None:
+            version = self._new_version(namespace, key)
+        return version
+
+    def _new_version(self, namespace, key):
+        version = uuid.uuid4().hex
+        self.backend.set(self._version_key(namespace, key), version, None)
+        return version
+
+    def get(self, namespace, key, variant=None):
+        """Return ``(payload or None, version)``."""
+        version = self._current_version(namespace, key)
+        payload = self.backend.get(self._payload_key(namespace, key, version, variant))
+        self._count(namespace, payload)
+        return payload, version
+
+    def set(self, namespace, key, version, payload, variant=None):
+        self.backend.set(self._payload_key(namespace, key, version, variant), payload, self._payload_timeout())
+
+    async def aget(self, namespace, key, variant=None):
+        """Async counterpart of get() for async views."""
+        version_key = self._version_key(namespace, key)
+        version = await self.backend.aget(version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            await self.backend.aset(version_key, version, None)
+        payload = await self.backend.aget(self._payload_key(namespace, key, version, variant))
+        self._count(namespace, payload)
+        return payload, version
+
+    async def aset(self, namespace, key, version, payload, variant=None):
+        await self.backend.aset(self._payload_key(namespace, key, version, variant), payload, self._payload_timeout())
+
+    def _payload_timeout(self):
+        if not reading_from_replica():
+            return self.timeout
+        return max_lag() if self.timeout is None else min(self.timeout, max_lag())
+
+    def _payload_key(self, namespace, key, version, variant=None):
+        payload_key = f'{self.key_prefix}:{namespace}:{key}:{version}'
+        if variant is not None:
+            # Hashed so arbitrary variants (URLs) stay valid cache keys.
+            payload_key += ':' + hashlib.sha1(variant.encode('utf-8')).hexdigest()
+        return payload_key
+
+    def _count(self, namespace, payload):
+        with self._lock:
+            if payload is None:
+                self.misses[namespace] += 1
+            else:
+                self.hits[namespace] += 1
+
+    def invalidate(self, namespace, key):
+        self._new_version(namespace, key)
+
+    def stats(self):
+        """Hit/miss counters per namespace since process start."""
+        with self._lock:
+            namespaces = set(self.hits) | set(self.misses)
+            return {
+                namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace]}
+                for namespace in sorted(namespaces)
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide ResponseCache configured by settings.POSTS_CACHE."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = dict(getattr(settings, 'POSTS_CACHE', {}))
+                backend_class = import_string(config.pop('BACKEND', 'posts.cache.LocMemLRUBackend'))
+                timeout = config.pop('TIMEOUT', 60)
+                options = {name.lower(): value for name, value in config.items()}
+                _cache = ResponseCache(backend_class(**options), timeout=timeout)
+    return _cache
+
+
+def invalidate_post(post_id, comments=True):
+    """Drop the cached post payload and, by default, its comment list."""
+    cache = get_response_cache()
+    cache.invalidate('post', post_id)
+    if comments:
+        cache.invalidate('comments', post_id)
+
+
+def invalidate_author(user_id):
+    """
+    Drop the cached payloads that show a user's name: their posts, and the
+    posts they commented on (comment lists and top comment previews).
+    """
+    from .models import Comment, Post
+    post_ids = set(Post.objects.filter(author_id=user_id).values_list('pk', flat=True))
+    post_ids.update(Comment.objects.filter(author_id=user_id).values_list('postId', flat=True).distinct())
+    for post_id in post_ids:
+        invalidate_post(post_id)
+
+
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """post_save receiver for users.User: a rename reaches cached posts and comments."""
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    transaction.on_commit(lambda: invalidate_author(instance.pk))
@@ -0,0 +1,94 @@
+"""
+Read-only fast paths for the post and comment list endpoints.
+
+They produce exactly what PostSerializer and CommentSerializer output, but
+from ``.values()`` rows: no model instances, no per-row field binding or
+source traversal, and a post's tags come aggregated from SQL instead of a
+prefetch. The check_serializer_contract management command compares both
+paths byte for byte.
+"""
+from .images import variant_urls
+from .models import Comment
+
+POST_VALUES = (
+    'id', 'title', 'description', 'author__name', 'created_at', 'tag_names',
+    'imageUrl', 'image_width', 'image_height', 'image_blurhash', 'image_variants',
+    'comment_count', 'likes_total',
+)
+
+COMMENT_VALUES = (
+    'id', 'postId', 'author__name', 'created_at', 'content', 'likes',
+    'updated_at', 'author__updated_at',
+)
+
+
+def post_values(queryset):
+    """``.values()`` rows with everything post_representation() reads."""
+    return queryset.with_tag_names().values(*POST_VALUES)
+
+
+def post_representation(row):
+    """PostSerializer(post).data for a post_values() row."""
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'author': row['author__name'],
+        'date': row['created_at'],
+        'tags': row['tag_names'],
+        'imageUrl': row['imageUrl'],
+        'image_width': row['image_width'],
+        'image_height': row['image_height'],
+        'image_blurhash': row['image_blurhash'],
+        'image_variants': variant_urls(row['image_variants']),
+        'comment_count': row['comment_count'],
+        'likes_total': row['likes_total'],
+    }
+
+
+def post_rows(queryset):
+    """PostSerializer(queryset, many=True).data."""
+    return [post_representation(row) for row in post_values(queryset)]
+
+
+def order_by_ids(rows, ids):
+    """Reorder representations to follow ``ids``; ids without a row are skipped."""
+    by_id = {row['id']: row for row in rows}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def comment_values(queryset, *fields):
+    """
+    ``.values()`` rows with what comment_representation() and the comment
+    list validators read, plus ``fields`` (e.g. a keyset annotation).
+    """
+    return queryset.values(*COMMENT_VALUES, *fields)
+
+
+def comment_representation(row):
+    """CommentSerializer(comment).data for a comment_values() row."""
+    return {
+        'id': row['id'],
+        'postId': row['postId'],
+        'author': row['author__name'],
+        'date': row['created_at'],
+        'content': row['content'],
+        'likes': row['likes'],
+    }
+
+
+def top_comment_rows(post_ids, limit):
+    """
+    ``{post_id: [comment_values() row, ...]}`` with the ``limit`` most liked
+    comments of each post: the fast path of PostQuerySet.with_top_comments(),
+    one query for all the posts.
+    """
+    top = {pk: [] for pk in post_ids}
+    if not post_ids or limit <= 0:
+        return top
+    rows = comment_values(
+        Comment.objects.filter(postId__in=post_ids).top_per_post(limit).order_by('postId', 'position')
+    )
+    for row in rows:
+        top[row['postId']].append(row)
+    return top
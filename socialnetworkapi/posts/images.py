@@ -0,0 +1,208 @@
+"""
+Post image uploads.
+
+POST /api/posts/<pk>/image/ validates the upload, stores the original under
+MEDIA_ROOT and points Post.imageUrl at it; that is all the request waits
+for. Once the transaction commits, the variants (posts.imaging) are
+rendered by a pool of POSTS_IMAGES['WORKERS'] processes, so resizing and
+encoding never hold the GIL of a process serving requests. A single writer
+thread then records the variants, width, height and blurhash on the post
+and drops its cached payload; clients see the variant URLs from then on.
+
+A post whose variants are lost (e.g. the process exited while they were
+being rendered) keeps its original; the process_post_images management
+command renders whatever is missing.
+"""
+import logging
+import os
+import posixpath
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+try:
+    from PIL import Image
+    from . import imaging
+except ImportError:  # pragma: no cover - optional dependency
+    Image = imaging = None
+
+from .cache import invalidate_post
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Accepted upload formats and the extension their originals are stored with.
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+# The Post fields describing an uploaded image.
+IMAGE_FIELDS = ('image_original', 'image_width', 'image_height', 'image_blurhash', 'image_variants')
+
+
+class ImageUploadsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Image uploads are not available on this server.'
+    default_code = 'image_uploads_unavailable'
+
+
+def _config():
+    return settings.POSTS_IMAGES
+
+
+def validate_upload(upload):
+    """
+    Check that ``upload`` is a JPEG, PNG, WebP or GIF image within the size
+    and pixel limits, without decoding it. Returns the extension to store it
+    with; raises ValidationError otherwise.
+    """
+    if Image is None:
+        raise ImageUploadsUnavailable()
+    config = _config()
+    if upload.size > config['MAX_BYTES']:
+        raise ValidationError({'image': [f"Images may be at most {config['MAX_BYTES']} bytes."]})
+    try:
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+            image.verify()
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise ValidationError({'image': ['Upload a valid image.']})
+    finally:
+        upload.seek(0)
+    if image_format not in FORMATS:
+        raise ValidationError({'image': [f"Unsupported image format; use one of {', '.join(FORMATS)}."]})
+    if width * height > config['MAX_PIXELS']:
+        raise ValidationError({'image': [f"Images may have at most {config['MAX_PIXELS']} pixels."]})
+    return FORMATS[image_format]
+
+
+def store_original(post, upload, extension):
+    """Save ``upload`` as a new original of ``post``; returns its storage name."""
+    return default_storage.save(f'posts/{post.pk}/{uuid.uuid4().hex}.{extension}', upload)
+
+
+def image_files(post):
+    """Storage names of the post's uploaded original and its variants."""
+    names = list(post.image_variants.values())
+    if post.image_original:
+        names.append(post.image_original)
+    return names
+
+
+def detach_image(post):
+    """
+    Forget the post's uploaded image (e.g. because imageUrl now points
+    elsewhere) without saving; returns the storage names to delete once the
+    change is committed.
+    """
+    names = image_files(post)
+    post.image_original = post.image_blurhash = ''
+    post.image_width = post.image_height = None
+    post.image_variants = {}
+    return names
+
+
+def delete_files(names):
+    """Remove stored image files; missing ones are ignored."""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete post image %s', name, exc_info=True)
+
+
+def variant_urls(variants):
+    """{variant: URL} for a Post.image_variants value."""
+    return {name: default_storage.url(path) for name, path in variants.items()}
+
+
+_pool = None
+_writer = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process pool that renders variants, started on first use."""
+    global _pool, _writer
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process with open database connections
+                # and running threads is not safe.
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='post-images')
+                _pool = ProcessPoolExecutor(max_workers=_config()['WORKERS'], mp_context=get_context('spawn'))
+    return _pool
+
+
+def render_variants(original):
+    """
+    Start rendering the variants of the stored original ``original``;
+    returns a Future of posts.imaging.process_image()'s result.
+    """
+    global _pool
+    if Image is None:
+        raise ImageUploadsUnavailable()
+    config = _config()
+    path = default_storage.path(original)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    args = (path, os.path.dirname(path), stem, config['VARIANTS'], config['QUALITY'])
+    pool = get_pool()
+    try:
+        return pool.submit(imaging.process_image, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for using too much memory); the pool
+        # refuses all work from then on, so start a new one.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return get_pool().submit(imaging.process_image, *args)
+
+
+def schedule_variants(post_id, original):
+    """Render the variants of ``original`` off the request path and save them on the post."""
+    try:
+        future = render_variants(original)
+    except Exception:
+        # The upload itself succeeded; process_post_images catches up later.
+        logger.exception('Could not schedule the image variants of post %s', post_id)
+        return None
+    future.add_done_callback(lambda done: _writer.submit(_save_rendered, post_id, original, done))
+    return future
+
+
+def _save_rendered(post_id, original, future):
+    try:
+        save_variants(post_id, original, future.result())
+    except Exception:
+        logger.exception('Rendering the image variants of post %s failed', post_id)
+    finally:
+        connection.close()
+
+
+def save_variants(post_id, original, result):
+    """
+    Record a process_image() ``result`` on the post, unless ``original`` has
+    been replaced (or the post deleted) meanwhile; then the files are removed
+    instead. Returns whether the post was updated.
+    """
+    directory = posixpath.dirname(original)
+    variants = {name: posixpath.join(directory, filename) for name, filename in result['variants'].items()}
+    updated = Post.objects.filter(pk=post_id, image_original=original).update(
+        image_width=result['width'],
+        image_height=result['height'],
+        image_blurhash=result['blurhash'],
+        image_variants=variants,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        invalidate_post(post_id, comments=False)
+    else:
+        delete_files(variants.values())
+    return bool(updated)
@@ -0,0 +1,112 @@
+"""
+Image work for post uploads that runs in the image worker processes (see
+posts.images). Only Pillow is imported here, not Django, so a freshly
+spawned worker is ready quickly.
+"""
+import math
+import os
+
+from PIL import Image, ImageOps
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def process_image(source, directory, stem, sizes, quality=80):
+    """
+    Render the variants of the image file ``source`` into ``directory``.
+
+    For every ``name: size`` in ``sizes`` the image is scaled down (never
+    up) to fit a size x size box and saved twice: as JPEG (PNG if it has
+    transparency) under ``name`` and as WebP under ``name_webp``. Returns
+    the original's ``width`` and ``height``, its ``blurhash`` and the
+    ``variants`` as ``{name: file name}``.
+    """
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        width, height = image.size
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    extension, image_format = ('png', 'PNG') if has_alpha else ('jpg', 'JPEG')
+    variants = {}
+    for name, size in sizes.items():
+        scaled = image.copy()
+        scaled.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[name] = f'{stem}_{name}.{extension}'
+        scaled.save(os.path.join(directory, variants[name]), image_format, quality=quality, optimize=True)
+        variants[f'{name}_webp'] = f'{stem}_{name}.webp'
+        scaled.save(os.path.join(directory, variants[f'{name}_webp']), 'WEBP', quality=quality, method=4)
+
+    return {'width': width, 'height': height, 'blurhash': blurhash(image), 'variants': variants}
+
+
+def blurhash(image, x_components=4, y_components=3):
+    """
+    The BlurHash (https://blurha.sh) of ``image``: a short string clients
+    decode into a blurred placeholder while the real image loads. Computed
+    on a 32x32 copy, which is plenty for 4x3 components.
+    """
+    small = image.convert('RGB').resize((32, 32), Image.Resampling.BILINEAR)
+    width, height = small.size
+    data = small.tobytes()
+    pixels = [(_LINEAR[data[k]], _LINEAR[data[k + 1]], _LINEAR[data[k + 2]]) for k in range(0, len(data), 3)]
+
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = pixels[y * width + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, math.floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _base83(0, 1)
+
+    dc_value = (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2])
+    result += _base83(dc_value, 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(_sign_pow(value / max_value, 0.5) * 9 + 9.5))) for value in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def _srgb_to_linear(value):
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+_LINEAR = [_srgb_to_linear(value) for value in range(256)]
+
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def _base83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
@@ -0,0 +1,150 @@
+import atexit
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Now
+
+from .cache import invalidate_post
+from .models import Comment, Post
+
+
+def apply_like_deltas(comment_deltas):
+    """
+    Apply {comment_id: delta} to Comment.likes, and the same deltas to the
+    Post.likes_total of each comment's post, with one UPDATE per table.
+    Returns the ids of the affected posts.
+
+    Comments deleted in the meantime are skipped: deleting a comment
+    already took its stored likes off the post's total.
+    """
+    comment_deltas = {pk: delta for pk, delta in comment_deltas.items() if delta}
+    if not comment_deltas:
+        return set()
+    with transaction.atomic():
+        # Locked, so a concurrent delete either waits for these likes or
+        # has already removed the comment from this flush.
+        posts = dict(
+            Comment.objects.select_for_update().filter(pk__in=comment_deltas).values_list('pk', 'postId')
+        )
+        comment_deltas = {pk: delta for pk, delta in comment_deltas.items() if pk in posts}
+        post_deltas = Counter()
+        for pk, delta in comment_deltas.items():
+            post_deltas[posts[pk]] += delta
+        post_deltas = {pk: delta for pk, delta in post_deltas.items() if delta}
+        if comment_deltas:
+            Comment.objects.filter(pk__in=comment_deltas).update(
+                likes=Coalesce(F('likes'), 0) + _delta_case(comment_deltas),
+                updated_at=Now(),
+            )
+        if post_deltas:
+            Post.objects.filter(pk__in=post_deltas).update(
+                likes_total=F('likes_total') + _delta_case(post_deltas)
+            )
+    return set(posts.values())
+
+
+def _delta_case(deltas):
+    return Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class LikeBuffer:
+    """
+    Write-behind buffer for like counters.
+
+    Hot comments receive many likes per second; instead of one UPDATE per
+    like (all contending for the same row lock) increments are coalesced in
+    memory and flushed as a single UPDATE per table once ``max_pending``
+    comments are dirty or ``flush_interval`` seconds have passed.
+
+    The per-user CommentLike rows are still written synchronously, so only
+    the counters lag. Pending deltas are lost if the process dies before a
+    flush; reconcile_post_counters repairs Post.likes_total from Comment.
+    """
+
+    def __init__(self, flush_interval=1.0, max_pending=500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._comments = Counter()
+        self._timer = None
+
+    def add(self, comment_id, delta):
+        with self._lock:
+            self._comments[comment_id] += delta
+            should_flush = len(self._comments) >= self.max_pending
+            if not should_flush and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if should_flush:
+            self.flush()
+
+    def pending(self, comment_id):
+        with self._lock:
+            return self._comments.get(comment_id, 0)
+
+    def flush(self):
+        with self._lock:
+            comments, self._comments = self._comments, Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for post_id in apply_like_deltas(comments):
+            invalidate_post(post_id)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads are short-lived; don't leak their DB connection.
+            connection.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_like_buffer():
+    """Return the process-wide LikeBuffer, or None when write-behind is off."""
+    global _buffer
+    config = getattr(settings, 'POSTS_LIKE_WRITE_BEHIND', {})
+    if not config.get('ENABLED', False):
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LikeBuffer(
+                flush_interval=config.get('FLUSH_INTERVAL', 1.0),
+                max_pending=config.get('MAX_PENDING', 500),
+            )
+            atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_like(comment, delta):
+    """
+    Count a like (+1) or unlike (-1) on ``comment``: immediately, inside the
+    caller's transaction, or through the write-behind buffer once it commits.
+    """
+    buffer = get_like_buffer()
+    if buffer is None:
+        Comment.objects.filter(pk=comment.pk).update(likes=Coalesce(F('likes'), 0) + delta, updated_at=Now())
+        Post.objects.filter(pk=comment.postId_id).adjust_counters(likes=delta)
+        transaction.on_commit(lambda: invalidate_post(comment.postId_id))
+    else:
+        transaction.on_commit(lambda: buffer.add(comment.pk, delta))
+
+
+def current_likes(comment):
+    """Stored likes plus any increments still waiting in the buffer."""
+    likes = Comment.objects.filter(pk=comment.pk).values_list('likes', flat=True).first() or 0
+    buffer = get_like_buffer()
+    if buffer is not None:
+        likes += buffer.pending(comment.pk)
+    return likes
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from posts.fast_serializers import comment_representation, comment_values, order_by_ids, post_rows, top_comment_rows
+from posts.models import Comment, Post
+from posts.serializers import CommentSerializer, PostSerializer
+from socialnetworkapi.renderers import FastJSONRenderer
+from users.fast_serializers import user_rows
+from users.models import User
+from users.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the .values() fast paths (posts/fast_serializers.py, "
+        "users/fast_serializers.py) and FastJSONRenderer render byte-identical "
+        "JSON to the DRF serializers and JSONRenderer for rows in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000,
+                            help='Rows compared per resource (default: 1000).')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        reference, fast = JSONRenderer(), FastJSONRenderer()
+
+        failures = []
+        for resource, expected, actual in self.samples(limit):
+            expected_bytes = reference.render(expected)
+            rendered = {
+                'fast serializer': reference.render(actual),
+                'FastJSONRenderer': fast.render(expected),
+                'fast serializer + FastJSONRenderer': fast.render(actual),
+            }
+            for path, actual_bytes in rendered.items():
+                if actual_bytes != expected_bytes:
+                    offset = next(
+                        (i for i, (a, b) in enumerate(zip(actual_bytes, expected_bytes)) if a != b),
+                        min(len(actual_bytes), len(expected_bytes)),
+                    )
+                    failures.append(f"{resource}: {path} differs at byte {offset}: "
+                                    f"{actual_bytes[offset:offset + 60]!r} != {expected_bytes[offset:offset + 60]!r}")
+            self.stdout.write(f"{resource}: compared {len(expected)} rows")
+
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS("Fast serializers match the DRF serializers."))
+
+    def samples(self, limit):
+        posts = list(Post.objects.for_listing().order_by('-created_at', '-id')[:limit])
+        post_ids = [post.pk for post in posts]
+        yield (
+            'posts',
+            PostSerializer(posts, many=True).data,
+            order_by_ids(post_rows(Post.objects.filter(pk__in=post_ids)), post_ids),
+        )
+
+        comments = Comment.objects.order_by('postId', 'created_at', 'id')[:limit]
+        yield (
+            'comments',
+            CommentSerializer(comments.select_related('author'), many=True).data,
+            [comment_representation(row) for row in comment_values(comments)],
+        )
+
+        # The post endpoints' ?top_comments preview, flattened across posts.
+        previews = Post.objects.with_top_comments(3).filter(pk__in=post_ids).order_by('-created_at', '-id')
+        top_rows = top_comment_rows(post_ids, 3)
+        yield (
+            'top comments',
+            [comment for post in previews for comment in CommentSerializer(post.top_comments, many=True).data],
+            [comment_representation(row) for pk in post_ids for row in top_rows[pk]],
+        )
+
+        users = User.objects.order_by('pk')[:limit]
+        yield 'users', UserSerializer(users, many=True).data, user_rows(users)
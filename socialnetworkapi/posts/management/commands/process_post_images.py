@@ -0,0 +1,45 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from posts.images import render_variants, save_variants
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the image variants of posts with an uploaded original but "
+        "no variants, e.g. because the process rendering them exited. With "
+        "--all, re-render every uploaded image (after changing "
+        "POSTS_IMAGES VARIANTS or QUALITY). Images are rendered by the "
+        "image worker pool, POSTS_IMAGES WORKERS at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render posts that already have variants too.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the posts that would be processed without rendering anything.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image_original='')
+        if not options['all']:
+            posts = posts.filter(image_variants={})
+        pending = list(posts.order_by('pk').values_list('pk', 'image_original'))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(pending)} posts need their images rendered."))
+            return
+
+        futures = {render_variants(original): (pk, original) for pk, original in pending}
+        saved = failed = 0
+        for future in as_completed(futures):
+            pk, original = futures[future]
+            try:
+                # Skipped when the image was replaced while we rendered.
+                saved += save_variants(pk, original, future.result())
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Post {pk}: {exc}")
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f"Rendered {saved} of {len(pending)} post images, {failed} failed."))
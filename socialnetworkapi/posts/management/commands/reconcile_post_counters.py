@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from posts.cache import invalidate_post
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.comment_count and Post.likes_total from the Comment "
+        "table and fix any rows that have drifted. Posts are processed in "
+        "primary-key batches so the command can run against a live database. "
+        "Fixed posts are dropped from the response cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts checked per transaction (default: 1000).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted posts without updating them.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        comments = Comment.objects.filter(postId=OuterRef('pk')).order_by().values('postId')
+        actual_count = Coalesce(
+            Subquery(comments.annotate(n=Count('id')).values('n'), output_field=IntegerField()),
+            Value(0),
+        )
+        actual_likes = Coalesce(
+            Subquery(comments.annotate(n=Sum('likes')).values('n'), output_field=IntegerField()),
+            Value(0),
+        )
+
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+
+            with transaction.atomic():
+                drifted = list(
+                    Post.objects.filter(pk__in=batch)
+                    .annotate(actual_count=actual_count, actual_likes=actual_likes)
+                    .exclude(comment_count=F('actual_count'), likes_total=F('actual_likes'))
+                    .values_list('pk', flat=True)
+                )
+                if drifted and not dry_run:
+                    Post.objects.filter(pk__in=drifted).update(
+                        comment_count=actual_count,
+                        likes_total=actual_likes,
+                    )
+            if not dry_run:
+                # Cached post payloads carry the counters; comment lists don't.
+                for pk in drifted:
+                    invalidate_post(pk, comments=False)
+            fixed += len(drifted)
+
+        verb = 'would fix' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} posts, {verb} {fixed}."))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Compute the new counters of posts that already have comments, so that
+    deleting one of those comments doesn't take comment_count below zero.
+    """
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.filter(postId=OuterRef('pk')).order_by().values('postId')
+    Post.objects.filter(pk__in=Comment.objects.values('postId')).update(
+        comment_count=Coalesce(
+            Subquery(comments.annotate(n=Count('id')).values('n'), output_field=IntegerField()),
+            Value(0),
+        ),
+        likes_total=Coalesce(
+            Subquery(comments.annotate(n=Sum('likes')).values('n'), output_field=IntegerField()),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_tag_rename_content_post_description_post_imageurl_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
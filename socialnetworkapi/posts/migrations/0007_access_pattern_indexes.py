@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_comment_updated_at'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['postId', 'created_at', 'id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'id'], name='post_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'created_at'], name='post_author_created_idx'),
+        ),
+        # The auto-created Post.tags through table can't declare Meta.indexes.
+        # (tag_id, post_id) lets "posts with tag X" be answered from the index.
+        migrations.RunSQL(
+            sql='CREATE INDEX posts_post_tags_tag_post_idx ON posts_post_tags (tag_id, post_id);',
+            reverse_sql='DROP INDEX posts_post_tags_tag_post_idx;',
+        ),
+    ]
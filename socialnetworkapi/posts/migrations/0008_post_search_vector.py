@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    CREATE FUNCTION posts_post_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER posts_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON posts_post
+    FOR EACH ROW EXECUTE FUNCTION posts_post_search_vector_update();
+    """,
+    """
+    UPDATE posts_post SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B');
+    """,
+    'CREATE INDEX posts_post_search_vector_idx ON posts_post USING gin (search_vector);',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS posts_post_search_vector_idx;',
+    'DROP TRIGGER IF EXISTS posts_post_search_vector_trigger ON posts_post;',
+    'DROP FUNCTION IF EXISTS posts_post_search_vector_update();',
+]
+
+# External-content FTS5 table used as the local/test fallback. Note that
+# SQLite table rebuilds drop triggers; rerun these statements (they end with
+# a 'rebuild') if a later migration has to remake posts_post.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5(
+        title, description, content='posts_post', content_rowid='id', tokenize='porter unicode61'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF title, description ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO posts_post_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END;
+    """,
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild');",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert;',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete;',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update;',
+    'DROP TABLE IF EXISTS posts_post_fts;',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:36
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_search_vector'),
+        ('users', '0002_user_following'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(models.F('postId'), models.OrderBy(django.db.models.functions.comparison.Coalesce('likes', 0), descending=True), models.OrderBy(models.F('id'), descending=True), name='comment_post_top_idx'),
+        ),
+    ]
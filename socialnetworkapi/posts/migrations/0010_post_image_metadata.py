@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+import importlib
+
+from django.db import migrations, models
+
+search_vector = importlib.import_module('posts.migrations.0008_post_search_vector')
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # Unapplying the AddFields below remakes posts_post on SQLite, which
+    # drops the FTS triggers from 0008; this runs last on the way back.
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in search_vector.SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_comment_top_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='image_blurhash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_original',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import importlib
+
+from django.db import migrations
+
+# 0010 added columns with defaults, which SQLite applies by remaking
+# posts_post; that drops the FTS triggers created by 0008. Recreate them
+# (the statements are idempotent) and rebuild the index so posts written
+# in between become searchable.
+search_vector = importlib.import_module('posts.migrations.0008_post_search_vector')
+
+
+def restore_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in search_vector.SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_image_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
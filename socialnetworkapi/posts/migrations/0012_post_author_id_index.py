@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_restore_post_fts_triggers'),
+        ('users', '0003_user_password_hash_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'id'], name='post_author_id_idx'),
+        ),
+    ]
@@ -1,13 +1,117 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.db.models import Count, F, IntegerField, JSONField, Prefetch, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
 from users.models import User
 
 # Create your models here.
+class TagQuerySet(models.QuerySet):
+    def resolve(self, names):
+        """
+        Return a {name: Tag} mapping for the given names, creating the missing
+        ones with a single INSERT.
+
+        ON CONFLICT DO NOTHING lets two writers race on the same new name
+        without failing; the follow-up SELECT picks up whichever row won.
+        """
+        names = set(names)
+        if not names:
+            return {}
+        tags = {tag.name: tag for tag in self.filter(name__in=names)}
+        missing = names - tags.keys()
+        if missing:
+            self.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            tags.update((tag.name, tag) for tag in self.filter(name__in=missing))
+        return tags
+
+    def top(self, limit):
+        """The ``limit`` most used tags with their post counts."""
+        through = Post.tags.through
+        counts = list(
+            through.objects.values('tag_id').annotate(count=Count('post_id')).order_by('-count', 'tag_id')[:limit]
+        )
+        names = dict(self.filter(pk__in=[row['tag_id'] for row in counts]).values_list('pk', 'name'))
+        return [{'name': names[row['tag_id']], 'count': row['count']} for row in counts if row['tag_id'] in names]
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
+    objects = TagQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Load everything PostSerializer reads in a fixed number of queries."""
+        return self.select_related('author').prefetch_related('tags').defer('search_vector')
+
+    def with_tags(self, names, match_all=True):
+        """
+        Posts tagged with every name in ``names`` (or any of them when
+        ``match_all`` is False).
+
+        Both forms are a semi-join against the tag/post through table that is
+        answered from its (tag_id, post_id) index; ALL uses GROUP BY post_id
+        HAVING COUNT(*) = n, so neither needs a DISTINCT over joined rows.
+        """
+        names = set(names)
+        tag_ids = list(Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+        return self.with_tag_ids(tag_ids, len(names), match_all)
+
+    def with_tag_ids(self, tag_ids, wanted, match_all=True):
+        """
+        with_tags() for tag ids that were already looked up (e.g. with the
+        async ORM); ``wanted`` is the number of tag names that were asked for.
+        """
+        if not tag_ids or (match_all and len(tag_ids) < wanted):
+            return self.none()
+
+        matching = Post.tags.through.objects.filter(tag_id__in=tag_ids).values('post_id')
+        if match_all and len(tag_ids) > 1:
+            matching = matching.annotate(matched=Count('tag_id')).filter(matched=len(tag_ids))
+        return self.filter(pk__in=matching.values('post_id'))
+
+    def with_tag_names(self):
+        """
+        Annotate ``tag_names``: the post's tag names sorted by name, as a list
+        built in SQL by a correlated subquery on the (post_id, tag_id) index.
+        """
+        through = Post.tags.through._meta.db_table
+        tag = Tag._meta.db_table
+        post = Post._meta.db_table
+        tags_of_post = (
+            f'FROM "{through}" pt JOIN "{tag}" t ON t.id = pt.tag_id WHERE pt.post_id = "{post}"."id"'
+        )
+        if connection.vendor == 'postgresql':
+            sql = f"SELECT COALESCE(jsonb_agg(t.name ORDER BY t.name), '[]'::jsonb) {tags_of_post}"
+        else:
+            sql = f'SELECT json_group_array(name) FROM (SELECT t.name {tags_of_post} ORDER BY t.name)'
+        return self.annotate(tag_names=RawSQL(sql, [], output_field=JSONField()))
+
+    def versions(self):
+        """Only the columns that post ETags are computed from."""
+        return self.select_related('author').only(
+            'id', 'created_at', 'updated_at', 'comment_count', 'likes_total', 'author__updated_at',
+        )
+
+    def with_top_comments(self, limit):
+        """
+        Prefetch each post's ``limit`` most liked comments into
+        ``post.top_comments``: one query for all the posts, sliced per post
+        with a window function.
+        """
+        top = Comment.objects.with_like_rank().order_by(*Comment.TOP_ORDERING).select_related('author')
+        return self.prefetch_related(Prefetch('comments', queryset=top[:limit], to_attr='top_comments'))
+
+    def adjust_counters(self, comments=0, likes=0):
+        """Apply deltas to the denormalized counters in a single UPDATE."""
+        return self.update(
+            comment_count=F('comment_count') + comments,
+            likes_total=F('likes_total') + likes,
+        )
+
 class Post(models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=200)
@@ -15,12 +119,90 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='authored_posts')
     tags = models.ManyToManyField(Tag, blank=True)
     imageUrl = models.CharField(max_length=255, blank=True, null=True)
+    # An image uploaded to /api/posts/<pk>/image/ (see posts.images): the
+    # storage name of the original, and once the image workers are done its
+    # dimensions, blurhash and {variant: storage name} map.
+    image_original = models.CharField(max_length=255, blank=True, default='')
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_blurhash = models.CharField(max_length=64, blank=True, default='')
+    image_variants = JSONField(default=dict, blank=True)
+    # Denormalized from Comment; maintained by the comment views and
+    # repaired by the reconcile_post_counters management command.
+    comment_count = models.PositiveIntegerField(default=0)
+    likes_total = models.IntegerField(default=0)
+    # Weighted tsvector over title (A) and description (B), kept current by
+    # a database trigger and GIN-indexed on PostgreSQL. On SQLite it stays
+    # empty and posts.search uses the posts_post_fts FTS5 table instead.
+    # See migration 0008_post_search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the feed: ORDER BY created_at DESC, id DESC.
+            models.Index(fields=['created_at', 'id'], name='post_created_id_idx'),
+            # A user's posts, newest first.
+            models.Index(fields=['author', 'created_at'], name='post_author_created_idx'),
+            # A user's posts by id, as the home feed reads them (feed.fanout).
+            models.Index(fields=['author', 'id'], name='post_author_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    def set_tags(self, names, is_new=False):
+        """
+        Make the post's tags exactly ``names`` by diffing against the current
+        through-table rows, so unchanged tags cost no writes.
+        """
+        through = Post.tags.through
+        wanted = {tag.pk for tag in Tag.objects.resolve(names).values()}
+        current = set() if is_new else set(
+            through.objects.filter(post=self).values_list('tag_id', flat=True)
+        )
+
+        stale = current - wanted
+        if stale:
+            through.objects.filter(post=self, tag_id__in=stale).delete()
+        added = wanted - current
+        if added:
+            through.objects.bulk_create(
+                [through(post=self, tag_id=tag_id) for tag_id in added],
+                ignore_conflicts=True,
+            )
+
+class CommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Load everything CommentSerializer reads in a single query."""
+        return self.select_related('author')
+
+    def with_like_rank(self):
+        """
+        Annotate ``like_rank``: likes with NULL counted as 0, the expression
+        comment_post_top_idx is built on.
+
+        The 0 is written into the SQL rather than bound as a parameter: an
+        index on an expression is only used for queries that spell out the
+        same expression, and SQLite can't match a parameter to its literal.
+        """
+        return self.annotate(like_rank=Coalesce('likes', RawSQL('0', [], output_field=IntegerField())))
+
+    def top_per_post(self, limit):
+        """The ``limit`` most liked comments of every post in the queryset."""
+        return (
+            self.with_like_rank()
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('postId'),
+                order_by=[F(field.lstrip('-')).desc() for field in Comment.TOP_ORDERING],
+            ))
+            .filter(position__lte=limit)
+        )
+
 class Comment(models.Model):
     id = models.AutoField(primary_key=True)
     postId = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -28,6 +210,44 @@ class Comment(models.Model):
     content = models.TextField()
     likes = models.IntegerField(default=0, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    # Keyset orderings of the comment list sort modes. "top" orders by
+    # CommentQuerySet.with_like_rank()'s annotation.
+    ORDERINGS = {
+        'oldest': ('created_at', 'id'),
+        'newest': ('-created_at', '-id'),
+        'top': ('-like_rank', '-id'),
+    }
+    TOP_ORDERING = ORDERINGS['top']
+
+    class Meta:
+        indexes = [
+            # comment_list sort=oldest|newest: WHERE "postId_id" = %s
+            # ORDER BY created_at, id (scanned backwards for newest).
+            models.Index(fields=['postId', 'created_at', 'id'], name='comment_post_created_idx'),
+            # comment_list sort=top and the top comments preview:
+            # ORDER BY COALESCE(likes, 0) DESC, id DESC per post.
+            models.Index(
+                F('postId'), Coalesce('likes', 0).desc(), F('id').desc(), name='comment_post_top_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.postId}"
+
+class CommentLike(models.Model):
+    """One row per (comment, user); makes liking idempotent per user."""
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='like_set')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_likes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['comment', 'user'], name='unique_comment_like'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} likes {self.comment_id}"
@@ -0,0 +1,186 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed tuple of ordering fields.
+
+    Unlike OFFSET pagination every page is fetched with a range predicate on
+    the ordering columns, e.g. ``(created_at, id) < (:created_at, :id)``, so
+    the database can walk an index instead of skipping rows, and rows inserted
+    while a client is paging never shift or duplicate entries.
+
+    The cursor is an opaque urlsafe-base64 token holding the ordering values of
+    the boundary row and the paging direction. Rows may be model instances or
+    ``.values()`` dicts; annotations can be ordered on like fields.
+
+    Query parameters:
+    - cursor: string (optional) - Token taken from ``next`` or ``previous``
+    - page_size: integer (optional) - Number of items per page
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None, page_size=None, max_page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = page_size or getattr(settings, 'POSTS_PAGE_SIZE', 20)
+        self.max_page_size = max_page_size or getattr(settings, 'POSTS_MAX_PAGE_SIZE', 100)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, values, reverse = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset), values, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of paginate_queryset for async views."""
+        queryset, values, reverse = self._page_queryset(queryset, request)
+        return self._set_page([obj async for obj in queryset], values, reverse)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            values, reverse = None, False
+        else:
+            values, reverse = cursor
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(_seek_filter(ordering, values))
+
+        # Fetch one extra row to find out whether another page follows.
+        return queryset[:self.page_size + 1], values, reverse
+
+    def _set_page(self, results, values, reverse):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        token = self.encode_cursor(obj, reverse)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, obj, reverse):
+        values = [_dump_value(_field_value(obj, field.lstrip('-'))) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = [_load_value(value) for value in payload['v']]
+            reverse = bool(payload.get('r', 0))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+
+def _field_value(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def _invert(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+def _seek_filter(ordering, values):
+    """
+    Expand a row comparison into an index-friendly OR of prefixes:
+    (a, b) < (x, y)  =>  a < x OR (a = x AND b < y)
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    raise ValueError('Unsupported cursor value')
@@ -0,0 +1,103 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import NotSupportedError, connection
+from django.db.models import F, FloatField, TextField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+SEARCH_CONFIG = 'english'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+# bm25() column weights mirroring the A/B setweight() of the tsvector.
+FTS5_WEIGHTS = (1.0, 0.4)
+
+
+def search_posts(query, queryset=None):
+    """
+    Full-text search over post titles and descriptions.
+
+    Returns ``queryset`` (default: all posts) filtered to matches and
+    annotated with ``rank`` (higher is better; title hits weigh more than
+    description hits) and ``headline`` (a description snippet with matches
+    wrapped in <mark>). PostgreSQL uses the GIN-indexed ``search_vector``
+    column; SQLite falls back to the posts_post_fts FTS5 table, with the
+    query syntax translated by _fts5_query().
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, query)
+    if connection.vendor == 'sqlite':
+        return _sqlite_search(queryset, query)
+    raise NotSupportedError(f'Full-text search is not available on {connection.vendor}.')
+
+
+def _postgres_search(queryset, query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query, cover_density=True),
+        headline=SearchHeadline(
+            'description', search_query, config=SEARCH_CONFIG,
+            start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, max_words=35, min_words=15,
+        ),
+    )
+
+
+# A websearch_to_tsquery() token: an optionally negated "quoted phrase"
+# (the closing quote may be missing) or bare word.
+_WEBSEARCH_TOKEN = re.compile(r'(-?)(?:"([^"]*)"?|([^\s"]+))')
+
+
+def _fts5_query(query):
+    """
+    Translate websearch_to_tsquery() syntax into an FTS5 query: words are
+    ANDed, "quoted phrases" match as phrases, ``or`` separates alternatives
+    and a leading ``-`` excludes a word or phrase. Every word is quoted so
+    user input can't trip FTS5 query syntax. FTS5 can't express a bare
+    exclusion, so an alternative made only of exclusions is dropped.
+    """
+    alternatives = [([], [])]
+    for minus, phrase, word in _WEBSEARCH_TOKEN.findall(query):
+        if not minus and word.lower() == 'or':
+            alternatives.append(([], []))
+            continue
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            included, excluded = alternatives[-1]
+            (excluded if minus else included).append('"%s"' % ' '.join(words))
+
+    clauses = []
+    for included, excluded in alternatives:
+        if not included:
+            continue
+        clause = ' AND '.join(included)
+        if excluded:
+            clause = f'({clause}) NOT ({" OR ".join(excluded)})'
+        clauses.append(f'({clause})')
+    return ' OR '.join(clauses)
+
+
+def _sqlite_search(queryset, query):
+    match = _fts5_query(query)
+    if not match:
+        return queryset.annotate(rank=Value(0.0), headline=Value('')).none()
+    table = Post._meta.db_table
+    weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+    # Join the FTS table so the MATCH runs once and bm25()/snippet() are
+    # computed on its rows, rather than re-running it per hit in correlated
+    # subqueries.
+    return queryset.extra(
+        tables=['posts_post_fts'],
+        where=['posts_post_fts MATCH %s', f'posts_post_fts.rowid = "{table}"."id"'],
+        params=[match],
+    ).annotate(
+        # bm25() is lower-is-better; negate it to match ts_rank's direction.
+        rank=RawSQL(f'-bm25(posts_post_fts, {weights})', [], output_field=FloatField()),
+        headline=RawSQL(
+            f"snippet(posts_post_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 24)",
+            [], output_field=TextField(),
+        ),
+    )
@@ -1,4 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
+from socialnetworkapi.metrics import TimedListSerializer, TimedSerializerMixin
+from .images import IMAGE_FIELDS, delete_files, detach_image, variant_urls
 from .models import Post, Comment, Tag
 from users.models import User
 
@@ -7,27 +10,43 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ['name']
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.name')
     date = serializers.ReadOnlyField(source='created_at')
     tags = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'description', 'author', 'date', 'tags', 'imageUrl']
-        read_only_fields = ['id', 'date', 'author']
+        fields = ['id', 'title', 'description', 'author', 'date', 'tags', 'imageUrl',
+                  'image_width', 'image_height', 'image_blurhash', 'image_variants',
+                  'comment_count', 'likes_total']
+        read_only_fields = ['id', 'date', 'author', 'image_width', 'image_height', 'image_blurhash',
+                            'comment_count', 'likes_total']
+        list_serializer_class = TimedListSerializer
 
     def get_tags(self, obj):
-        return [tag.name for tag in obj.tags.all()]
+        # Served from the prefetch cache when the queryset uses for_listing().
+        # Sorted so the output matches PostQuerySet.with_tag_names().
+        return sorted(tag.name for tag in obj.tags.all())
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Posts loaded with PostQuerySet.with_top_comments() carry a preview.
+        top_comments = getattr(instance, 'top_comments', None)
+        if top_comments is not None:
+            data['top_comments'] = CommentSerializer(top_comments, many=True).data
+        return data
 
     def create(self, validated_data):
         tags_data = self.context.get('request').data.get('tags', [])
-        post = Post.objects.create(**validated_data)
 
-        # Handle tags
-        for tag_name in tags_data:
-            tag, created = Tag.objects.get_or_create(name=tag_name)
-            post.tags.add(tag)
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+            post.set_tags(tags_data, is_new=True)
 
         return post
 
@@ -37,18 +56,35 @@ class PostSerializer(serializers.ModelSerializer):
         # Update Post fields
         instance.title = validated_data.get('title', instance.title)
         instance.description = validated_data.get('description', instance.description)
-        instance.imageUrl = validated_data.get('imageUrl', instance.imageUrl)
-        instance.save()
+        image_url = validated_data.get('imageUrl', instance.imageUrl)
+        stale_images = []
+        if image_url != instance.imageUrl and instance.image_original:
+            # The uploaded image is no longer the post's image.
+            stale_images = detach_image(instance)
+        instance.imageUrl = image_url
 
-        # Handle tags
-        instance.tags.clear()
-        for tag_name in tags_data:
-            tag, created = Tag.objects.get_or_create(name=tag_name)
-            instance.tags.add(tag)
+        # Leave the counters and image variants alone: comments, likes and
+        # the image workers may have changed them since the post was read.
+        fields = ['title', 'description', 'imageUrl', 'updated_at']
+        if stale_images:
+            fields += IMAGE_FIELDS
+        with transaction.atomic():
+            instance.save(update_fields=fields)
+            instance.set_tags(tags_data)
+            if stale_images:
+                transaction.on_commit(lambda: delete_files(stale_images))
 
         return instance
 
-class CommentSerializer(serializers.ModelSerializer):
+class PostSearchResultSerializer(PostSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['rank', 'headline']
+        read_only_fields = fields
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.name')
     date = serializers.ReadOnlyField(source='created_at')
 
@@ -56,3 +92,27 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'postId', 'author', 'date', 'content', 'likes']
         read_only_fields = ['id', 'date', 'author']
+        list_serializer_class = TimedListSerializer
+
+class CommentUpdateSerializer(CommentSerializer):
+    """A comment as edited with PUT; likes only change through comment_like."""
+
+    class Meta(CommentSerializer.Meta):
+        read_only_fields = CommentSerializer.Meta.read_only_fields + ['likes']
+
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Write only the edited columns: the likes read with the instance
+        # may be behind concurrent likes.
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+class PostBatchItemSerializer(PostSerializer):
+    """A post in a batch request; its tags are part of the item."""
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+
+class CommentBatchItemSerializer(CommentSerializer):
+    # A plain id: existence is checked for the whole batch with one query
+    # instead of one lookup per item.
+    postId = serializers.IntegerField()
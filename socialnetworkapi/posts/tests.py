@@ -1,3 +1,1059 @@
-from django.test import TestCase
+import os
+import tempfile
+from concurrent.futures import Future
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User as Account
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from . import images
+from .cache import get_response_cache
+from .likes import LikeBuffer, record_like
+from .models import Comment, Post, Tag, TagQuerySet
+from .pagination import KeysetPagination
+
+try:
+    from PIL import Image
+    from . import imaging
+except ImportError:  # Pillow is optional, see posts.images
+    Image = imaging = None
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        # The response cache outlives each test's rolled back transaction,
+        # and primary keys are reused.
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+
+
+def seed(posts, tags_per_post, comments_per_post):
+    """Posts by different authors, each with tags and comments by different users."""
+    users = [User.objects.create(name=f'user {i}', age=20 + i) for i in range(5)]
+    created = []
+    for i in range(posts):
+        post = Post.objects.create(title=f'Post {i}', description='text', author=users[i % len(users)])
+        post.set_tags([f'tag {j}' for j in range(tags_per_post)], is_new=True)
+        Comment.objects.bulk_create(
+            Comment(postId=post, author=users[j % len(users)], content=f'comment {j}')
+            for j in range(comments_per_post)
+        )
+        created.append(post)
+    return created
+
+
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='author', age=30)
+        self.post = Post.objects.create(title='Post', description='text', author=self.author)
+        self.comment = Comment.objects.create(postId=self.post, author=self.author, content='comment', likes=0)
+        self.urls = {
+            'post list': '/api/posts/',
+            'post detail': f'/api/posts/{self.post.pk}/',
+            'post preview': f'/api/posts/{self.post.pk}/?top_comments=2',
+            'comment list': f'/api/posts/{self.post.pk}/comments/',
+            'comment detail': f'/api/posts/{self.post.pk}/comments/{self.comment.pk}/',
+        }
+
+    def etags(self):
+        etags = {}
+        for name, url in self.urls.items():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertIn('Last-Modified', response, name)
+            etags[name] = response['ETag']
+        return etags
+
+    def assertRevalidates(self, etags, expected_status):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, expected_status)
+                if expected_status == 304:
+                    self.assertEqual(response.content, b'')
+
+    def test_matching_etag_answers_304(self):
+        etags = self.etags()
+        # Both from the database and from the response cache.
+        self.assertRevalidates(etags, 304)
+        get_response_cache().backend.clear()
+        self.assertRevalidates(etags, 304)
+
+    def test_matching_last_modified_answers_304(self):
+        response = self.client.get(self.urls['post detail'])
+
+        revalidated = self.client.get(self.urls['post detail'], HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_like_changes_every_validator(self):
+        etags = self.etags()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.pk}/comments/{self.comment.pk}/like/')
+
+        self.assertRevalidates(etags, 200)
+
+    def test_comment_changes_post_and_comment_list_validators(self):
+        etags = self.etags()
+
+        response = self.client.post(
+            f'/api/posts/{self.post.pk}/comments/', {'postId': self.post.pk, 'content': 'another'}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+        for name in ('post list', 'post detail', 'comment list'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(self.urls[name], HTTP_IF_NONE_MATCH=etags[name]).status_code, 200)
+        self.assertEqual(
+            self.client.get(self.urls['comment detail'], HTTP_IF_NONE_MATCH=etags['comment detail']).status_code, 304,
+        )
+
+    def test_edits_change_the_validators(self):
+        etags = self.etags()
+        response = self.client.put(self.urls['post detail'], {'title': 'Edited', 'description': 'text'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for name in ('post list', 'post detail'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(self.urls[name], HTTP_IF_NONE_MATCH=etags[name]).status_code, 200)
+
+        etags = self.etags()
+        response = self.client.put(
+            self.urls['comment detail'], {'postId': self.post.pk, 'content': 'edited'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        for name in ('post preview', 'comment list', 'comment detail'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(self.urls[name], HTTP_IF_NONE_MATCH=etags[name]).status_code, 200)
+
+    def test_author_rename_changes_the_validators(self):
+        etags = self.etags()
+
+        self.author.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+
+        self.assertRevalidates(etags, 200)
+
+
+class TagTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create(name='author', age=30)
+        self.posts = {}
+        for title, tags in (('both', ['x', 'y']), ('x', ['x']), ('yz', ['y', 'z']), ('none', [])):
+            self.posts[title] = Post.objects.create(title=title, description='text', author=author)
+            self.posts[title].set_tags(tags, is_new=True)
+
+    def titles(self, queryset):
+        return sorted(queryset.values_list('title', flat=True))
+
+    def test_match_all_and_any(self):
+        cases = [
+            (['x', 'y'], True, ['both']),
+            (['x', 'y'], False, ['both', 'x', 'yz']),
+            (['x', 'x'], True, ['both', 'x']),
+            (['x', 'missing'], True, []),
+            (['x', 'missing'], False, ['both', 'x']),
+            (['missing'], False, []),
+            (['x', 'y', 'z'], True, []),
+        ]
+        for names, match_all, expected in cases:
+            with self.subTest(names=names, match_all=match_all):
+                self.assertEqual(self.titles(Post.objects.with_tags(names, match_all=match_all)), expected)
+
+    def test_tag_filter_on_the_post_list(self):
+        def titles(params):
+            response = self.client.get('/api/posts/', params)
+            self.assertEqual(response.status_code, 200)
+            return sorted(post['title'] for post in response.json()['results'])
+
+        self.assertEqual(titles({'tag': ['x', 'y']}), ['both'])
+        self.assertEqual(titles({'tag': ['x', 'y'], 'tag_match': 'any'}), ['both', 'x', 'yz'])
+        self.assertEqual(self.client.get('/api/posts/', {'tag': 'x', 'tag_match': 'some'}).status_code, 400)
+
+    def test_set_tags_diffs_against_the_current_tags(self):
+        post = self.posts['both']
+        kept = Post.tags.through.objects.get(post=post, tag__name='x').pk
+
+        post.set_tags(['x', 'new'])
+
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)), ['new', 'x'])
+        self.assertTrue(Post.tags.through.objects.filter(pk=kept).exists())
+
+    def test_resolve_creates_missing_tags_once(self):
+        tags = Tag.objects.resolve(['x', 'fresh', 'fresh'])
+
+        self.assertEqual(sorted(tags), ['fresh', 'x'])
+        self.assertEqual(tags['x'], Tag.objects.get(name='x'))
+        self.assertEqual(Tag.objects.filter(name='fresh').count(), 1)
+        self.assertEqual(Tag.objects.resolve([]), {})
+
+    def test_resolve_picks_up_a_tag_inserted_concurrently(self):
+        bulk_create = TagQuerySet.bulk_create
+        winners = []
+
+        def racing_bulk_create(queryset, objs, **kwargs):
+            # Another writer inserts the same name between our SELECT and INSERT.
+            winners.append(Tag.objects.create(name='race'))
+            return bulk_create(queryset, objs, **kwargs)
+
+        with mock.patch.object(TagQuerySet, 'bulk_create', autospec=True, side_effect=racing_bulk_create):
+            tags = Tag.objects.resolve(['race', 'fresh'])
+
+        self.assertEqual(tags['race'].pk, winners[0].pk)
+        self.assertEqual(Tag.objects.filter(name='race').count(), 1)
+        self.assertIsNotNone(tags['fresh'].pk)
+
+    def test_top_tags(self):
+        self.posts['yz'].set_tags(['x', 'y', 'z'])
+
+        self.assertEqual(self.client.get('/api/tags/top/', {'limit': 2}).json(), [
+            {'name': 'x', 'count': 3}, {'name': 'y', 'count': 2},
+        ])
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create(name='author', age=30)
+        self.posts = [Post.objects.create(title=f'Post {i}', description='text', author=author) for i in range(7)]
+        # Posts 1-4 share a timestamp, so only the id breaks their tie.
+        tied = self.posts[1].created_at
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[1:5]]).update(created_at=tied)
+        self.newest_first = [post.pk for post in sorted(
+            Post.objects.all(), key=lambda post: (post.created_at, post.pk), reverse=True,
+        )]
+
+    def page(self, url='/api/posts/', **params):
+        response = self.client.get(url, params or None)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [post['id'] for post in data['results']], data['next'], data['previous']
+
+    def test_forward_paging_visits_every_post_once_in_order(self):
+        seen, url, params = [], '/api/posts/', {'page_size': 3}
+        while url:
+            ids, url, _ = self.page(url, **params)
+            seen += ids
+            params = {}
+
+        self.assertEqual(seen, self.newest_first)
+
+    def test_backward_paging_returns_the_previous_pages(self):
+        first, next_url, previous = self.page(page_size=3)
+        self.assertIsNone(previous)
+        second, next_url, _ = self.page(next_url)
+        third, next_url, previous = self.page(next_url)
+        self.assertIsNone(next_url)
+        self.assertEqual(first + second + third, self.newest_first)
+
+        ids, next_url, previous = self.page(previous)
+        self.assertEqual(ids, second)
+        self.assertIsNotNone(next_url)
+        ids, _, previous = self.page(previous)
+        self.assertEqual(ids, first)
+        self.assertIsNone(previous)
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        post = Post.objects.get(pk=self.posts[2].pk)
+        token = paginator.encode_cursor(post, reverse=True)
+
+        request = APIRequestFactory().get('/api/posts/', {'cursor': token})
+        values, reverse = paginator.decode_cursor(Request(request))
+
+        self.assertEqual((values, reverse), ([post.created_at, post.pk], True))
+
+    def test_rows_inserted_while_paging_do_not_shift_pages(self):
+        first, next_url, _ = self.page(page_size=3)
+        Post.objects.create(title='Newer', description='text', author=self.posts[0].author)
+
+        second, _, _ = self.page(next_url)
+
+        self.assertEqual(first + second, self.newest_first[:6])
+
+    def test_malformed_cursors_are_rejected(self):
+        valid = KeysetPagination().encode_cursor(self.posts[0], reverse=False)
+        for cursor in ('garbage!', 'e30', valid[:-4], 'eyJ2IjpbMV0sInIiOjB9', 'eyJ2IjpbW10sMV0sInIiOjB9'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/posts/', {'cursor': cursor}).status_code, 404)
+
+    def test_page_size_is_bounded(self):
+        self.assertEqual(len(self.page(page_size=0)[0]), 7)
+        with self.settings(POSTS_MAX_PAGE_SIZE=2):
+            self.assertEqual(len(self.page(page_size=50)[0]), 2)
+
+
+class IndexTests(TestCase):
+    """
+    The indexes of migrations 0007, 0009 and 0012 exist and the listing,
+    author and top-comments queries can use them.
+    """
+    INDEXES = {
+        Post: ['post_created_id_idx', 'post_author_created_idx', 'post_author_id_idx'],
+        Comment: ['comment_post_created_idx', 'comment_post_top_idx'],
+        Post.tags.through: ['posts_post_tags_tag_post_idx'],
+    }
+
+    def test_indexes_exist(self):
+        with connection.cursor() as cursor:
+            for model, names in self.INDEXES.items():
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                for name in names:
+                    with self.subTest(name):
+                        self.assertTrue(constraints[name]['index'])
+
+    def assertUsesIndex(self, queryset, name):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # The tables are tiny; make the planner show what it can use.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn(name, plan)
+
+    def test_queries_use_the_indexes(self):
+        author = User.objects.create(name='author', age=30)
+        post = Post.objects.create(title='Post', description='text', author=author)
+        tag = Tag.objects.create(name='tag')
+        cases = [
+            (Post.objects.order_by(*KeysetPagination.ordering)[:20], 'post_created_id_idx'),
+            (Post.objects.filter(author=author).order_by('-created_at')[:20], 'post_author_created_idx'),
+            (Post.objects.filter(author=author).order_by('-id')[:20], 'post_author_id_idx'),
+            (Comment.objects.filter(postId=post).order_by(*Comment.ORDERINGS['oldest'])[:20],
+             'comment_post_created_idx'),
+            (Comment.objects.filter(postId=post).with_like_rank().order_by(*Comment.TOP_ORDERING)[:20],
+             'comment_post_top_idx'),
+            (Post.tags.through.objects.filter(tag=tag).values('post_id'), 'posts_post_tags_tag_post_idx'),
+        ]
+        for queryset, name in cases:
+            with self.subTest(name):
+                self.assertUsesIndex(queryset, name)
+
+
+class QueryCountTests(APITestCase):
+    """
+    The read endpoints issue a fixed number of queries however many posts,
+    tags and comments a page holds (no N+1). Each request is cold: the
+    response cache is cleared first.
+    """
+    SIZES = ((2, 1, 1), (25, 6, 30))
+
+    def assertQueriesPerSize(self, expected, url, params=lambda size: {}):
+        for posts, tags, comments in self.SIZES:
+            with self.subTest(posts=posts, tags=tags, comments=comments):
+                Post.objects.all().delete()
+                Tag.objects.all().delete()
+                seeded = seed(posts, tags, comments)
+                get_response_cache().backend.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url(seeded[-1]), params(posts))
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_list(self):
+        self.assertQueriesPerSize(2, lambda post: '/api/posts/', lambda size: {'page_size': size})
+
+    def test_post_detail(self):
+        self.assertQueriesPerSize(3, lambda post: f'/api/posts/{post.pk}/')
+
+    def test_comment_list(self):
+        self.assertQueriesPerSize(
+            1, lambda post: f'/api/posts/{post.pk}/comments/', lambda size: {'page_size': size},
+        )
+
+
+class SerializerContractTests(TestCase):
+    """The .values() fast paths and FastJSONRenderer render the same bytes as DRF."""
+
+    def test_edge_case_posts_and_comments(self):
+        author = User.objects.create(name='Zoë Ωmega 😀', age=30)
+        nameless = User.objects.create(name='', age=0)
+        untagged = Post.objects.create(title='No tags', description='', author=author, imageUrl=None)
+        tagged = Post.objects.create(
+            title='Ünïcödé — "quotes" \\ and \u2028 separators', description='日本語のテキスト\n改行',
+            author=nameless, imageUrl='https://example.com/ü.png',
+        )
+        tagged.set_tags(['python', 'café', 'データ', 'with space'], is_new=True)
+        Comment.objects.create(postId=tagged, author=author, content='😀 emoji', likes=None)
+        Comment.objects.create(postId=tagged, author=nameless, content='', likes=0)
+        Comment.objects.create(postId=untagged, author=author, content='<script>&amp;</script>', likes=-3)
+
+        out = StringIO()
+        call_command('check_serializer_contract', stdout=out)
+
+        self.assertIn('posts: compared 2 rows', out.getvalue())
+        self.assertIn('comments: compared 3 rows', out.getvalue())
+
+
+class ReconcilePostCountersTests(APITestCase):
+    def test_fixed_posts_are_invalidated(self):
+        author = User.objects.create(name='author', age=30)
+        post = Post.objects.create(title='Post', description='text', author=author)
+        Comment.objects.create(postId=post, author=author, content='comment', likes=4)
+        Post.objects.filter(pk=post.pk).update(comment_count=0, likes_total=0)
+        self.assertEqual(self.client.get(f'/api/posts/{post.pk}/').json()['comment_count'], 0)
+
+        call_command('reconcile_post_counters', stdout=StringIO())
+
+        payload = self.client.get(f'/api/posts/{post.pk}/').json()
+        self.assertEqual((payload['comment_count'], payload['likes_total']), (1, 4))
+
+
+class AuthorRenameTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='old name', age=30)
+        other = User.objects.create(name='other', age=30)
+        self.own = Post.objects.create(title='Own', description='text', author=self.author)
+        self.commented = Post.objects.create(title='Commented', description='text', author=other)
+        Comment.objects.create(postId=self.commented, author=self.author, content='comment', likes=1)
+
+    def payloads(self):
+        return (
+            self.client.get(f'/api/posts/{self.own.pk}/').json()['author'],
+            self.client.get(f'/api/posts/{self.commented.pk}/comments/').json()['results'][0]['author'],
+            self.client.get(f'/api/posts/{self.commented.pk}/', {'top_comments': 1}).json()['top_comments'][0]['author'],
+        )
+
+    def test_rename_reaches_cached_posts_and_comments(self):
+        self.assertEqual(self.payloads(), ('old name',) * 3)
+
+        self.author.name = 'new name'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+
+        self.assertEqual(self.payloads(), ('new name',) * 3)
+
+    def test_saves_that_keep_the_name_keep_the_cache(self):
+        self.payloads()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.author.save(update_fields=['age'])
+
+        self.assertEqual(callbacks, [])
+
+
+class CommentLikeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = User.objects.create(name='first', age=30)
+        self.second = User.objects.create(name='second', age=31)
+        self.post = Post.objects.create(title='Post', description='text', author=self.first)
+        self.comment = Comment.objects.create(postId=self.post, author=self.first, content='comment', likes=None)
+        self.url = f'/api/posts/{self.post.pk}/comments/{self.comment.pk}/like/'
+
+    def assertLikes(self, likes, likes_total):
+        self.comment.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual((self.comment.likes, self.post.likes_total), (likes, likes_total))
+
+    def test_like_and_unlike_once_per_user(self):
+        responses = [
+            self.client.post(self.url, {'userId': self.first.pk}, format='json'),
+            self.client.post(self.url, {'userId': self.first.pk}, format='json'),
+            self.client.post(self.url, {'userId': self.second.pk}, format='json'),
+        ]
+        self.assertEqual([response.json() for response in responses], [
+            {'liked': True, 'likes': 1}, {'liked': True, 'likes': 1}, {'liked': True, 'likes': 2},
+        ])
+        self.assertLikes(2, 2)
+
+        responses = [
+            self.client.delete(self.url, {'userId': self.first.pk}, format='json'),
+            self.client.delete(self.url, {'userId': self.first.pk}, format='json'),
+        ]
+        self.assertEqual([response.json() for response in responses], [
+            {'liked': False, 'likes': 1}, {'liked': False, 'likes': 1},
+        ])
+        self.assertLikes(1, 1)
+
+    def test_user_defaults_to_first_user(self):
+        self.client.post(self.url)
+
+        self.assertTrue(self.comment.like_set.filter(user=self.first).exists())
+
+    def test_unknown_user_or_comment(self):
+        self.assertEqual(self.client.post(self.url, {'userId': 999}, format='json').status_code, 404)
+        self.assertEqual(
+            self.client.post(f'/api/posts/{self.post.pk}/comments/999/like/').status_code, 404,
+        )
+        self.assertLikes(None, 0)
+
+    def test_like_shows_in_cached_post(self):
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.pk}/').json()['likes_total'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url)
+
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.pk}/').json()['likes_total'], 1)
+
+    def test_put_cannot_overwrite_likes(self):
+        self.client.post(self.url, {'userId': self.first.pk}, format='json')
+        stale = self.client.get(f'/api/posts/{self.post.pk}/comments/{self.comment.pk}/').json()
+        self.client.post(self.url, {'userId': self.second.pk}, format='json')
+
+        response = self.client.put(
+            f'/api/posts/{self.post.pk}/comments/{self.comment.pk}/',
+            {**stale, 'content': 'edited', 'likes': 0}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLikes(2, 2)
+        self.assertEqual(self.comment.content, 'edited')
+
+
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='author', age=30)
+        self.post = Post.objects.create(title='Post', description='text', author=self.author)
+        self.comments = Comment.objects.bulk_create(
+            Comment(postId=self.post, author=self.author, content=f'comment {i}', likes=1) for i in range(3)
+        )
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3, likes_total=3)
+        # Long enough that the timer never flushes during a test.
+        self.buffer = LikeBuffer(flush_interval=60, max_pending=3)
+        self.addCleanup(self.buffer.flush)
+
+    def likes(self):
+        return (
+            [comment.likes for comment in Comment.objects.order_by('pk')],
+            Post.objects.get(pk=self.post.pk).likes_total,
+        )
+
+    def test_flush_applies_coalesced_deltas(self):
+        first, second, _ = self.comments
+        for comment, delta in ((first, 1), (first, 1), (second, 1), (second, -1)):
+            self.buffer.add(comment.pk, delta)
+        self.assertEqual(self.buffer.pending(first.pk), 2)
+        self.assertEqual(self.likes(), ([1, 1, 1], 3))
+
+        self.buffer.flush()
+
+        self.assertEqual(self.buffer.pending(first.pk), 0)
+        self.assertEqual(self.likes(), ([3, 1, 1], 5))
+
+    def test_flush_skips_deleted_comments(self):
+        first, second, _ = self.comments
+        self.buffer.add(first.pk, 1)
+        self.buffer.add(second.pk, 1)
+        response = self.client.delete(f'/api/posts/{self.post.pk}/comments/{second.pk}/')
+        self.assertEqual(response.status_code, 204)
+
+        self.buffer.flush()
+
+        self.assertEqual(self.likes(), ([2, 1], 3))
+
+    def test_flushes_once_max_pending_comments_are_dirty(self):
+        for comment in self.comments[:2]:
+            self.buffer.add(comment.pk, 1)
+        self.assertEqual(self.likes(), ([1, 1, 1], 3))
+
+        self.buffer.add(self.comments[2].pk, 1)
+
+        self.assertEqual(self.likes(), ([2, 2, 2], 6))
+
+    def test_likes_reach_the_buffer_on_commit(self):
+        comment = self.comments[0]
+        with mock.patch('posts.likes.get_like_buffer', return_value=self.buffer):
+            with self.captureOnCommitCallbacks() as callbacks:
+                record_like(comment, 1)
+                self.assertEqual(self.buffer.pending(comment.pk), 0)
+            for callback in callbacks:
+                callback()
+
+            self.assertEqual(self.buffer.pending(comment.pk), 1)
+            response = self.client.post(
+                f'/api/posts/{self.post.pk}/comments/{comment.pk}/like/', {'userId': self.author.pk}, format='json',
+            )
+
+        # Pending likes are counted in the response before they are flushed.
+        self.assertEqual(response.json(), {'liked': True, 'likes': 2})
+        self.assertEqual(self.likes(), ([1, 1, 1], 3))
+
+
+class TopCommentsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='author', age=30)
+        self.post = Post.objects.create(title='Post', description='text', author=self.author)
+        self.other = Post.objects.create(title='Other', description='text', author=self.author)
+        # NULL likes rank as 0; ties go to the newer (higher id) comment.
+        self.comments = [
+            Comment.objects.create(postId=self.post, author=self.author, content=str(likes), likes=likes)
+            for likes in (3, None, 5, 3, 0)
+        ]
+        self.other_comment = Comment.objects.create(postId=self.other, author=self.author, content='1', likes=1)
+        first, null, most, tie, zero = (comment.pk for comment in self.comments)
+        self.top = [most, tie, first, zero, null]
+
+    def ids(self, comments):
+        return [comment['id'] for comment in comments]
+
+    def test_top_per_post(self):
+        for limit in (1, 3, 10):
+            with self.subTest(limit=limit):
+                comments = Comment.objects.filter(postId__in=[self.post.pk, self.other.pk]).top_per_post(limit)
+                top = {}
+                for comment in comments.order_by('postId', 'position'):
+                    top.setdefault(comment.postId_id, []).append(comment.pk)
+                self.assertEqual(top, {self.post.pk: self.top[:limit], self.other.pk: [self.other_comment.pk]})
+
+    def test_post_detail(self):
+        for limit in (1, 3, 10):
+            with self.subTest(limit=limit):
+                response = self.client.get(f'/api/posts/{self.post.pk}/?top_comments={limit}')
+                self.assertEqual(self.ids(response.json()['top_comments']), self.top[:limit])
+        self.assertNotIn('top_comments', self.client.get(f'/api/posts/{self.post.pk}/').json())
+
+    def test_post_list(self):
+        response = self.client.get('/api/posts/?top_comments=2')
+
+        top = {post['id']: self.ids(post['top_comments']) for post in response.json()['results']}
+        self.assertEqual(top, {self.post.pk: self.top[:2], self.other.pk: [self.other_comment.pk]})
+
+    def test_invalid_limit(self):
+        for value in ('-1', '11', 'many'):
+            for url in ('/api/posts/', f'/api/posts/{self.post.pk}/'):
+                with self.subTest(url, value=value):
+                    response = self.client.get(f'{url}?top_comments={value}')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('top_comments', response.json())
+
+    def test_comment_list_sorts(self):
+        created = [comment.pk for comment in self.comments]
+        for sort, expected in (('oldest', created), ('newest', created[::-1]), ('top', self.top), (None, created)):
+            with self.subTest(sort):
+                url = f'/api/posts/{self.post.pk}/comments/?page_size=2'
+                if sort:
+                    url += f'&sort={sort}'
+                ids = []
+                while url:
+                    page = self.client.get(url).json()
+                    ids += self.ids(page['results'])
+                    url = page['next']
+                self.assertEqual(ids, expected)
+
+        response = self.client.get(f'/api/posts/{self.post.pk}/comments/?sort=likes')
+        self.assertEqual(response.status_code, 400)
+
+    def test_like_reorders_the_preview(self):
+        null = self.comments[1]
+        for i in range(6):
+            user = User.objects.create(name=f'user {i}', age=30)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    f'/api/posts/{self.post.pk}/comments/{null.pk}/like/', {'userId': user.pk}, format='json',
+                )
+
+        response = self.client.get(f'/api/posts/{self.post.pk}/?top_comments=1')
+
+        self.assertEqual(self.ids(response.json()['top_comments']), [null.pk])
+
+
+class PostBatchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='author', age=30)
+
+    def batch(self, body, expected_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/posts/batch/', body, format='json')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def test_create_resolves_tags_once(self):
+        Tag.objects.create(name='old')
+
+        results = self.batch({'create': [
+            {'title': 'One', 'description': 'text', 'tags': ['old', 'new']},
+            {'title': 'Two', 'description': 'text', 'tags': ['new', 'new']},
+            {'title': 'Three', 'description': 'text'},
+        ]}, 200)
+
+        self.assertEqual([result['status'] for result in results['create']], [201, 201, 201])
+        posts = Post.objects.in_bulk([result['id'] for result in results['create']])
+        self.assertEqual(
+            [sorted(posts[result['id']].tags.values_list('name', flat=True)) for result in results['create']],
+            [['new', 'old'], ['new'], []],
+        )
+        self.assertEqual(Tag.objects.filter(name='new').count(), 1)
+        self.assertEqual({post.author_id for post in posts.values()}, {self.author.pk})
+
+    def test_invalid_items_are_reported_and_the_rest_written(self):
+        post = Post.objects.create(title='Old', description='text', author=self.author)
+        gone = Post.objects.create(title='Gone', description='text', author=self.author)
+
+        results = self.batch({
+            'create': [{'title': 'New', 'description': 'text'}, {'description': 'no title'}],
+            'update': [{'id': post.pk, 'title': 'Renamed', 'tags': ['t']}, {'id': 999, 'title': 'x'},
+                       {'id': post.pk, 'title': 'again'}, {'title': 'no id'}],
+            'delete': [gone.pk, 999, 'x'],
+        }, 207)
+
+        self.assertEqual([(item['index'], item['status']) for item in results['create']], [(0, 201), (1, 400)])
+        self.assertIn('title', results['create'][1]['errors'])
+        self.assertEqual([item['status'] for item in results['update']], [200, 404, 400, 400])
+        self.assertEqual([item['status'] for item in results['delete']], [204, 404, 400])
+        post.refresh_from_db()
+        self.assertEqual((post.title, list(post.tags.values_list('name', flat=True))), ('Renamed', ['t']))
+        self.assertFalse(Post.objects.filter(pk=gone.pk).exists())
+        self.assertTrue(Post.objects.filter(title='New').exists())
+
+    def test_malformed_batches_are_rejected(self):
+        for body in ([], {'create': {}}, {'upsert': []}):
+            with self.subTest(body=body):
+                self.batch(body, 400)
+        with self.settings(BATCH_MAX_ITEMS=2):
+            self.batch({'delete': [1, 2, 3]}, 400)
+
+
+class CommentBatchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(name='author', age=30)
+        self.posts = [Post.objects.create(title=f'Post {i}', description='text', author=self.author)
+                      for i in range(2)]
+
+    def batch(self, body, expected_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/comments/batch/', body, format='json')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def counters(self):
+        return [(post.comment_count, post.likes_total)
+                for post in Post.objects.filter(pk__in=[post.pk for post in self.posts]).order_by('pk')]
+
+    def test_counters_follow_creates_updates_and_deletes(self):
+        first, second = self.posts
+        results = self.batch({'create': [
+            {'postId': first.pk, 'content': 'a', 'likes': 2},
+            {'postId': first.pk, 'content': 'b'},
+            {'postId': second.pk, 'content': 'c', 'likes': 5},
+        ]}, 200)
+        a, b, c = [result['id'] for result in results['create']]
+        self.assertEqual(self.counters(), [(2, 2), (1, 5)])
+
+        self.batch({'update': [{'id': a, 'likes': 3}, {'id': c, 'content': 'edited'}]}, 200)
+        self.assertEqual(self.counters(), [(2, 3), (1, 5)])
+
+        self.batch({'delete': [a, c]}, 200)
+        self.assertEqual(self.counters(), [(1, 0), (0, 0)])
+        self.assertEqual(list(Comment.objects.values_list('pk', flat=True)), [b])
+
+    def test_partial_failure(self):
+        first, _ = self.posts
+        results = self.batch({
+            'create': [{'postId': 999, 'content': 'orphan'}, {'postId': first.pk, 'content': 'ok'},
+                       {'postId': first.pk}],
+            'delete': [999],
+        }, 207)
+
+        self.assertEqual([item['status'] for item in results['create']], [400, 201, 400])
+        self.assertIn('postId', results['create'][0]['errors'])
+        self.assertIn('content', results['create'][2]['errors'])
+        self.assertEqual(results['delete'], [{'index': 0, 'status': 404, 'errors': {'detail': 'Not found.'}}])
+        self.assertEqual(self.counters(), [(1, 0), (0, 0)])
+
+    def test_cached_posts_see_the_new_counters(self):
+        first, _ = self.posts
+        self.assertEqual(self.client.get(f'/api/posts/{first.pk}/').json()['comment_count'], 0)
+
+        self.batch({'create': [{'postId': first.pk, 'content': 'a'}]}, 200)
+
+        self.assertEqual(self.client.get(f'/api/posts/{first.pk}/').json()['comment_count'], 1)
+
+
+def image_bytes(width=64, height=48, image_format='PNG', mode='RGB'):
+    """A fixed gradient, encoded as ``image_format``."""
+    image = Image.new('RGB', (width, height))
+    image.putdata([(x * 4 % 256, y * 5 % 256, 255 - x * 4 % 256) for y in range(height) for x in range(width)])
+    if mode != 'RGB':
+        image = image.convert(mode)
+    content = BytesIO()
+    image.save(content, image_format)
+    return content.getvalue()
+
+
+@skipUnless(Image, 'needs Pillow')
+class ImageTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        overridden = override_settings(MEDIA_ROOT=media.name, POSTS_IMAGES={
+            'MAX_BYTES': 50_000, 'MAX_PIXELS': 100 * 100, 'VARIANTS': {'thumb': 16, 'large': 100},
+            'QUALITY': 80, 'WORKERS': 1,
+        })
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+        self.author = User.objects.create(name='author', age=30)
+        self.post = Post.objects.create(title='Post', description='text', author=self.author)
+        account = Account.objects.create_user('alice', password='secret')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(account)}')
+
+    def upload(self, content, name='image.png'):
+        with mock.patch('posts.images.schedule_variants') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    f'/api/posts/{self.post.pk}/image/', {'image': SimpleUploadedFile(name, content)},
+                    format='multipart',
+                )
+        return response, schedule
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def render(self, original):
+        """Render ``original``'s variants like an image worker, in this process."""
+        path = default_storage.path(original)
+        config = images._config()
+        return imaging.process_image(
+            path, os.path.dirname(path), os.path.splitext(os.path.basename(path))[0],
+            config['VARIANTS'], config['QUALITY'],
+        )
+
+    def test_upload_is_accepted_before_the_variants_exist(self):
+        response, schedule = self.upload(image_bytes())
+
+        self.assertEqual(response.status_code, 202)
+        self.post.refresh_from_db()
+        original = self.post.image_original
+        self.assertRegex(original, rf'^posts/{self.post.pk}/[0-9a-f]{{32}}\.png$')
+        self.assertEqual(self.stored_files(), [original])
+        self.assertEqual(response.json()['imageUrl'], default_storage.url(original))
+        self.assertEqual(response.json()['image_variants'], {})
+        schedule.assert_called_once_with(self.post.pk, original)
+
+    def test_invalid_uploads_are_rejected(self):
+        bmp = BytesIO()
+        Image.new('RGB', (10, 10)).save(bmp, 'BMP')
+        for name, content, error in (
+            ('not an image', b'plain text', 'Upload a valid image.'),
+            ('format', bmp.getvalue(), 'Unsupported image format; use one of JPEG, PNG, WEBP, GIF.'),
+            ('bytes', image_bytes() + bytes(50_000), 'Images may be at most 50000 bytes.'),
+            ('pixels', image_bytes(101, 100, 'GIF', 'P'), 'Images may have at most 10000 pixels.'),
+        ):
+            with self.subTest(name):
+                response, schedule = self.upload(content)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'image': [error]})
+                schedule.assert_not_called()
+        self.assertEqual(self.stored_files(), [])
+
+        response = self.client.post(f'/api/posts/{self.post.pk}/image/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.post.pk = 0
+        self.assertEqual(self.upload(image_bytes())[0].status_code, 404)
+
+    def test_upload_requires_authentication(self):
+        self.client.credentials()
+
+        response, _ = self.upload(image_bytes())
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_process_image(self):
+        for image_format, mode, extension in (('JPEG', 'RGB', 'jpg'), ('PNG', 'RGBA', 'png')):
+            with self.subTest(image_format):
+                source = os.path.join(self.media_root, f'source.{extension}')
+                with open(source, 'wb') as file:
+                    file.write(image_bytes(image_format=image_format, mode=mode))
+
+                result = imaging.process_image(source, self.media_root, image_format, {'thumb': 16, 'large': 100})
+
+                self.assertEqual((result['width'], result['height']), (64, 48))
+                self.assertEqual(result['variants'], {
+                    'thumb': f'{image_format}_thumb.{extension}', 'thumb_webp': f'{image_format}_thumb.webp',
+                    'large': f'{image_format}_large.{extension}', 'large_webp': f'{image_format}_large.webp',
+                })
+                # Scaled down to fit the box, never up.
+                for name, size in (('thumb', (16, 12)), ('thumb_webp', (16, 12)), ('large', (64, 48))):
+                    with Image.open(os.path.join(self.media_root, result['variants'][name])) as variant:
+                        self.assertEqual(variant.size, size)
+                with Image.open(os.path.join(self.media_root, result['variants']['thumb'])) as variant:
+                    self.assertEqual(variant.mode, mode)
+
+    def test_blurhash(self):
+        # Checked against the reference encoder on the same 32x32 copy.
+        with Image.open(BytesIO(image_bytes())) as image:
+            self.assertEqual(imaging.blurhash(image), 'L-HLGH77w%XAmHWYjuf8gJfjfQfj')
+        self.assertEqual(imaging.blurhash(Image.new('RGB', (10, 10), (255, 0, 0))), 'L9TI:j|cfQ|c|co1fQo1fQfQfQfQ')
+
+    def test_save_variants(self):
+        self.upload(image_bytes())
+        self.post.refresh_from_db()
+        original = self.post.image_original
+        self.client.get(f'/api/posts/{self.post.pk}/')
+
+        self.assertTrue(images.save_variants(self.post.pk, original, self.render(original)))
+
+        data = self.client.get(f'/api/posts/{self.post.pk}/').json()
+        stem = original[:-len('.png')]
+        self.assertEqual(data['image_variants'], {
+            name: default_storage.url(f"{stem}_{name.replace('_webp', '')}.{'webp' if 'webp' in name else 'jpg'}")
+            for name in ('thumb', 'thumb_webp', 'large', 'large_webp')
+        })
+        self.assertEqual((data['image_width'], data['image_height']), (64, 48))
+        self.assertEqual(data['image_blurhash'], 'L-HLGH77w%XAmHWYjuf8gJfjfQfj')
+        self.assertEqual(len(self.stored_files()), 5)
+
+    def test_replaced_original_is_not_saved(self):
+        self.upload(image_bytes())
+        self.post.refresh_from_db()
+        replaced = self.post.image_original
+        result = self.render(replaced)
+        self.upload(image_bytes(32, 32))
+        self.post.refresh_from_db()
+        current = self.post.image_original
+
+        self.assertFalse(images.save_variants(self.post.pk, replaced, result))
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.image_original, self.post.image_variants), (current, {}))
+        # The new upload removed the replaced original, save_variants its variants.
+        self.assertEqual(self.stored_files(), [current])
+
+    def test_process_post_images(self):
+        self.upload(image_bytes())
+        processed = Post.objects.create(title='Processed', description='text', author=self.author)
+        processed.image_original, processed.image_variants = 'posts/other.png', {'thumb': 'posts/other_thumb.jpg'}
+        processed.save()
+        Post.objects.create(title='No image', description='text', author=self.author)
+
+        def render_variants(original):
+            future = Future()
+            future.set_result(self.render(original))
+            return future
+
+        out = StringIO()
+        call_command('process_post_images', '--dry-run', stdout=out)
+        self.assertIn('1 posts need their images rendered.', out.getvalue())
+
+        with mock.patch('posts.management.commands.process_post_images.render_variants', render_variants):
+            call_command('process_post_images', stdout=out)
+
+        self.assertIn('Rendered 1 of 1 post images, 0 failed.', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(len(self.post.image_variants), 4)
+        self.assertEqual(self.post.image_blurhash, 'L-HLGH77w%XAmHWYjuf8gJfjfQfj')
+
+
+class CounterMigrationTests(TransactionTestCase):
+    before = [
+        ('posts', '0003_tag_rename_content_post_description_post_imageurl_and_more'),
+        ('users', '0001_initial'),
+    ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        get_response_cache().backend.clear()
+
+    def test_existing_comments_are_counted(self):
+        apps = self.migrate(self.before)
+        author = apps.get_model('users', 'User').objects.create(name='author', age=30)
+        old_post = apps.get_model('posts', 'Post').objects.create(title='Old', description='text', author=author)
+        OldComment = apps.get_model('posts', 'Comment')
+        first = OldComment.objects.create(postId=old_post, author=author, content='first', likes=3)
+        OldComment.objects.create(postId=old_post, author=author, content='second', likes=None)
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        post = Post.objects.get(pk=old_post.pk)
+        self.assertEqual((post.comment_count, post.likes_total), (2, 3))
+
+        response = APIClient().delete(f'/api/posts/{post.pk}/comments/{first.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        post.refresh_from_db()
+        self.assertEqual((post.comment_count, post.likes_total), (1, 0))
+
+
+class PostSearchTests(APITestCase):
+    def test_post_created_after_migrate_is_searchable(self):
+        author = User.objects.create(name='author', age=30)
+        post = Post.objects.create(title='The quick brown fox', description='jumps over the lazy dog', author=author)
+        Post.objects.create(title='Unrelated', description='nothing to see', author=author)
+
+        response = self.client.get('/api/posts/search/', {'q': 'fox'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in response.json()['results']], [post.pk])
+
+    def test_updated_post_is_searchable_by_new_words(self):
+        author = User.objects.create(name='author', age=30)
+        post = Post.objects.create(title='Old title', description='old text', author=author)
+        Post.objects.filter(pk=post.pk).update(title='Badger news')
+
+        results = self.client.get('/api/posts/search/', {'q': 'badger'}).json()['results']
+
+        self.assertEqual([result['id'] for result in results], [post.pk])
+
+    def test_results_are_ranked_by_relevance_across_pages(self):
+        author = User.objects.create(name='author', age=30)
+        # Created least relevant first, so id order is the reverse of rank order.
+        posts = [
+            Post.objects.create(title='Post', description=' '.join(['zebra'] * hits + ['filler'] * (8 - hits)),
+                                author=author)
+            for hits in range(1, 8)
+        ]
+        Post.objects.create(title='Unrelated', description='nothing to see', author=author)
+
+        ids, ranks, url, params = [], [], '/api/posts/search/', {'q': 'zebra', 'page_size': 3}
+        while url:
+            page = self.client.get(url, params).json()
+            ids += [result['id'] for result in page['results']]
+            ranks += [result['rank'] for result in page['results']]
+            url, params = page['next'], None
+
+        self.assertEqual(ids, [post.pk for post in reversed(posts)])
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_title_matches_rank_above_description_matches(self):
+        author = User.objects.create(name='author', age=30)
+        in_description = Post.objects.create(title='Post', description='about a walrus', author=author)
+        in_title = Post.objects.create(title='Walrus', description='about an animal', author=author)
+
+        results = self.client.get('/api/posts/search/', {'q': 'walrus'}).json()['results']
+
+        self.assertEqual([result['id'] for result in results], [in_title.pk, in_description.pk])
+
+    def test_phrase_or_and_exclusion_syntax(self):
+        author = User.objects.create(name='author', age=30)
+        phrase = Post.objects.create(title='Post', description='the quick brown fox', author=author)
+        scattered = Post.objects.create(title='Post', description='brown and quick', author=author)
+        other = Post.objects.create(title='Post', description='a lazy dog', author=author)
+
+        def search(q):
+            return {result['id'] for result in self.client.get('/api/posts/search/', {'q': q}).json()['results']}
+
+        self.assertEqual(search('quick brown'), {phrase.pk, scattered.pk})
+        self.assertEqual(search('"quick brown"'), {phrase.pk})
+        self.assertEqual(search('"quick brown" or dog'), {phrase.pk, other.pk})
+        self.assertEqual(search('quick -fox'), {scattered.pk})
+        self.assertEqual(search('quick -"brown fox"'), {scattered.pk})
+        self.assertEqual(search('-fox'), set())
@@ -1,9 +1,16 @@
 from django.urls import path
-from . import views
+from socialnetworkapi.async_views import select_view
+from . import async_views, views
 
 urlpatterns = [
-    path('posts/', views.post_list, name='post-list'),
-    path('posts/<int:pk>/', views.post_detail, name='post-detail'),
+    path('posts/', select_view('post-list', views.post_list, async_views.post_list), name='post-list'),
+    path('posts/batch/', views.post_batch, name='post-batch'),
+    path('posts/search/', views.post_search, name='post-search'),
+    path('posts/<int:pk>/', select_view('post-detail', views.post_detail, async_views.post_detail), name='post-detail'),
+    path('posts/<int:pk>/image/', views.post_image, name='post-image'),
+    path('tags/top/', views.tag_top, name='tag-top'),
+    path('comments/batch/', views.comment_batch, name='comment-batch'),
     path('posts/<int:post_id>/comments/', views.comment_list, name='comment-list'),
     path('posts/<int:post_id>/comments/<int:comment_id>/', views.comment_detail, name='comment-detail'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/like/', views.comment_like, name='comment-like'),
 ]
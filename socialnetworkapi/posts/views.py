@@ -1,9 +1,27 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    api_view, authentication_classes, parser_classes, permission_classes, throttle_classes,
+)
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Post, Comment
-from .serializers import PostSerializer, CommentSerializer
+from feed.fanout import fan_out_post
+from main.authentication import CachedJWTAuthentication
+from socialnetworkapi.conditional import check_not_modified, make_etag, with_validators
+from socialnetworkapi.streaming import requested_stream_format, streaming_response
+from socialnetworkapi.throttling import BatchTokenBucketThrottle
+from . import batch, images
+from .cache import PAYLOAD_VERSION, get_response_cache, invalidate_post
+from .fast_serializers import comment_representation, comment_values, order_by_ids, post_rows, top_comment_rows
+from .likes import current_likes, record_like
+from .models import Post, Comment, CommentLike, Tag
+from .pagination import KeysetPagination
+from .search import search_posts
+from .serializers import PostSerializer, PostSearchResultSerializer, CommentSerializer, CommentUpdateSerializer
 
 # Create your views here.
 @api_view(['GET', 'POST'])
@@ -12,9 +30,23 @@ def post_list(request):
     List all posts or create a new post.
 
     GET:
-    - Returns a list of all posts
+    - Returns a page of posts, newest first
     - No authentication required
     - Available to all users
+    - Pages are keyset-paginated on (created_at, id); follow the opaque
+      `next` / `previous` links to move between pages
+    - Sends ETag and Last-Modified; answers 304 when the page is unchanged
+
+    Query Parameters (GET):
+    - cursor: string (optional) - Cursor taken from a `next` or `previous` link
+    - page_size: integer (optional) - Number of posts per page (default 20, max 100)
+    - tag: string (optional, repeatable) - Only posts with this tag
+    - tag_match: string (optional) - `all` (default) requires every tag,
+      `any` requires at least one
+    - stream: string (optional) - `json` or `ndjson` streams every matching
+      post (newest first, no pagination or validators) instead of one page
+    - top_comments: integer (optional) - Embed each post's N most liked
+      comments as `top_comments` (0 to POSTS_TOP_COMMENTS_MAX, default 0)
 
     POST:
     - Creates a new post
@@ -29,14 +61,47 @@ def post_list(request):
 
     Responses:
     - 200: Successful retrieval of posts list (GET)
+    - 304: Page not modified since the client's copy (GET)
     - 201: Post successfully created (POST)
-    - 400: Invalid data provided (POST)
+    - 400: Invalid tag_match, stream or top_comments (GET) or invalid data provided (POST)
+    - 429: Rate limit exceeded, retry after Retry-After seconds (POST)
     - 401: Authentication credentials not provided (POST)
+    - 404: Invalid cursor (GET)
     """
     if request.method == 'GET':
-        posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        tags = request.query_params.getlist('tag')
+        tag_match = request.query_params.get('tag_match', 'all')
+        if tag_match not in ('all', 'any'):
+            return Response({'tag_match': ['Must be "all" or "any".']}, status=status.HTTP_400_BAD_REQUEST)
+
+        def filtered(queryset):
+            if tags:
+                queryset = queryset.with_tags(tags, match_all=tag_match == 'all')
+            return queryset
+
+        stream_format = requested_stream_format(request)
+        if stream_format:
+            posts = filtered(Post.objects.for_listing()).order_by(*KeysetPagination.ordering)
+            return streaming_response(posts, PostSerializer, stream_format)
+
+        top_comments = _requested_top_comments(request)
+        paginator = KeysetPagination()
+        # Validate against the version columns of the page before loading it.
+        versions = paginator.paginate_queryset(filtered(Post.objects.versions()), request)
+        page_ids = [post.pk for post in versions]
+        previews = top_comment_rows(page_ids, top_comments) if top_comments else None
+        etag, last_modified = _post_page_validators(paginator, versions, previews)
+        not_modified = check_not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        # Serialize the page through the .values() fast path; a post changed
+        # since the validators were read makes the next revalidation miss.
+        posts = order_by_ids(post_rows(Post.objects.filter(pk__in=page_ids)), page_ids)
+        if top_comments:
+            for post in posts:
+                post['top_comments'] = [comment_representation(row) for row in previews[post['id']]]
+        return with_validators(paginator.get_paginated_response(posts), etag, last_modified)
 
     elif request.method == 'POST':
         # Get the first user as default author if not authenticated
@@ -45,10 +110,47 @@ def post_list(request):
 
         serializer = PostSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(author=default_author)
+            post = serializer.save(author=default_author)
+            transaction.on_commit(lambda: fan_out_post(post))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@throttle_classes([BatchTokenBucketThrottle])
+def post_batch(request):
+    """
+    Create, update and delete many posts in one request and one transaction.
+
+    Items are validated one by one; invalid items are reported and skipped
+    while the valid ones are written with bulk queries. Tags of all items
+    are resolved together.
+
+    Request Body:
+    - create: array (optional) - Posts as for POST /api/posts/, including `tags`
+    - update: array (optional) - Objects with the post `id` and the fields to change
+    - delete: array (optional) - Ids of posts to delete
+
+    At most BATCH_MAX_ITEMS (default 10000) items per request. New posts
+    are authored by the first user, as with POST /api/posts/. Rate limits
+    charge one token per item.
+
+    Responses:
+    - 200: Every item succeeded
+    - 207: Some items failed; see the per-item `status` and `errors`
+    - 400: Malformed batch body
+    - 429: Rate limit exceeded, retry after Retry-After seconds
+    """
+    from users.models import User
+    operations = batch.parse_batch(request.data)
+    default_author = User.objects.first() if operations['create'] else None
+    with transaction.atomic():
+        results = {
+            'create': batch.create_posts(operations['create'], default_author),
+            'update': batch.update_posts(operations['update']),
+            'delete': batch.delete_posts(operations['delete']),
+        }
+    return Response(results, status=batch.batch_status(results))
+
 @api_view(['GET', 'PUT', 'DELETE'])
 def post_detail(request, pk):
     """
@@ -58,6 +160,12 @@ def post_detail(request, pk):
     - Returns details of a specific post
     - No authentication required
     - Available to all users
+    - Served from the response cache when possible
+    - Sends ETag and Last-Modified; answers 304 when the post is unchanged
+
+    Query Parameters (GET):
+    - top_comments: integer (optional) - Embed the post's N most liked
+      comments as `top_comments` (0 to POSTS_TOP_COMMENTS_MAX, default 0)
 
     PUT:
     - Updates an existing post
@@ -82,41 +190,146 @@ def post_detail(request, pk):
 
     Responses:
     - 200: Successful retrieval (GET) or update (PUT) of post
+    - 304: Post not modified since the client's copy (GET)
     - 204: Post successfully deleted (DELETE)
-    - 400: Invalid data provided (PUT)
+    - 400: Invalid top_comments (GET) or invalid data provided (PUT)
     - 401: Authentication credentials not provided (PUT, DELETE)
     - 403: User is not the author of the post (PUT, DELETE)
     - 404: Post not found
     """
+    cache = get_response_cache()
+    top_comments = 0
+    if request.method == 'GET':
+        top_comments = _requested_top_comments(request)
+        # Previews share the post's version (comment writes bump it too).
+        variant = f'top_comments={top_comments}' if top_comments else None
+        entry, version = cache.get('post', pk, variant)
+        if entry is not None:
+            validators = entry['etag'], entry['last_modified']
+        elif top_comments:
+            # The preview's validators are only known once it is loaded.
+            validators = None
+        else:
+            post = Post.objects.versions().filter(pk=pk).first()
+            if post is None:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            validators = _post_validators(post)
+        if validators is not None:
+            not_modified = check_not_modified(request, *validators)
+            if not_modified:
+                return not_modified
+        if entry is not None:
+            return with_validators(Response(entry['data']), *validators)
+
+    posts = Post.objects.for_listing()
+    if top_comments:
+        posts = posts.with_top_comments(top_comments)
     try:
-        post = Post.objects.get(pk=pk)
+        post = posts.get(pk=pk)
     except Post.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
         serializer = PostSerializer(post)
-        return Response(serializer.data)
+        preview = None
+        if top_comments:
+            preview = [(comment.pk, comment.updated_at, comment.likes, comment.author.updated_at)
+                       for comment in post.top_comments]
+        etag, last_modified = _post_validators(post, preview)
+        cache.set('post', pk, version, {
+            'data': serializer.data, 'etag': etag, 'last_modified': last_modified,
+        }, variant)
+        if top_comments:
+            not_modified = check_not_modified(request, etag, last_modified)
+            if not_modified:
+                return not_modified
+        return with_validators(Response(serializer.data), etag, last_modified)
 
     elif request.method == 'PUT':
         serializer = PostSerializer(post, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(author=post.author)  # Keep the original author
+            # The prefetched tags are stale once the update has rewritten them.
+            post._prefetched_objects_cache = {}
+            invalidate_post(pk, comments=False)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        post.delete()
+        stale_images = images.image_files(post)
+        with transaction.atomic():
+            post.delete()
+            transaction.on_commit(lambda: images.delete_files(stale_images))
+        invalidate_post(pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def post_image(request, pk):
+    """
+    Upload the image of a post.
+
+    The original is stored and becomes the post's `imageUrl` right away; the
+    resized JPEG/PNG and WebP variants, width, height and blurhash are
+    produced by the image workers after the response is sent. They appear
+    as `image_width`, `image_height`, `image_blurhash` and `image_variants`
+    ({variant: URL}, e.g. `thumb`, `thumb_webp`, `medium`, `medium_webp`)
+    once ready. A new upload replaces the previous one.
+
+    POST:
+    - Stores a new image for the post
+    - Requires authentication
+
+    Parameters:
+    - pk: integer (required) - The unique identifier of the post
+
+    Request Body (multipart/form-data):
+    - image: file (required) - JPEG, PNG, WebP or GIF, at most
+      POSTS_IMAGES['MAX_BYTES'] bytes and POSTS_IMAGES['MAX_PIXELS'] pixels
+
+    Responses:
+    - 202: Image stored, variants pending; the post as it is now
+    - 400: Missing, invalid or oversized image
+    - 401: Authentication credentials not provided
+    - 404: Post not found
+    - 429: Rate limit exceeded, retry after Retry-After seconds
+    - 503: Image uploads are not available (Pillow is not installed)
+    """
+    upload = request.FILES.get('image')
+    if upload is None:
+        return Response({'image': ['No image was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        post = Post.objects.for_listing().get(pk=pk)
+    except Post.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    extension = images.validate_upload(upload)
+    original = images.store_original(post, upload, extension)
+    stale_images = images.detach_image(post)
+    post.image_original = original
+    post.imageUrl = default_storage.url(original)
+    with transaction.atomic():
+        post.save(update_fields=['imageUrl', *images.IMAGE_FIELDS, 'updated_at'])
+        transaction.on_commit(lambda: images.schedule_variants(post.pk, original))
+        transaction.on_commit(lambda: images.delete_files(stale_images))
+    invalidate_post(pk, comments=False)
+    return Response(PostSerializer(post).data, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET', 'POST'])
 def comment_list(request, post_id):
     """
-    List all comments for a post or create a new comment.
+    List a post's comments, a page at a time, or create a new comment.
 
     GET:
-    - Returns a list of all comments for a specific post
+    - Returns a page of comments for a specific post
     - No authentication required
     - Available to all users
+    - Pages are keyset-paginated on the sort order; follow the opaque
+      `next` / `previous` links to move between pages
+    - Served from the response cache when possible
+    - Sends ETag and Last-Modified; answers 304 when the page is unchanged
 
     POST:
     - Creates a new comment for a specific post
@@ -126,38 +339,116 @@ def comment_list(request, post_id):
     Parameters:
     - post_id: integer (required) - The unique identifier of the post
 
+    Query Parameters (GET):
+    - sort: string (optional) - `oldest` (default), `newest` or `top`
+      (most liked first, newest first among equal likes)
+    - cursor: string (optional) - Cursor taken from a `next` or `previous` link
+    - page_size: integer (optional) - Number of comments per page (default 20, max 100)
+
     Request Body (POST):
     - content: string (required) - The content of the comment
     - likes: integer (optional) - The number of likes for the comment
 
     Responses:
-    - 200: Successful retrieval of comments list (GET)
+    - 200: Successful retrieval of a page of comments (GET)
+    - 304: Page not modified since the client's copy (GET)
     - 201: Comment successfully created (POST)
-    - 400: Invalid data provided (POST)
+    - 400: Invalid sort (GET) or invalid data provided (POST)
     - 401: Authentication credentials not provided (POST)
-    - 404: Post not found
+    - 404: Post not found, or invalid cursor (GET)
+    - 429: Rate limit exceeded, retry after Retry-After seconds (POST)
     """
+    cache = get_response_cache()
+    if request.method == 'GET':
+        sort = request.query_params.get('sort', 'oldest')
+        if sort not in Comment.ORDERINGS:
+            return Response({'sort': ['Must be "oldest", "newest" or "top".']}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Every page (sort, cursor, page size) is cached under the post's
+        # comments version, so a comment write retires all of them at once.
+        page_url = request.build_absolute_uri()
+        entry, version = cache.get('comments', post_id, page_url)
+        if entry is not None:
+            validators = entry['etag'], entry['last_modified']
+            not_modified = check_not_modified(request, *validators)
+            if not_modified:
+                return not_modified
+            return with_validators(Response(entry['data']), *validators)
+
+        paginator = KeysetPagination(ordering=Comment.ORDERINGS[sort])
+        comments = Comment.objects.filter(postId=post_id).with_like_rank()
+        rows = paginator.paginate_queryset(comment_values(comments, 'like_rank'), request)
+        if not rows and not Post.objects.filter(pk=post_id).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        etag = make_etag('comments', PAYLOAD_VERSION, post_id, sort, paginator.has_next, paginator.has_previous,
+                         _comment_version_parts(rows))
+        last_modified = max((row['updated_at'] for row in rows), default=None)
+        data = paginator.get_paginated_data([comment_representation(row) for row in rows])
+        cache.set('comments', post_id, version, {
+            'data': data, 'etag': etag, 'last_modified': last_modified,
+        }, page_url)
+        not_modified = check_not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+        return with_validators(Response(data), etag, last_modified)
+
     try:
         post = Post.objects.get(pk=post_id)
     except Post.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == 'GET':
-        comments = Comment.objects.filter(postId=post)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
-
-    elif request.method == 'POST':
+    if request.method == 'POST':
         # Get the first user as default author if not authenticated
         from users.models import User
         default_author = User.objects.first()
 
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(author=default_author, postId=post)
+            with transaction.atomic():
+                comment = serializer.save(author=default_author, postId=post)
+                Post.objects.filter(pk=post.pk).adjust_counters(comments=1, likes=comment.likes or 0)
+            invalidate_post(post.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@throttle_classes([BatchTokenBucketThrottle])
+def comment_batch(request):
+    """
+    Create, update and delete many comments, across any posts, in one
+    request and one transaction.
+
+    Items are validated one by one; invalid items are reported and skipped
+    while the valid ones are written with bulk queries. Post counters are
+    adjusted once per affected post.
+
+    Request Body:
+    - create: array (optional) - Comments with `postId`, `content` and optional `likes`
+    - update: array (optional) - Objects with the comment `id` and `content` and/or `likes`
+    - delete: array (optional) - Ids of comments to delete
+
+    At most BATCH_MAX_ITEMS (default 10000) items per request. New comments
+    are authored by the first user, as with the single-comment endpoint.
+    Rate limits charge one token per item.
+
+    Responses:
+    - 200: Every item succeeded
+    - 207: Some items failed; see the per-item `status` and `errors`
+    - 400: Malformed batch body
+    - 429: Rate limit exceeded, retry after Retry-After seconds
+    """
+    from users.models import User
+    operations = batch.parse_batch(request.data)
+    default_author = User.objects.first() if operations['create'] else None
+    with transaction.atomic():
+        results = {
+            'create': batch.create_comments(operations['create'], default_author),
+            'update': batch.update_comments(operations['update']),
+            'delete': batch.delete_comments(operations['delete']),
+        }
+    return Response(results, status=batch.batch_status(results))
+
 @api_view(['GET', 'PUT', 'DELETE'])
 def comment_detail(request, post_id, comment_id):
     """
@@ -167,6 +458,7 @@ def comment_detail(request, post_id, comment_id):
     - Returns details of a specific comment
     - No authentication required
     - Available to all users
+    - Sends ETag and Last-Modified; answers 304 when the comment is unchanged
 
     PUT:
     - Updates an existing comment
@@ -186,10 +478,12 @@ def comment_detail(request, post_id, comment_id):
 
     Request Body (PUT):
     - content: string (required) - The updated content of the comment
-    - likes: integer (optional) - The updated number of likes for the comment
+
+    `likes` is read-only here; it only changes through the like endpoint.
 
     Responses:
     - 200: Successful retrieval (GET) or update (PUT) of comment
+    - 304: Comment not modified since the client's copy (GET)
     - 204: Comment successfully deleted (DELETE)
     - 400: Invalid data provided (PUT)
     - 401: Authentication credentials not provided (PUT, DELETE)
@@ -198,21 +492,200 @@ def comment_detail(request, post_id, comment_id):
     """
     try:
         post = Post.objects.get(pk=post_id)
-        comment = Comment.objects.get(pk=comment_id, postId=post)
+        comment = Comment.objects.for_listing().get(pk=comment_id, postId=post)
     except (Post.DoesNotExist, Comment.DoesNotExist):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
+        validators = _comment_validators(comment)
+        not_modified = check_not_modified(request, *validators)
+        if not_modified:
+            return not_modified
         serializer = CommentSerializer(comment)
-        return Response(serializer.data)
+        return with_validators(Response(serializer.data), *validators)
 
     elif request.method == 'PUT':
-        serializer = CommentSerializer(comment, data=request.data)
+        serializer = CommentUpdateSerializer(comment, data=request.data)
         if serializer.is_valid():
-            serializer.save(author=comment.author, postId=post)  # Keep the original author
+            with transaction.atomic():
+                if _lock_comment_likes(comment) is None:
+                    return Response(status=status.HTTP_404_NOT_FOUND)
+                serializer.save(author=comment.author, postId=post)  # Keep the original author
+            invalidate_post(post.pk)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        comment.delete()
+        with transaction.atomic():
+            old_likes = _lock_comment_likes(comment)
+            if old_likes is not None:
+                comment.delete()
+                Post.objects.filter(pk=post.pk).adjust_counters(comments=-1, likes=-old_likes)
+        invalidate_post(post.pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST', 'DELETE'])
+def comment_like(request, post_id, comment_id):
+    """
+    Like or unlike a comment.
+
+    Each user can like a comment once; repeating a like or unlike is a no-op.
+    The counter is changed with a single `UPDATE ... SET likes = likes + 1`
+    (or - 1), so concurrent likes are never lost.
+
+    POST:
+    - Likes the comment
+
+    DELETE:
+    - Removes the like
+
+    Parameters:
+    - post_id: integer (required) - The unique identifier of the post
+    - comment_id: integer (required) - The unique identifier of the comment
+
+    Request Body:
+    - userId: integer (optional) - The liking user; defaults to the first user
+
+    Responses:
+    - 200: Like state after the request, e.g. {"liked": true, "likes": 6}
+    - 404: Post, comment or user not found
+    """
+    from users.models import User
+    try:
+        comment = Comment.objects.get(pk=comment_id, postId_id=post_id)
+        user_id = request.data.get('userId')
+        user = User.objects.get(pk=user_id) if user_id is not None else User.objects.first()
+    except (Comment.DoesNotExist, User.DoesNotExist, ValueError, TypeError):
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if user is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    with transaction.atomic():
+        if request.method == 'POST':
+            _, changed = CommentLike.objects.get_or_create(comment=comment, user=user)
+            delta = 1
+        else:
+            changed, _ = CommentLike.objects.filter(comment=comment, user=user).delete()
+            delta = -1
+        if changed:
+            record_like(comment, delta)
+
+    return Response({'liked': request.method == 'POST', 'likes': current_likes(comment)})
+
+def _lock_comment_likes(comment):
+    """
+    SELECT ... FOR UPDATE the comment and return its stored likes (0 for NULL),
+    or None when a concurrent request already deleted it.
+    """
+    row = Comment.objects.select_for_update().filter(pk=comment.pk).values('likes').first()
+    if row is None:
+        return None
+    return row['likes'] or 0
+
+@api_view(['GET'])
+def post_search(request):
+    """
+    Full-text search over post titles and descriptions.
+
+    Results are ranked by relevance, with title matches weighing more than
+    description matches, and carry a `headline` snippet of the description
+    with matching words wrapped in <mark></mark>. Pages are keyset-paginated
+    on (rank, id).
+
+    * Requires no authentication
+    * Available to all users
+
+    Query Parameters:
+    - q: string (required) - Search terms; supports "quoted phrases", `or` and -exclusions
+    - cursor: string (optional) - Cursor taken from a `next` or `previous` link
+    - page_size: integer (optional) - Number of posts per page (default 20, max 100)
+
+    Responses:
+    - 200: Page of matching posts, each with `rank` and `headline`
+    - 400: Missing search query
+    - 404: Invalid cursor
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': ['This query parameter is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = KeysetPagination(ordering=('-rank', '-id'))
+    posts = paginator.paginate_queryset(search_posts(query, Post.objects.for_listing()), request)
+    serializer = PostSearchResultSerializer(posts, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+def tag_top(request):
+    """
+    List the most used tags with the number of posts carrying each.
+
+    Counts are computed with one GROUP BY over the tag/post table and cached
+    for the response cache TTL, so they may lag slightly behind writes.
+
+    * Requires no authentication
+    * Available to all users
+
+    Query Parameters:
+    - limit: integer (optional) - Number of tags to return (default 20, max 100)
+
+    Responses:
+    - 200: List of {"name": string, "count": integer}, most used first
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+
+    cache = get_response_cache()
+    data, version = cache.get('tags', f'top:{limit}')
+    if data is None:
+        data = Tag.objects.top(limit)
+        cache.set('tags', f'top:{limit}', version, data)
+    return Response(data)
+
+def _post_validators(post, preview=None):
+    """
+    ETag and Last-Modified of a post, from the columns PostSerializer output
+    depends on. ``preview`` is the version tuples of an embedded top
+    comments preview (see _comment_version_parts()).
+    """
+    parts = ['post', PAYLOAD_VERSION, post.pk, post.updated_at,
+             post.comment_count, post.likes_total, post.author.updated_at]
+    last_modified = post.updated_at
+    if preview is not None:
+        parts.append(preview)
+        last_modified = max([last_modified, *(comment[1] for comment in preview)])
+    return make_etag(*parts), last_modified
+
+def _post_page_validators(paginator, posts, previews=None):
+    validators = [
+        _post_validators(post, _comment_version_parts(previews[post.pk]) if previews else None)
+        for post in posts
+    ]
+    etag = make_etag(
+        'posts', PAYLOAD_VERSION, paginator.has_next, paginator.has_previous,
+        [etag for etag, _ in validators],
+    )
+    last_modified = max((modified for _, modified in validators), default=None)
+    return etag, last_modified
+
+def _comment_version_parts(rows):
+    """What a comment's representation depends on, for comment_values() rows."""
+    return [(row['id'], row['updated_at'], row['likes'], row['author__updated_at']) for row in rows]
+
+def _requested_top_comments(request):
+    """The ``top_comments`` query parameter: how many top comments to embed per post."""
+    value = request.query_params.get('top_comments', '0')
+    limit = getattr(settings, 'POSTS_TOP_COMMENTS_MAX', 10)
+    try:
+        top_comments = int(value)
+    except ValueError:
+        top_comments = -1
+    if not 0 <= top_comments <= limit:
+        raise ValidationError({'top_comments': [f'Must be an integer from 0 to {limit}.']})
+    return top_comments
+
+def _comment_validators(comment):
+    etag = make_etag('comment', PAYLOAD_VERSION, comment.pk, comment.updated_at, comment.likes,
+                     comment.author.updated_at)
+    return etag, comment.updated_at
@@ -0,0 +1,53 @@
+"""
+Support for the ASGI-native versions of the read endpoints.
+
+Async views serve GET with the async ORM and answer in plain Django
+responses rendered by FastJSONRenderer. Every other method is handed to the original DRF view, so
+writes, validation and error handling stay in one place. Which routes use
+the async versions is chosen per URL name by settings.ASYNC_VIEWS.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .renderers import FastJSONRenderer
+
+_renderer = FastJSONRenderer()
+
+
+def json_response(data=None, status=200):
+    """
+    JSON response rendered like a DRF Response; ``data=None`` gives an
+    empty body.
+    """
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+def fallback_to(sync_view):
+    """
+    Decorate an async GET view so that any other method is served by
+    ``sync_view`` (a DRF @api_view) in a worker thread.
+    """
+    def decorator(async_view):
+        @csrf_exempt  # like @api_view; DRF applies its own CSRF checks
+        @wraps(async_view)
+        async def view(request, *args, **kwargs):
+            if request.method == 'GET':
+                return await async_view(request, *args, **kwargs)
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+        return view
+    return decorator
+
+
+def select_view(name, sync_view, async_view):
+    """
+    Return ``async_view`` when the route ``name`` is listed in
+    settings.ASYNC_VIEWS (or it contains '*'), else ``sync_view``.
+    """
+    routes = getattr(settings, 'ASYNC_VIEWS', ())
+    if '*' in routes or name in routes:
+        return async_view
+    return sync_view
@@ -0,0 +1,39 @@
+"""
+Helpers for HTTP validators (ETag / Last-Modified) on API views.
+
+Views compute validators from a few cheap columns (``updated_at``, counters
+or aggregates over them) before loading and serializing the full resource,
+so a client that already has the current representation gets an empty
+304 Not Modified.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values that determine a representation."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def check_not_modified(request, etag, last_modified=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since for a safe request.
+
+    Returns a 304 response when the client's copy is current, else None.
+    ``last_modified`` is a datetime (or None).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag and Last-Modified headers to ``response``."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
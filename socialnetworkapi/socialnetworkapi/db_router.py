@@ -0,0 +1,191 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware picks a replica for each GET/HEAD/OPTIONS request
+and ReplicaRouter sends that request's reads to it; writes, and every query
+outside such a request (other methods, management commands, background
+threads), go to ``default``.
+
+- Read-your-writes: a successful POST/PUT/PATCH/DELETE sets a short-lived
+  cookie that pins the client's following reads to the primary, so they
+  see their own writes while replicas catch up.
+- Fallback: a replica is only used while it accepts connections and lags
+  less than DATABASE_REPLICA_MAX_LAG seconds; both are re-checked at most
+  every DATABASE_REPLICA_CHECK_INTERVAL seconds per process. When no
+  replica qualifies, reads go to the primary.
+
+Replicas are the aliases listed in settings.DATABASE_REPLICAS.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias serving reads for the current request, or None for the primary.
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def max_lag():
+    return getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 5.0)
+
+
+def reading_from_replica():
+    """Whether reads in the current request are served by a replica."""
+    return _read_alias.get() is not None
+
+
+class ReplicaHealth:
+    """
+    Per-process view of which replicas are fit to serve reads.
+
+    Each replica is probed (connect + lag query) at most once per
+    ``check_interval`` seconds; the verdict is cached in between.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._verdicts = {}
+        self._lock = threading.Lock()
+
+    def is_usable(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            verdict = self._verdicts.get(alias)
+            if verdict is not None and now < verdict[0]:
+                return verdict[1]
+        usable = self._probe(alias)
+        with self._lock:
+            self._verdicts[alias] = (now + self.check_interval, usable)
+        return usable
+
+    def _probe(self, alias):
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError as exc:
+            logger.warning("Replica %s is unavailable, reading from the primary: %s", alias, exc)
+            return False
+        if lag > max_lag():
+            logger.warning("Replica %s lags %.1fs behind, reading from the primary", alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._verdicts.clear()
+
+
+def replica_lag(alias):
+    """
+    Seconds ``alias`` lags behind the primary. A PostgreSQL standby that
+    has replayed everything it received counts as 0 even when the primary
+    has been idle; other backends have no lag to report.
+    """
+    connection = connections[alias]
+    connection.ensure_connection()
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+health = ReplicaHealth(check_interval=getattr(settings, 'DATABASE_REPLICA_CHECK_INTERVAL', 1.0))
+_round_robin = itertools.count()
+
+
+def choose_replica():
+    """Return a usable replica alias, rotating between them, or None."""
+    aliases = replicas()
+    if not aliases:
+        return None
+    start = next(_round_robin)
+    for offset in range(len(aliases)):
+        alias = aliases[(start + offset) % len(aliases)]
+        if health.is_usable(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests from a replica unless the client is pinned to the
+    primary, and pin clients to the primary after they write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = self.read_alias(request)
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        alias = await sync_to_async(self.read_alias)(request)
+        token = _read_alias.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.pin_after_write(request, response)
+
+    def read_alias(self, request):
+        if request.method not in SAFE_METHODS or request.COOKIES.get(PIN_COOKIE):
+            return None
+        return choose_replica()
+
+    def pin_after_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
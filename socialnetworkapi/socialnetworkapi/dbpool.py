@@ -0,0 +1,37 @@
+"""
+Introspection of the connection strategy selected by settings.DATABASE_POOL
+(persistent connections, a psycopg pool or PgBouncer).
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def pool_mode(alias='default'):
+    """'psycopg', 'pgbouncer', 'persistent' or 'none' (a new connection per request)."""
+    connection = connections[alias]
+    if connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        return 'psycopg'
+    if getattr(settings, 'DATABASE_POOL', '') == 'pgbouncer':
+        return 'pgbouncer'
+    return 'persistent' if connection.settings_dict.get('CONN_MAX_AGE') else 'none'
+
+
+def pool_stats(alias='default'):
+    """
+    Connection metrics for ``alias``. With a psycopg pool these are the
+    pool's counters (pool_size, pool_available, requests_waiting,
+    connections_num, ...); otherwise the persistent-connection settings and
+    whether the calling thread holds an open connection.
+    """
+    connection = connections[alias]
+    stats = {
+        'alias': alias,
+        'mode': pool_mode(alias),
+        'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS', False),
+    }
+    if stats['mode'] == 'psycopg':
+        stats.update(connection.pool.get_stats())
+    else:
+        stats['conn_max_age'] = connection.settings_dict.get('CONN_MAX_AGE')
+        stats['connected'] = connection.connection is not None
+    return stats
@@ -0,0 +1,368 @@
+"""
+Request-level performance metrics.
+
+RequestMetricsMiddleware records, per route and method:
+
+- request latency, DB queries per request and the time spent in them,
+  time spent building serializer ``.data``, time spent rendering the
+  response body and response size, as histograms;
+- request counts by status code.
+
+Queries are counted by an execute wrapper installed on every database
+connection; it only records while a request is being measured, so
+management commands and background threads are unaffected. Serialization
+time is reported by serializers using TimedSerializerMixin and
+TimedListSerializer, rendering time by FastJSONRenderer (see
+socialnetworkapi.renderers).
+
+The metrics are kept per process and exposed in the Prometheus text format
+at /metrics, together with the response cache, connection pool,
+password hashing and rate limit counters, to clients in
+METRICS['ALLOWED_IPS'] only. Requests slower than
+METRICS['SLOW_REQUEST_MS'] are logged with their SQL.
+"""
+import bisect
+import contextvars
+import ipaddress
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# SQL statements kept per request for the slow request log.
+MAX_LOGGED_QUERIES = 100
+
+
+def _config():
+    return getattr(settings, 'METRICS', {})
+
+
+class RequestMetrics:
+    """What one request spent, filled in while it is being handled."""
+    __slots__ = ('queries', 'query_time', 'serialize_time', 'render_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.statements = []
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def record_render_time(seconds):
+    """Add time spent encoding the response body to the current request."""
+    current = _current.get()
+    if current is not None:
+        current.render_time += seconds
+
+
+def record_serialize_time(seconds):
+    """Add time spent building serializer data to the current request."""
+    current = _current.get()
+    if current is not None:
+        current.serialize_time += seconds
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin recording the time spent building ``.data`` (queries
+    it triggers included) for the request metrics. Set
+    TimedListSerializer as ``Meta.list_serializer_class`` to cover
+    ``many=True`` too.
+    """
+
+    @property
+    def data(self):
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            record_serialize_time(time.perf_counter() - started)
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    pass
+
+
+def _record_query(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        current.queries += 1
+        current.query_time += elapsed
+        if len(current.statements) < MAX_LOGGED_QUERIES:
+            current.statements.append((sql, elapsed))
+
+
+def _instrument(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _instrument(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style. Not thread-safe on its own."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """``(le, cumulative count)`` pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield _format_number(bound), total
+        yield '+Inf', self.count
+
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Request latency.', LATENCY_BUCKETS),
+    'http_request_db_queries': ('Database queries per request.', QUERY_COUNT_BUCKETS),
+    'http_request_db_duration_seconds': ('Time spent in database queries per request.', LATENCY_BUCKETS),
+    'http_request_serialize_duration_seconds': ('Time spent building serializer data.', LATENCY_BUCKETS),
+    'http_request_render_duration_seconds': ('Time spent rendering the response body.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('Response body size (streaming responses excluded).', SIZE_BUCKETS),
+}
+
+
+class MetricsRegistry:
+    """Per-process request metrics, keyed by (route, method)."""
+
+    def __init__(self):
+        self._histograms = {name: {} for name in HISTOGRAMS}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status_code, duration, metrics, size=None):
+        labels = (route, method)
+        values = {
+            'http_request_duration_seconds': duration,
+            'http_request_db_queries': metrics.queries,
+            'http_request_db_duration_seconds': metrics.query_time,
+            'http_request_serialize_duration_seconds': metrics.serialize_time,
+            'http_request_render_duration_seconds': metrics.render_time,
+            'http_response_size_bytes': size,
+        }
+        with self._lock:
+            for name, value in values.items():
+                if value is None:
+                    continue
+                series = self._histograms[name]
+                histogram = series.get(labels)
+                if histogram is None:
+                    histogram = series[labels] = Histogram(HISTOGRAMS[name][1])
+                histogram.observe(value)
+            key = (route, method, str(status_code))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests handled.', '# TYPE http_requests_total counter']
+            for (route, method, status_code), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{_labels(route=route, method=method, status=status_code)} {count}')
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (route, method), histogram in sorted(self._histograms[name].items()):
+                    for le, count in histogram.samples():
+                        lines.append(f'{name}_bucket{_labels(route=route, method=method, le=le)} {count}')
+                    labels = _labels(route=route, method=method)
+                    lines.append(f'{name}_sum{labels} {_format_number(histogram.sum)}')
+                    lines.append(f'{name}_count{labels} {histogram.count}')
+        lines += _cache_lines() + _pool_lines() + _password_lines() + _throttle_lines()
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in HISTOGRAMS}
+            self._requests = {}
+
+
+registry = MetricsRegistry()
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _cache_lines():
+    from posts.cache import get_response_cache
+
+    lines = ['# HELP posts_cache_requests_total Response cache lookups.', '# TYPE posts_cache_requests_total counter']
+    for namespace, counts in get_response_cache().stats().items():
+        for result in ('hits', 'misses'):
+            lines.append(f'posts_cache_requests_total{_labels(namespace=namespace, result=result)} {counts[result]}')
+    return lines
+
+
+def _pool_lines():
+    from .dbpool import pool_stats
+
+    gauges = {}
+    for alias in connections:
+        for key, value in pool_stats(alias).items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            gauges.setdefault(f'db_pool_{key}', []).append(f'{_labels(alias=alias)} {_format_number(value)}')
+    lines = []
+    for name, samples in gauges.items():
+        lines.append(f'# TYPE {name} gauge')
+        lines += [name + sample for sample in samples]
+    return lines
+
+
+def _password_lines():
+    from .passwords import get_pool
+
+    stats = get_pool().stats()
+    return [
+        '# HELP password_hashing_in_flight Password hashes running or waiting for a worker.',
+        '# TYPE password_hashing_in_flight gauge',
+        f"password_hashing_in_flight {stats['in_flight']}",
+        '# HELP password_hashing_total Password hashes and verifications by outcome.',
+        '# TYPE password_hashing_total counter',
+        f"password_hashing_total{_labels(result='completed')} {stats['completed']}",
+        f"password_hashing_total{_labels(result='failed')} {stats['failed']}",
+        f"password_hashing_total{_labels(result='rejected')} {stats['rejected']}",
+    ]
+
+
+def _throttle_lines():
+    from .throttling import get_limiter
+
+    lines = [
+        '# HELP throttle_rejected_total Requests rejected by a rate limit, by route and limit dimension.',
+        '# TYPE throttle_rejected_total counter',
+    ]
+    for (route, dimension), count in sorted(get_limiter().rejections().items()):
+        lines.append(f'throttle_rejected_total{_labels(route=route, dimension=dimension)} {count}')
+    return lines
+
+
+def _scrape_allowed(request):
+    allowed = _config().get('ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if '*' in allowed:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in allowed)
+
+
+def metrics_view(request):
+    """
+    GET /metrics: this process's metrics in the Prometheus text format, for
+    clients whose address is in METRICS['ALLOWED_IPS'] (addresses or
+    networks, '*' for anyone); 403 for everyone else.
+    """
+    if not _scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure every request and record it in the registry. Put it first in
+    MIDDLEWARE so the timings cover the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = _config().get('ENABLED', True)
+        self.slow_request_ms = _config().get('SLOW_REQUEST_MS')
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    def record(self, request, response, duration, metrics):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, duration, metrics, size)
+
+        if self.slow_request_ms is not None and duration * 1000 >= self.slow_request_ms:
+            statements = ''.join(
+                f'\n  {elapsed * 1000:8.2f} ms  {sql}' for sql, elapsed in metrics.statements
+            )
+            logger.warning(
+                "Slow request: %s %s %d in %.1f ms, %d queries in %.1f ms, serialize %.1f ms, render %.1f ms%s",
+                request.method, request.get_full_path(), response.status_code, duration * 1000,
+                metrics.queries, metrics.query_time * 1000, metrics.serialize_time * 1000,
+                metrics.render_time * 1000, statements,
+            )
@@ -0,0 +1,145 @@
+"""
+Password hashing off the request path, with backpressure.
+
+Every hash and verification (registration, login, users.User passwords)
+goes through one PasswordHashingPool per process: at most WORKERS run at
+once and at most MAX_PENDING more wait for a worker. A caller that cannot
+get a slot within WAIT seconds fails with PasswordHashingBusy (503 with
+Retry-After) instead of queueing behind a registration burst. hashlib's
+PBKDF2 and scrypt and argon2-cffi release the GIL, so the workers hash in
+parallel with each other and with the threads serving other requests.
+
+The calling thread still waits for its hash: it submits the work and
+blocks on the result, so a request doing a hash holds its worker thread
+for as long as before (plus any queueing). What the pool bounds is the
+number of hashes burning CPU at once and the number of requests waiting
+for one; requests that don't hash are never stuck behind them. Only the
+CPU-bound part runs in the pool; user lookups and the rehash that follows
+a parameter change stay on the calling thread and its database
+connection.
+
+The hasher classes below are Django's, with the work factors taken from
+settings.PASSWORD_HASHER_PARAMS; settings.PASSWORD_HASHERS picks the
+algorithm for new hashes.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many password operations in progress; try again shortly.'
+    default_code = 'password_hashing_busy'
+    # DRF's exception handler turns ``wait`` into a Retry-After header.
+    wait = 1
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for password hashing; see the module docstring.
+    """
+
+    def __init__(self, workers=2, max_pending=32, wait=2.0):
+        self.workers = workers
+        self.wait = wait
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` on a worker and wait for its result."""
+        if not self._slots.acquire(timeout=self.wait):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHashingBusy()
+        with self._lock:
+            self._in_flight += 1
+        succeeded = False
+        try:
+            result = self.executor.submit(fn, *args).result()
+            succeeded = True
+            return result
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if succeeded:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide PasswordHashingPool configured by settings.PASSWORD_HASHING."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = getattr(settings, 'PASSWORD_HASHING', {})
+                _pool = PasswordHashingPool(**{name.lower(): value for name, value in config.items()})
+    return _pool
+
+
+def hash_password(password):
+    """make_password() on the pool."""
+    return get_pool().run(hashers.make_password, password)
+
+
+def _check(password, encoded):
+    outdated = []
+    valid = hashers.check_password(password, encoded, setter=outdated.append)
+    return valid, bool(outdated)
+
+
+def verify_password(password, encoded):
+    """
+    check_password() on the pool. Returns ``(valid, must_update)``;
+    must_update means a valid password was hashed with an algorithm or work
+    factor other than the current ones and should be rehashed.
+    """
+    return get_pool().run(_check, password, encoded)
+
+
+class ConfiguredHasherMixin:
+    """Override the hasher's work factors with PASSWORD_HASHER_PARAMS[algorithm]."""
+
+    def __init__(self):
+        super().__init__()
+        params = getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(self.algorithm, {})
+        for name, value in params.items():
+            setattr(self, name, value)
+
+
+class PBKDF2PasswordHasher(ConfiguredHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(ConfiguredHasherMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class ScryptPasswordHasher(ConfiguredHasherMixin, hashers.ScryptPasswordHasher):
+    pass
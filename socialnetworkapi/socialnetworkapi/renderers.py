@@ -0,0 +1,49 @@
+"""
+JSON rendering with orjson.
+
+FastJSONRenderer is a drop-in replacement for DRF's JSONRenderer: for API
+payloads it produces the same bytes (compact separators, raw UTF-8, 'Z' for
+UTC datetimes, U+2028/U+2029 escaped), only several times faster. orjson is
+optional; without it, or for anything orjson can't encode natively and the
+DRF encoder can't convert, it falls back to JSONRenderer. Time spent
+rendering is reported to socialnetworkapi.metrics.
+"""
+import time
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from .metrics import record_render_time
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Converts what orjson can't encode natively (lazy strings, Decimal, querysets...).
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return self._render(data, accepted_media_type, renderer_context)
+        finally:
+            record_render_time(time.perf_counter() - started)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Indented output is for humans (?indent= / browsable API); keep it on the stdlib path.
+        if self.get_indent(accepted_media_type or '', renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder.default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as JSONRenderer: these are valid JSON but not valid JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,167 @@
+"""
+The OpenAPI (Swagger 2.0) document, generated once instead of per request.
+
+drf_yasg's schema view introspects every view and serializer on each hit.
+Here the document is built by ``python manage.py generate_openapi_schema``
+into the artifact at OPENAPI_SCHEMA['PATH'] (or, when there is no artifact,
+on the first request) and kept in memory for the life of the process.
+/swagger.json and /swagger.yaml serve those bytes with an ETag made of the
+API version and a digest of the document, and a long Cache-Control max-age;
+/swagger/ and /redoc/ load the document through their SPEC_URL setting.
+
+drf_yasg stays in INSTALLED_APPS for the UI pages' templates and static
+files, which only imports its (empty) package at startup; its generator,
+inspectors and codecs are imported to generate the document, render it as
+YAML or serve a docs UI page, so workers that never do either don't load
+them. The saving is per worker memory and first-request time, not a
+faster Django startup.
+
+A missing artifact is reported by the ``openapi.W001`` system check
+(registered by main.apps) and logged when a worker falls back to
+generating the document itself.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core import checks
+from django.http import HttpResponse, HttpResponseNotAllowed
+
+from .conditional import check_not_modified, with_validators
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=utf-8',
+    'yaml': 'application/yaml; charset=utf-8',
+}
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Social Network API",
+        default_version='v1',
+        description="API documentation for Social Network application",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@socialnetwork.local"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def generate_schema():
+    """Introspect the URLconf and return the document as JSON bytes."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(api_info(), url=_config().get('API_URL') or None)
+    return OpenAPICodecJson(validators=[], pretty=True).encode(generator.get_schema(request=None, public=True))
+
+
+class SchemaDocument:
+    """A generated document, with its validators and lazily rendered YAML."""
+
+    def __init__(self, content):
+        self.json = content
+        self.digest = hashlib.sha256(content).hexdigest()
+        self.version = json.loads(content)['info']['version']
+        self._yaml = None
+
+    @property
+    def yaml(self):
+        if self._yaml is None:
+            from drf_yasg.codecs import yaml_dump
+
+            self._yaml = yaml_dump(json.loads(self.json), binary=True)
+        return self._yaml
+
+    def content(self, format):
+        return self.json if format == 'json' else self.yaml
+
+    def etag(self, format):
+        return f'"{self.version}-{self.digest[:20]}-{format}"'
+
+
+def _config():
+    return getattr(settings, 'OPENAPI_SCHEMA', {})
+
+
+_document = None
+_document_lock = threading.Lock()
+
+
+def get_schema_document():
+    """Return the process-wide SchemaDocument, from the artifact when there is one."""
+    global _document
+    if _document is None:
+        with _document_lock:
+            if _document is None:
+                path = _config().get('PATH')
+                if path and os.path.exists(path):
+                    with open(path, 'rb') as fh:
+                        content = fh.read()
+                else:
+                    logger.warning(
+                        "OpenAPI document %s is missing; generating it in this worker. Run "
+                        "`python manage.py generate_openapi_schema` when deploying.", path,
+                    )
+                    content = generate_schema()
+                _document = SchemaDocument(content)
+    return _document
+
+
+def check_schema_artifact(app_configs=None, **kwargs):
+    """System check: warn when the precomputed document is missing."""
+    path = _config().get('PATH')
+    if not path or os.path.exists(path):
+        return []
+    return [checks.Warning(
+        f"The OpenAPI document {path} (OPENAPI_SCHEMA['PATH']) does not exist.",
+        hint="Run `python manage.py generate_openapi_schema`. Until then every worker "
+             "generates the document on its first /swagger request.",
+        id='openapi.W001',
+    )]
+
+
+def write_schema(path):
+    """Generate the document into the artifact at ``path``; returns the SchemaDocument."""
+    document = SchemaDocument(generate_schema())
+    with open(path, 'wb') as fh:
+        fh.write(document.json)
+    return document
+
+
+def schema_view(request, format):
+    """GET /swagger.json and /swagger.yaml: the precomputed document."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    document = get_schema_document()
+    etag = document.etag(format)
+    response = check_not_modified(request, etag)
+    if response is None:
+        response = with_validators(HttpResponse(document.content(format), content_type=CONTENT_TYPES[format]), etag)
+    response['Cache-Control'] = f"public, max-age={_config().get('MAX_AGE', 86400)}"
+    return response
+
+
+_ui_views = {}
+
+
+def docs_ui_view(request, renderer):
+    """GET /swagger/ and /redoc/: drf_yasg's UI pages, built on first use."""
+    view = _ui_views.get(renderer)
+    if view is None:
+        from drf_yasg.views import get_schema_view
+        from rest_framework import permissions
+
+        # The pages fetch the document from SPEC_URL, so the view itself
+        # never needs to introspect any endpoint.
+        page_view = get_schema_view(
+            api_info(), patterns=[], public=True, permission_classes=(permissions.AllowAny,),
+        )
+        view = _ui_views[renderer] = page_view.with_ui(renderer, cache_timeout=0)
+    return view(request)
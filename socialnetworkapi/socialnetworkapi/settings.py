@@ -44,9 +44,11 @@ INSTALLED_APPS = [
     'posts',
     'corsheaders',
     'main',
+    'feed',
 ]
 
 MIDDLEWARE = [
+    'socialnetworkapi.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Добавьте эту строку в начало
 
     'django.middleware.security.SecurityMiddleware',
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'socialnetworkapi.db_router.ReplicaRoutingMiddleware',
 
 ]
 
@@ -85,6 +88,9 @@ WSGI_APPLICATION = 'socialnetworkapi.wsgi.application'
 
 import os
 
+# socialnetworkapi.asgi sets DJANGO_SERVER_INTERFACE=asgi before loading settings.
+SERVER_INTERFACE = os.environ.get('DJANGO_SERVER_INTERFACE', 'wsgi')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -93,9 +99,60 @@ DATABASES = {
         'PASSWORD': os.environ.get('DATABASE_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
         'PORT': os.environ.get('DATABASE_PORT', '5432'),
+        # Keep connections open between requests instead of paying the
+        # TCP + auth handshake every time, and check them before reuse.
+        # Not under ASGI: Django doesn't reuse persistent connections across
+        # async requests, so they would only pile up until CONN_MAX_AGE
+        # expires; use DATABASE_POOL=psycopg there instead.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DATABASE_CONN_MAX_AGE', '0' if SERVER_INTERFACE == 'asgi' else '60',
+        )),
+        'CONN_HEALTH_CHECKS': os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# DATABASE_POOL selects how connections are shared (see socialnetworkapi.dbpool):
+# - unset: one persistent connection per worker thread (CONN_MAX_AGE above)
+# - psycopg: a psycopg_pool.ConnectionPool per process (needs psycopg 3 with the
+#   pool extra); Django requires CONN_MAX_AGE = 0 with it, and
+#   CONN_HEALTH_CHECKS makes the pool check connections it hands out
+# - pgbouncer: DATABASE_HOST/PORT point at PgBouncer in transaction pooling
+#   mode, which can't keep server-side cursors across transactions
+DATABASE_POOL = os.environ.get('DATABASE_POOL', '')
+if DATABASE_POOL == 'psycopg':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', '600')),
+        },
+    }
+elif DATABASE_POOL == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Read replicas (see socialnetworkapi.db_router): DATABASE_REPLICA_HOSTS=host1,host2:5433
+# adds one alias per host ("replica_1", ...) sharing the default database settings.
+# GET/HEAD/OPTIONS requests read from a replica; a client that writes is pinned
+# to the primary for DATABASE_REPLICA_PIN_SECONDS, and replicas that are down
+# or lag more than DATABASE_REPLICA_MAX_LAG seconds are skipped.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    hostname, _, port = host.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=hostname,
+        PORT=port or DATABASES['default']['PORT'],
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['socialnetworkapi.db_router.ReplicaRouter']
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get('DATABASE_REPLICA_MAX_LAG', '5'))
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.environ.get('DATABASE_REPLICA_CHECK_INTERVAL', '1'))
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -116,6 +173,41 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (see socialnetworkapi.passwords). The first hasher in
+# PASSWORD_HASHERS hashes new passwords; PASSWORD_HASHER picks it. Hashes made
+# with the others still verify and are rehashed on the next login, as are
+# hashes with different PASSWORD_HASHER_PARAMS. argon2 needs argon2-cffi.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2_sha256': 'socialnetworkapi.passwords.PBKDF2PasswordHasher',
+    'argon2': 'socialnetworkapi.passwords.Argon2PasswordHasher',
+    'scrypt': 'socialnetworkapi.passwords.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2_sha256': {'iterations': int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '1000000'))},
+    'argon2': {
+        'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', '2')),
+        'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', '102400')),
+        'parallelism': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', '8')),
+    },
+    'scrypt': {'work_factor': int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', str(2 ** 14)))},
+}
+# At most WORKERS hashes run at once per process and MAX_PENDING more wait;
+# callers that wait longer than WAIT seconds get a 503 with Retry-After.
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', '2')),
+    'MAX_PENDING': int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', '32')),
+    'WAIT': float(os.environ.get('PASSWORD_HASHING_WAIT', '2')),
+}
+AUTHENTICATION_BACKENDS = ['main.backends.PooledModelBackend']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -133,6 +225,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files: post images and their variants (see posts.images)
+MEDIA_URL = os.environ.get('MEDIA_URL', '/media/')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -141,9 +237,116 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 from datetime import timedelta
 
 REST_FRAMEWORK = {
+    # Views that need a user set authentication_classes themselves (see
+    # main.authentication); elsewhere the Authorization header is ignored.
     'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_RENDERER_CLASSES': [
+        'socialnetworkapi.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'socialnetworkapi.throttling.TokenBucketThrottle',
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For; the client
+    # IP used by the throttles is taken from there instead of REMOTE_ADDR.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
+# Token-bucket rate limits for write and auth endpoints (see
+# socialnetworkapi.throttling): {URL name: {'user'|'ip'|'route': rate}},
+# a rate being 'N/period' or 'N/period burst B'. Only POST, PUT, PATCH and
+# DELETE are limited. THROTTLE_RATES overrides entries, e.g.
+# THROTTLE_RATES='post-list.user=100/min burst 20,register.ip=' (empty removes).
+# LocalBucketStore is per process; with several workers use
+# socialnetworkapi.throttling.CacheBucketStore on a shared cache in CACHES.
+THROTTLING = {
+    'ENABLED': os.environ.get('THROTTLING_ENABLED', 'True') == 'True',
+    'BACKEND': os.environ.get('THROTTLING_BACKEND', 'socialnetworkapi.throttling.LocalBucketStore'),
+    'MAX_ENTRIES': int(os.environ.get('THROTTLING_MAX_ENTRIES', '100000')),
+    'RATES': {
+        'register': {'ip': '10/hour burst 5', 'route': '20/s burst 50'},
+        'token_obtain_pair': {'ip': '30/min burst 10', 'route': '50/s burst 100'},
+        'token_refresh': {'ip': '60/min burst 20'},
+        'post-list': {'user': '30/min burst 10', 'ip': '120/min burst 30'},
+        'post-image': {'user': '10/min burst 5', 'ip': '30/min burst 10'},
+        'comment-list': {'user': '60/min burst 20', 'ip': '240/min burst 60'},
+        # Batch endpoints are charged per item; the burst must hold a full batch (BATCH_MAX_ITEMS).
+        'post-batch': {'user': '20000/hour burst 10000', 'ip': '40000/hour burst 10000'},
+        'comment-batch': {'user': '20000/hour burst 10000', 'ip': '40000/hour burst 10000'},
+    },
+}
+for _override in filter(None, os.environ.get('THROTTLE_RATES', '').split(',')):
+    _scope, _, _rate = _override.partition('=')
+    _route, _, _dimension = _scope.strip().rpartition('.')
+    THROTTLING['RATES'].setdefault(_route, {})[_dimension] = _rate.strip() or None
+
+# Keyset pagination for list endpoints (see posts.pagination)
+POSTS_PAGE_SIZE = int(os.environ.get('POSTS_PAGE_SIZE', '20'))
+POSTS_MAX_PAGE_SIZE = int(os.environ.get('POSTS_MAX_PAGE_SIZE', '100'))
+
+# Largest ?top_comments preview the post endpoints embed per post
+POSTS_TOP_COMMENTS_MAX = int(os.environ.get('POSTS_TOP_COMMENTS_MAX', '10'))
+
+# Post image uploads (see posts.images). Each variant is scaled to fit a
+# size x size box and stored as JPEG/PNG plus WebP; WORKERS processes render
+# them off the request path. Needs Pillow and a local MEDIA_ROOT.
+POSTS_IMAGES = {
+    'MAX_BYTES': int(os.environ.get('POSTS_IMAGE_MAX_BYTES', str(10 * 1024 * 1024))),
+    'MAX_PIXELS': int(os.environ.get('POSTS_IMAGE_MAX_PIXELS', str(40_000_000))),
+    'VARIANTS': {
+        name: int(size) for name, size in (
+            variant.split(':') for variant in os.environ.get('POSTS_IMAGE_VARIANTS', 'thumb:320,medium:960').split(',')
+        )
+    },
+    'QUALITY': int(os.environ.get('POSTS_IMAGE_QUALITY', '80')),
+    'WORKERS': int(os.environ.get('POSTS_IMAGE_WORKERS', '2')),
+}
+
+# Upper bound on items per /api/posts/batch/ or /api/comments/batch/ request (see posts.batch)
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '10000'))
+
+# Rows fetched per round trip by ?stream=json|ndjson exports (see socialnetworkapi.streaming)
+STREAMING_CHUNK_SIZE = int(os.environ.get('STREAMING_CHUNK_SIZE', '2000'))
+
+# Coalesce comment like counters in memory and flush them in batches
+# (see posts.likes.LikeBuffer). Off by default: pending increments are
+# lost if a worker dies before flushing.
+POSTS_LIKE_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('POSTS_LIKE_WRITE_BEHIND', 'False') == 'True',
+    'FLUSH_INTERVAL': float(os.environ.get('POSTS_LIKE_FLUSH_INTERVAL', '1.0')),
+    'MAX_PENDING': int(os.environ.get('POSTS_LIKE_MAX_PENDING', '500')),
+}
+
+# Read-through cache for post_detail and comment_list GET (see posts.cache).
+# LocMemLRUBackend is per process; with several workers point BACKEND at
+# posts.cache.DjangoCacheBackend backed by a shared cache in CACHES.
+POSTS_CACHE = {
+    'BACKEND': os.environ.get('POSTS_CACHE_BACKEND', 'posts.cache.LocMemLRUBackend'),
+    'TIMEOUT': int(os.environ.get('POSTS_CACHE_TIMEOUT', '60')),
+    'MAX_ENTRIES': int(os.environ.get('POSTS_CACHE_MAX_ENTRIES', '10000')),
+}
+
+# URL names served by the async views in posts/async_views.py and
+# users/async_views.py ('*' for all of them), e.g. ASYNC_VIEWS=post-list,post-detail.
+# Only worth it under an ASGI server (uvicorn socialnetworkapi.asgi:application);
+# under WSGI every async view runs in its own event loop.
+ASYNC_VIEWS = [name for name in os.environ.get('ASYNC_VIEWS', '').split(',') if name]
+
+# Home feed (see feed.stores and feed.fanout). New posts are pushed into up
+# to CAP-sized timelines of the author's followers; authors with more than
+# FANOUT_LIMIT followers are merged in at read time instead. Following a
+# user pushes their BACKFILL newest posts; unfollowing removes their posts.
+# Use feed.stores.RedisTimelineStore (REDIS_URL) to keep timelines out of
+# the relational database.
+FEED = {
+    'BACKEND': os.environ.get('FEED_BACKEND', 'feed.stores.DatabaseTimelineStore'),
+    'CAP': int(os.environ.get('FEED_CAP', '800')),
+    'FANOUT_LIMIT': int(os.environ.get('FEED_FANOUT_LIMIT', '10000')),
+    'BACKFILL': int(os.environ.get('FEED_BACKFILL', '50')),
+}
+if os.environ.get('FEED_REDIS_URL'):
+    FEED['REDIS_URL'] = os.environ['FEED_REDIS_URL']
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  # Access-токен живет 1 час
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),  # Refresh-токен живет 7 дней
@@ -153,22 +356,58 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),  # Ожидаем заголовок Authorization: Bearer <token>
 }
 
+# request.user is built from the JWT claims (see main.authentication); whether
+# the user is still active and the token not revoked is cached for TIMEOUT seconds.
+JWT_AUTH_CACHE = {
+    'BACKEND': os.environ.get('JWT_AUTH_CACHE_BACKEND', 'posts.cache.LocMemLRUBackend'),
+    'TIMEOUT': int(os.environ.get('JWT_AUTH_CACHE_TIMEOUT', '30')),
+    'MAX_ENTRIES': int(os.environ.get('JWT_AUTH_CACHE_MAX_ENTRIES', '10000')),
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Request metrics (see socialnetworkapi.metrics), served at /metrics to the
+# addresses or networks in METRICS_ALLOWED_IPS ('*' for anyone). Requests
+# slower than METRICS_SLOW_REQUEST_MS are logged with their SQL.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'True') == 'True',
+    'SLOW_REQUEST_MS': float(os.environ.get('METRICS_SLOW_REQUEST_MS', '500')),
+    'ALLOWED_IPS': [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()],
+}
+
+# OpenAPI document (see socialnetworkapi.schema), generated into PATH by
+# `python manage.py generate_openapi_schema`, or on first request without it.
+# API_URL is the base URL the document advertises (host and scheme).
+OPENAPI_SCHEMA = {
+    'PATH': os.environ.get('OPENAPI_SCHEMA_PATH', str(BASE_DIR / 'openapi.json')),
+    'API_URL': os.environ.get('OPENAPI_API_URL', ''),
+    'MAX_AGE': int(os.environ.get('OPENAPI_SCHEMA_MAX_AGE', '86400')),
+}
+
+# The docs UI pages load the precomputed document instead of regenerating it.
+SWAGGER_SETTINGS = {'SPEC_URL': 'schema-json'}
+REDOC_SETTINGS = {'SPEC_URL': 'schema-json'}
+
+# Logging every SQL statement at DEBUG is itself a per-query cost; raise
+# DJANGO_LOG_LEVEL to DEBUG only while debugging.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
         'console': {
-            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
         },
     },
     'loggers': {
         'django': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': True,
         },
+        'socialnetworkapi': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
-}
\ No newline at end of file
+}
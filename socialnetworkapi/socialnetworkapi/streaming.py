@@ -0,0 +1,93 @@
+"""
+Streaming exports for list endpoints.
+
+A list view normally builds ``serializer.data`` for every row and renders
+it in one piece, so memory grows with the table. With ``?stream=json`` or
+``?stream=ndjson`` the view instead returns a StreamingHttpResponse that
+walks the queryset with ``.iterator(chunk_size=...)`` and encodes rows one
+at a time, keeping peak memory bounded by the chunk size.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from .renderers import FastJSONRenderer
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+_renderer = FastJSONRenderer()
+
+
+def requested_stream_format(request):
+    """
+    Return the ``stream`` query parameter ('json' or 'ndjson'), or None for
+    a regular paginated/in-memory response.
+    """
+    stream_format = request.query_params.get('stream')
+    if stream_format is None:
+        return None
+    if stream_format not in CONTENT_TYPES:
+        raise ValidationError({'stream': ['Must be "json" or "ndjson".']})
+    return stream_format
+
+
+def streaming_response(queryset, serializer_class, stream_format, chunk_size=None):
+    """
+    Stream every row of ``queryset`` serialized with ``serializer_class``,
+    as one JSON array or as newline-delimited JSON.
+
+    prefetch_related() on the queryset is honoured per chunk. Under ASGI,
+    Django buffers sync iterators before sending them, so serve exports
+    from a WSGI worker.
+
+    The rows are read after the view has returned, once the routing
+    middleware (socialnetworkapi.db_router) has reset the request's read
+    alias, so the queryset is bound to the database chosen for the
+    request here.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'STREAMING_CHUNK_SIZE', 2000)
+    queryset = queryset.using(queryset.db)
+    rows = _encode_rows(queryset, serializer_class(), chunk_size)
+    if stream_format == 'ndjson':
+        content = _ndjson(rows, chunk_size)
+    else:
+        content = _json_array(rows, chunk_size)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[stream_format])
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the whole export
+    return response
+
+
+def _encode_rows(queryset, serializer, chunk_size):
+    # One bound serializer is reused for every row instead of building a
+    # serializer (and its fields) per instance.
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield _renderer.render(serializer.to_representation(instance))
+
+
+def _json_array(rows, batch_size):
+    batch = [b'[']
+    for index, row in enumerate(rows):
+        if index:
+            batch.append(b',')
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield b''.join(batch)
+            batch = []
+    batch.append(b']')
+    yield b''.join(batch)
+
+
+def _ndjson(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        batch.append(b'\n')
+        if len(batch) >= batch_size:
+            yield b''.join(batch)
+            batch = []
+    if batch:
+        yield b''.join(batch)
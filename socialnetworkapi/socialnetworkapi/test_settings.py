@@ -0,0 +1,34 @@
+"""
+Settings for the test suite: SQLite instead of PostgreSQL, so the tests run
+without a database server.
+
+    python manage.py test --settings=socialnetworkapi.test_settings
+
+Search runs on the FTS5 fallback here (see posts.search); the suite also
+runs against PostgreSQL with the regular settings.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    },
+    # A separate database standing in for a read replica. It is not listed in
+    # DATABASE_REPLICAS, so it gets migrated; the routing tests enable it.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+DATABASE_POOL = ''
+DATABASE_REPLICAS = []
+
+# Tests send many writes from one client; the throttling tests enable it themselves.
+THROTTLING['ENABLED'] = False
+
+# Fast hashing; the hasher settings themselves are exercised by benchmarks.passwords.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# The tests don't serve the precomputed OpenAPI document.
+SILENCED_SYSTEM_CHECKS = ['openapi.W001']
@@ -0,0 +1,350 @@
+import json
+import tempfile
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework.test import APIClient
+
+from posts import async_views as post_async_views
+from posts.cache import get_response_cache
+from posts.models import Post
+from users import async_views as user_async_views
+from users.models import User
+from . import throttling
+from .async_views import select_view
+from .db_router import PIN_COOKIE, health
+from .passwords import PasswordHashingPool
+from .schema import check_schema_artifact
+from .throttling import LocalBucketStore, RateLimiter
+
+# URLconf for AsyncViewTests: every read endpoint with an async version
+# routed to it, ahead of the regular routes.
+urlpatterns = [
+    path('api/posts/', post_async_views.post_list),
+    path('api/posts/<int:pk>/', post_async_views.post_detail),
+    path('api/users/', user_async_views.users),
+    path('api/users/<int:id>/', user_async_views.user_detail),
+    path('', include('socialnetworkapi.urls')),
+]
+
+
+@skipUnless('replica' in settings.DATABASES, "needs a 'replica' database alias (see test_settings)")
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """
+    The primary and the replica hold different rows here, so each response
+    shows which database served it.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        get_response_cache().backend.clear()
+        health.reset()
+        self.addCleanup(health.reset)
+        self.client = APIClient()
+        self.author = User.objects.create(name='primary author', age=30)
+        self.primary_post = Post.objects.create(title='On the primary', description='', author=self.author)
+        replica_author = User.objects.using('replica').create(name='replica author', age=30)
+        self.replica_post = Post.objects.using('replica').create(
+            title='On the replica', description='', author=replica_author,
+        )
+
+    def titles(self):
+        get_response_cache().backend.clear()
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        return [post['title'] for post in response.json()['results']]
+
+    def test_get_reads_from_replica(self):
+        self.assertEqual(self.titles(), ['On the replica'])
+
+    def test_stream_reads_from_replica(self):
+        # The body is produced after the middleware has returned.
+        response = self.client.get('/api/posts/', {'stream': 'ndjson'})
+
+        self.assertIn(b'On the replica', b''.join(response.streaming_content))
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.post(
+            '/api/posts/', {'title': 'Just written', 'description': 'text'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(sorted(self.titles()), ['Just written', 'On the primary'])
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        with mock.patch('socialnetworkapi.db_router.replica_lag', side_effect=DatabaseError('connection refused')):
+            self.assertEqual(self.titles(), ['On the primary'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch('socialnetworkapi.db_router.replica_lag', return_value=settings.DATABASE_REPLICA_MAX_LAG + 60):
+            self.assertEqual(self.titles(), ['On the primary'])
+
+
+class RateLimiterTests(TestCase):
+    def test_rejected_request_takes_no_tokens(self):
+        limiter = RateLimiter(LocalBucketStore(), {'post-list': {'user': '10/hour', 'ip': '2/hour'}})
+        clients = {'user': 'user:1', 'ip': '10.0.0.1', 'route': '*'}
+
+        self.assertTrue(limiter.check('post-list', clients)[0])
+        self.assertTrue(limiter.check('post-list', clients)[0])
+        for _ in range(5):
+            allowed, limit, remaining, wait = limiter.check('post-list', clients)
+            self.assertFalse(allowed)
+            self.assertEqual(limit, 2)
+
+        # The per-user bucket only paid for the two allowed requests.
+        allowed, limit, remaining, wait = limiter.check('post-list', {**clients, 'ip': '10.0.0.2'})
+        self.assertTrue(allowed)
+        self.assertEqual((limit, int(remaining)), (2, 1))
+        self.assertEqual(limiter.rejections(), {('post-list', 'ip'): 5})
+
+    def test_cost_above_capacity_never_passes(self):
+        limiter = RateLimiter(LocalBucketStore(), {'post-batch': {'ip': '10/min'}})
+
+        allowed, limit, remaining, wait = limiter.check('post-batch', {'ip': '10.0.0.1'}, cost=11)
+
+        self.assertFalse(allowed)
+        self.assertIsNone(wait)
+        self.assertEqual(remaining, 10)
+
+
+@override_settings(THROTTLING={'ENABLED': True, 'RATES': {'post-batch': {'ip': '5/hour'}}})
+class BatchThrottleTests(TestCase):
+    def setUp(self):
+        throttling._limiter = None
+        self.addCleanup(setattr, throttling, '_limiter', None)
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+        User.objects.create(name='author', age=30)
+
+    def batch(self, size):
+        items = [{'title': f'Post {i}', 'description': 'text'} for i in range(size)]
+        return self.client.post('/api/posts/batch/', {'create': items}, format='json')
+
+    def test_batch_is_charged_per_item(self):
+        response = self.batch(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+
+        response = self.batch(3)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.batch(2).status_code, 200)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_batch_larger_than_burst_is_rejected(self):
+        response = self.batch(6)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertNotIn('Retry-After', response)
+        self.assertEqual(Post.objects.count(), 0)
+
+
+class PasswordHashingPoolTests(TestCase):
+    def test_failures_are_counted_separately(self):
+        pool = PasswordHashingPool(workers=1)
+        self.addCleanup(pool.executor.shutdown)
+
+        self.assertEqual(pool.run(str.upper, 'a'), 'A')
+        with self.assertRaises(TypeError):
+            pool.run(str.upper, None)
+
+        self.assertEqual(pool.stats(), {'workers': 1, 'in_flight': 0, 'completed': 1, 'failed': 1, 'rejected': 0})
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+
+    def test_serializer_time_is_recorded(self):
+        author = User.objects.create(name='author', age=30)
+        post = Post.objects.create(title='Post', description='text', author=author)
+        self.client.get(f'/api/posts/{post.pk}/')
+
+        metrics = self.client.get('/metrics').content.decode()
+
+        self.assertIn(
+            'http_request_serialize_duration_seconds_count{route="api/posts/<int:pk>/",method="GET"}', metrics,
+        )
+
+    @override_settings(METRICS={'ALLOWED_IPS': ['10.0.0.0/8']})
+    def test_scrapes_are_limited_to_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+
+class SchemaArtifactCheckTests(TestCase):
+    def test_missing_artifact_is_reported(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as artifact:
+            with override_settings(OPENAPI_SCHEMA={'PATH': artifact.name}):
+                self.assertEqual(check_schema_artifact(), [])
+        with override_settings(OPENAPI_SCHEMA={'PATH': artifact.name}):
+            self.assertEqual([warning.id for warning in check_schema_artifact()], ['openapi.W001'])
+
+
+class AsyncViewTests(TestCase):
+    """
+    Each request goes to the DRF view through the regular URLconf and to the
+    async view under an async client; both must answer alike.
+    """
+    def setUp(self):
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+        self.author = User.objects.create(name='author', age=30)
+        self.posts = []
+        for i, tags in enumerate([['a'], ['a', 'b'], ['b'], []]):
+            post = Post.objects.create(title=f'Post {i}', description='text', author=self.author)
+            post.set_tags(tags, is_new=True)
+            self.posts.append(post)
+
+    def async_request(self, method, url, data=None, **headers):
+        kwargs = {'headers': headers}
+        if data is not None:
+            kwargs.update(data=data, content_type='application/json')
+        with override_settings(ROOT_URLCONF=__name__):
+            return async_to_sync(getattr(self.async_client, method))(url, **kwargs)
+
+    def assertSameResponse(self, url, **headers):
+        sync_response = self.client.get(url, headers=headers)
+        async_response = self.async_request('get', url, **headers)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'))
+        self.assertEqual(async_response.get('Last-Modified'), sync_response.get('Last-Modified'))
+        if sync_response.content:
+            self.assertEqual(async_response['Content-Type'], 'application/json')
+            self.assertEqual(async_response.json(), sync_response.json())
+        else:
+            self.assertEqual(async_response.content, b'')
+        return sync_response
+
+    def test_post_list(self):
+        for url in (
+            '/api/posts/',
+            '/api/posts/?tag=a',
+            '/api/posts/?tag=a&tag=b',
+            '/api/posts/?tag=a&tag=b&tag_match=any',
+            '/api/posts/?tag=missing',
+            '/api/posts/?tag_match=some',
+            '/api/posts/?cursor=invalid',
+            '/api/posts/?top_comments=1',
+        ):
+            with self.subTest(url):
+                self.assertSameResponse(url)
+
+    def test_post_list_pages(self):
+        url = '/api/posts/?page_size=1'
+        while url:
+            with self.subTest(url):
+                url = self.assertSameResponse(url).json()['next']
+
+    def test_post_detail(self):
+        url = f'/api/posts/{self.posts[1].pk}/'
+        # Cold and cached on either side.
+        self.assertEqual(self.async_request('get', url).status_code, 200)
+        self.assertSameResponse(url)
+        get_response_cache().backend.clear()
+        self.assertSameResponse(url)
+
+        self.assertSameResponse(f'/api/posts/{self.posts[1].pk}/?top_comments=1')
+        self.assertEqual(self.assertSameResponse('/api/posts/0/').status_code, 404)
+
+    def test_users(self):
+        User.objects.create(name='another', age=40)
+        self.assertSameResponse('/api/users/')
+        self.assertSameResponse(f'/api/users/{self.author.pk}/')
+        self.assertEqual(self.assertSameResponse('/api/users/0/').status_code, 404)
+
+    def test_revalidation(self):
+        for url in ('/api/posts/', f'/api/posts/{self.posts[0].pk}/', '/api/users/', f'/api/users/{self.author.pk}/'):
+            with self.subTest(url):
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.assertSameResponse(url, if_none_match=etag).status_code, 304)
+
+    def test_other_methods_fall_back_to_the_drf_views(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.async_request('post', '/api/posts/', {'title': 'New', 'description': 'text'})
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/posts/{response.json()['id']}/"
+        self.assertEqual(self.assertSameResponse(url).json(), response.json())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.async_request('put', url, {'title': 'Edited', 'description': 'text'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assertSameResponse(url).json()['title'], 'Edited')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.async_request('delete', url).status_code, 204)
+        self.assertEqual(self.assertSameResponse(url).status_code, 404)
+
+        response = self.async_request('post', '/api/users/', {'name': 'new', 'age': 20, 'password': 'secret'})
+        self.assertEqual(response.status_code, 201)
+        self.assertSameResponse(f"/api/users/{response.json()['id']}/")
+
+    def test_select_view(self):
+        sync_view, async_view = object(), object()
+        with override_settings(ASYNC_VIEWS=[]):
+            self.assertIs(select_view('post-list', sync_view, async_view), sync_view)
+        with override_settings(ASYNC_VIEWS=['post-list']):
+            self.assertIs(select_view('post-list', sync_view, async_view), async_view)
+            self.assertIs(select_view('post-detail', sync_view, async_view), sync_view)
+        with override_settings(ASYNC_VIEWS=['*']):
+            self.assertIs(select_view('post-detail', sync_view, async_view), async_view)
+
+
+class StreamingTests(TestCase):
+    """A streamed export holds the same rows as the regular response."""
+    def setUp(self):
+        get_response_cache().backend.clear()
+        self.client = APIClient()
+        self.author = User.objects.create(name='author', age=30)
+        for i in range(5):
+            User.objects.create(name=f'user {i}', age=20 + i)
+            post = Post.objects.create(title=f'Post {i}', description='text', author=self.author)
+            post.set_tags(['a'] if i % 2 else ['b'], is_new=True)
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response['Content-Type'], b''.join(response.streaming_content)
+
+    def assertStreams(self, url, expected):
+        content_type, body = self.stream(f'{url}stream=json')
+        self.assertEqual(content_type, 'application/json')
+        self.assertEqual(json.loads(body), expected)
+
+        content_type, body = self.stream(f'{url}stream=ndjson')
+        self.assertEqual(content_type, 'application/x-ndjson')
+        self.assertTrue(body.endswith(b'\n'))
+        self.assertEqual([json.loads(line) for line in body.splitlines()], expected)
+
+    def test_posts(self):
+        for url in ('/api/posts/?', '/api/posts/?tag=a&'):
+            with self.subTest(url):
+                expected = self.client.get(f'{url}page_size=100').json()['results']
+                self.assertEqual(len(expected), 5 if url == '/api/posts/?' else 2)
+                self.assertStreams(url, expected)
+
+    def test_users(self):
+        self.assertStreams('/api/users/?', self.client.get('/api/users/').json())
+
+    @override_settings(STREAMING_CHUNK_SIZE=2)
+    def test_rows_span_chunks(self):
+        self.assertStreams('/api/users/?', self.client.get('/api/users/').json())
+
+    def test_empty(self):
+        self.assertEqual(json.loads(self.stream('/api/posts/?tag=missing&stream=json')[1]), [])
+        self.assertEqual(self.stream('/api/posts/?tag=missing&stream=ndjson')[1], b'')
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/users/?stream=csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('stream', response.json())
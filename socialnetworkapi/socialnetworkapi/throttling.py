@@ -0,0 +1,257 @@
+"""
+Token-bucket rate limits for write and auth endpoints.
+
+settings.THROTTLING['RATES'] maps a URL name to one limit per dimension:
+
+- ``user``: per authenticated user (anonymous clients by IP address);
+- ``ip``: per client IP address (see REST_FRAMEWORK['NUM_PROXIES']);
+- ``route``: for the route as a whole, across all clients.
+
+Only POST, PUT, PATCH and DELETE are limited; reads and routes without
+rates return before touching a bucket. A rate ``'N/period'`` refills N
+tokens per period (s, min, hour or day) into a bucket holding at most N,
+or B with ``'N/period burst B'``. A request costs one token, a batch
+request (BatchTokenBucketThrottle) one per item. It is allowed only if
+every bucket of the route holds enough tokens, and only then are they
+taken, so a request rejected by one bucket does not drain the others. A
+bucket is two numbers, the tokens left and when it was last refilled, so
+a check is O(1) and needs no request history.
+
+Allowed and rejected responses carry X-RateLimit-Limit and
+X-RateLimit-Remaining for the tightest bucket; rejections are 429 with
+Retry-After and are counted per route and dimension in /metrics.
+
+LocalBucketStore keeps the buckets in the worker process, so N workers
+allow N times the rates. CacheBucketStore shares them through a cache in
+settings.CACHES; it reads and writes the buckets without a lock, so
+clients racing on the same bucket may get slightly more than the rate.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+DIMENSIONS = ('user', 'ip', 'route')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+LIMITED_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def parse_rate(rate):
+    """
+    ``'30/min'`` or ``'30/min burst 10'`` -> ``(tokens per second, capacity)``.
+    Like DRF's rates, only the first letter of the period counts.
+    """
+    try:
+        limit, _, burst = rate.partition(' burst ')
+        requests, period = limit.strip().split('/')
+        requests = int(requests)
+        capacity = int(burst) if burst else requests
+        per_second = requests / PERIODS[period.strip()[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f"Invalid THROTTLING rate {rate!r}; use 'N/period' or 'N/period burst B'.")
+    if requests <= 0 or capacity <= 0:
+        raise ImproperlyConfigured(f"Invalid THROTTLING rate {rate!r}; N and B must be positive.")
+    return per_second, capacity
+
+
+def take_tokens(states, now, buckets, cost=1):
+    """
+    Refill the buckets up to ``now`` and take ``cost`` tokens from each of
+    them if all of them hold that many; otherwise take none. ``states`` are
+    the buckets' ``(tokens, refilled_at)`` (None for a new, full bucket) and
+    ``buckets`` their ``(rate, capacity)``. Returns the new states, whether
+    the tokens were taken, and per bucket ``(tokens left, seconds until it
+    holds cost tokens)``.
+    """
+    levels = []
+    for state, (rate, capacity) in zip(states, buckets):
+        tokens, refilled_at = state if state is not None else (capacity, now)
+        levels.append(min(capacity, tokens + max(0.0, now - refilled_at) * rate))
+    allowed = all(tokens >= cost for tokens in levels)
+    if allowed:
+        levels = [tokens - cost for tokens in levels]
+    results = [
+        (tokens, 0.0 if allowed or tokens >= cost else (cost - tokens) / rate)
+        for tokens, (rate, capacity) in zip(levels, buckets)
+    ]
+    return [(tokens, now) for tokens in levels], allowed, results
+
+
+class LocalBucketStore:
+    """
+    Buckets in this process, in an LRU of at most ``max_entries``; an
+    evicted bucket starts full again.
+    """
+
+    def __init__(self, max_entries=100000, **kwargs):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, cost=1):
+        """
+        ``buckets`` is a list of ``(key, rate, capacity)``; see take_tokens()
+        for the all-or-nothing semantics. Returns ``(allowed, results)``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = [self._buckets.pop(key, None) for key, rate, capacity in buckets]
+            states, allowed, results = take_tokens(
+                states, now, [(rate, capacity) for key, rate, capacity in buckets], cost,
+            )
+            for (key, rate, capacity), state in zip(buckets, states):
+                self._buckets[key] = state
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, results
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets in one of the caches configured in settings.CACHES, shared by every worker."""
+
+    def __init__(self, alias='default', **kwargs):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def take(self, buckets, cost=1):
+        keys = [f'throttle:{key}' for key, rate, capacity in buckets]
+        stored = self.cache.get_many(keys)
+        states, allowed, results = take_tokens(
+            [stored.get(key) for key in keys], time.time(), [(rate, capacity) for key, rate, capacity in buckets], cost,
+        )
+        for key, state, (_, rate, capacity) in zip(keys, states, buckets):
+            # An expired bucket would have refilled completely anyway.
+            self.cache.set(key, state, math.ceil(capacity / rate) + 1)
+        return allowed, results
+
+
+class RateLimiter:
+    """The configured rates and bucket store; see the module docstring."""
+
+    def __init__(self, store, rates, enabled=True):
+        self.store = store
+        self.enabled = enabled
+        self.limits = {}
+        for route, dimensions in rates.items():
+            unknown = set(dimensions) - set(DIMENSIONS)
+            if unknown:
+                raise ImproperlyConfigured(
+                    f"Unknown THROTTLING dimension(s) {sorted(unknown)} for {route!r}; use {', '.join(DIMENSIONS)}."
+                )
+            limits = [(dimension, *parse_rate(rate)) for dimension, rate in dimensions.items() if rate]
+            if limits:
+                self.limits[route] = limits
+        self._lock = threading.Lock()
+        self._rejected = Counter()
+
+    def check(self, route, clients, cost=1):
+        """
+        Take ``cost`` tokens from every one of the route's buckets, or from
+        none if any of them holds fewer. ``clients`` maps each dimension to
+        the caller's key. Returns None when the route has no limits,
+        otherwise ``(allowed, limit, remaining, wait)`` for the tightest
+        bucket (the one to wait longest for if the request is rejected).
+        ``wait`` is None when ``cost`` exceeds a bucket's capacity: the
+        request can never be allowed.
+        """
+        limits = self.limits.get(route)
+        if not limits:
+            return None
+        allowed, results = self.store.take(
+            [(f'{route}:{dimension}:{clients[dimension]}', rate, capacity) for dimension, rate, capacity in limits],
+            cost,
+        )
+        if allowed:
+            (_, _, capacity), (remaining, _) = min(zip(limits, results), key=lambda limit: limit[1][0])
+            return True, capacity, remaining, 0.0
+
+        (dimension, _, capacity), (remaining, wait) = max(zip(limits, results), key=lambda limit: limit[1][1])
+        with self._lock:
+            self._rejected[route, dimension] += 1
+        if any(cost > capacity for _, _, capacity in limits):
+            wait = None
+        return False, capacity, remaining, wait
+
+    def rejections(self):
+        """Rejected requests as ``{(route, dimension): count}``."""
+        with self._lock:
+            return dict(self._rejected)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide RateLimiter configured by settings.THROTTLING."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = dict(getattr(settings, 'THROTTLING', {}))
+                enabled = config.pop('ENABLED', True)
+                rates = config.pop('RATES', {})
+                backend_class = import_string(config.pop('BACKEND', 'socialnetworkapi.throttling.LocalBucketStore'))
+                store = backend_class(**{name.lower(): value for name, value in config.items()})
+                _limiter = RateLimiter(store, rates, enabled)
+    return _limiter
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle applying settings.THROTTLING to every API view; installed
+    through REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'].
+    """
+
+    def allow_request(self, request, view):
+        self._wait = None
+        if request.method not in LIMITED_METHODS:
+            return True
+        limiter = get_limiter()
+        match = request.resolver_match
+        if not limiter.enabled or match is None or match.url_name not in limiter.limits:
+            return True
+
+        ip = self.get_ident(request)
+        user = request.user
+        user_key = f'user:{user.pk}' if user is not None and user.is_authenticated else f'ip:{ip}'
+        allowed, limit, remaining, wait = limiter.check(
+            match.url_name, {'user': user_key, 'ip': ip, 'route': '*'}, self.cost(request),
+        )
+        # APIView.finalize_response copies view.headers onto the response, 429s included.
+        view.headers['X-RateLimit-Limit'] = str(limit)
+        view.headers['X-RateLimit-Remaining'] = str(math.floor(remaining))
+        if not allowed:
+            self._wait = wait
+        return allowed
+
+    def cost(self, request):
+        """Tokens the request takes from each bucket."""
+        return 1
+
+    def wait(self):
+        return self._wait
+
+
+class BatchTokenBucketThrottle(TokenBucketThrottle):
+    """
+    TokenBucketThrottle for the batch endpoints (posts.batch): a request
+    costs one token per create, update and delete item, so a batch of N
+    items is limited like N single requests. Malformed bodies cost one
+    token and are rejected by the view.
+    """
+
+    def cost(self, request):
+        data = request.data
+        if not isinstance(data, dict):
+            return 1
+        return max(1, sum(len(items) for items in data.values() if isinstance(items, list)))
@@ -1,30 +1,26 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from django.urls import path, include
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Social Network API",
-        default_version='v1',
-        description="API documentation for Social Network application",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@socialnetwork.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .metrics import metrics_view
+from .schema import docs_ui_view, schema_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),  # Include user routes
     path('api/', include('posts.urls')),  # Include post routes
     path('api/', include('main.urls')), 
+    path('api/', include('feed.urls')),  # Include feed routes
+    path('metrics', metrics_view, name='metrics'),
 
-    # Swagger documentation URLs
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Swagger documentation URLs (see socialnetworkapi.schema)
+    path('swagger.json', schema_view, {'format': 'json'}, name='schema-json'),
+    path('swagger.yaml', schema_view, {'format': 'yaml'}, name='schema-yaml'),
+    path('swagger/', docs_ui_view, {'renderer': 'swagger'}, name='schema-swagger-ui'),
+    path('redoc/', docs_ui_view, {'renderer': 'redoc'}, name='schema-redoc'),
 ]
+
+# Uploaded post images; static() only serves them with DEBUG on, in
+# production MEDIA_ROOT belongs behind the web server.
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
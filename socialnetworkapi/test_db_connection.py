@@ -39,7 +39,51 @@ def test_connection():
         print("4. PostgreSQL is not installed or not in PATH")
         return False
 
+def test_pool(cycles=5):
+    """Check that connections are reused across requests as DATABASE_POOL says."""
+    from django.core import signals
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from socialnetworkapi.dbpool import pool_stats
+
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False)
+    mode = pool_stats()['mode']
+    print(f"Connection mode: {mode}")
+
+    try:
+        for _ in range(cycles):
+            # What Django does around every request.
+            signals.request_started.send(sender=None)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            signals.request_finished.send(sender=None)
+    except OperationalError as e:
+        print(f"❌ Query failed while cycling requests: {e}")
+        return False
+
+    stats = pool_stats()
+    if mode == 'psycopg':
+        print(f"Pool: size {stats['pool_size']}/{stats['pool_max']}, available {stats['pool_available']}, "
+              f"connections opened {stats.get('connections_num', 0)}")
+        if stats.get('connections_num', 0) > stats['pool_max']:
+            print("❌ The pool opened more connections than max_size")
+            return False
+        print(f"✅ {cycles} requests were served from the pool")
+    elif mode == 'none':
+        print(f"⚠️ Connections are not reused: {len(opened)} connections for {cycles} requests "
+              "(set DATABASE_CONN_MAX_AGE or DATABASE_POOL)")
+    elif len(opened) > 1:
+        print(f"❌ Expected one persistent connection, {len(opened)} were opened for {cycles} requests")
+        return False
+    else:
+        print(f"✅ {cycles} requests reused one persistent connection")
+    return True
+
 if __name__ == "__main__":
     print("Testing database connection...")
     success = test_connection()
+    if success:
+        print("\nTesting connection reuse...")
+        success = test_pool()
     sys.exit(0 if success else 1)
\ No newline at end of file
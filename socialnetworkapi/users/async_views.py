@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from socialnetworkapi.async_views import fallback_to, json_response
+from socialnetworkapi.conditional import check_not_modified, make_etag, with_validators
+from . import views
+from .fast_serializers import user_representation, user_values
+from .models import User
+from .serializers import UserSerializer
+
+
+@fallback_to(views.users)
+async def users(request):
+    """
+    Async GET for /api/users/; same validators as views.users, which still
+    handles POST.
+    """
+    if 'stream' in request.GET:
+        # Exports stream from a sync iterator; keep them on the DRF view.
+        return await sync_to_async(views.users)(request)
+
+    summary = await User.objects.aaggregate(total=Count('id'), last_updated=Max('updated_at'))
+    etag = make_etag('users', summary['total'], summary['last_updated'])
+    not_modified = check_not_modified(request, etag, summary['last_updated'])
+    if not_modified:
+        return not_modified
+
+    users = [user_representation(row) async for row in user_values(User.objects.all())]
+    return with_validators(json_response(users), etag, summary['last_updated'])
+
+
+@fallback_to(views.user_detail)
+async def user_detail(request, id=None):
+    """Async GET for /api/users/<id>/."""
+    try:
+        user = await User.objects.aget(id=id)
+    except User.DoesNotExist:
+        return json_response(status=404)
+
+    etag = make_etag('user', user.pk, user.updated_at)
+    not_modified = check_not_modified(request, etag, user.updated_at)
+    if not_modified:
+        return not_modified
+    serializer = UserSerializer(user)
+    return with_validators(json_response(serializer.data), etag, user.updated_at)
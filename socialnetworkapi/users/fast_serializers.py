@@ -0,0 +1,29 @@
+"""Read-only fast path for the user list; see posts/fast_serializers.py."""
+from rest_framework.fields import DateTimeField
+
+USER_VALUES = ('id', 'name', 'age', 'created_at', 'updated_at')
+
+# UserSerializer renders its timestamps through DateTimeField; reuse one
+# unbound instance so the strings come out identical.
+_datetime = DateTimeField()
+
+
+def user_values(queryset):
+    """``.values()`` rows with everything user_representation() reads."""
+    return queryset.values(*USER_VALUES)
+
+
+def user_representation(row):
+    """UserSerializer(user).data for a user_values() row."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'age': row['age'],
+        'created_at': _datetime.to_representation(row['created_at']),
+        'updated_at': _datetime.to_representation(row['updated_at']),
+    }
+
+
+def user_rows(queryset):
+    """UserSerializer(queryset, many=True).data."""
+    return [user_representation(row) for row in user_values(queryset)]
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX, UNUSABLE_PASSWORD_SUFFIX_LENGTH, identify_hasher, make_password,
+)
+from django.core.management.base import BaseCommand
+
+from users.models import User
+
+
+def is_unusable_marker(value):
+    """Exactly what make_password(None) stores: '!' and 40 random letters and digits."""
+    suffix = value[len(UNUSABLE_PASSWORD_PREFIX):]
+    return (
+        value.startswith(UNUSABLE_PASSWORD_PREFIX)
+        and len(suffix) == UNUSABLE_PASSWORD_SUFFIX_LENGTH
+        and suffix.isascii() and suffix.isalnum()
+    )
+
+
+def needs_hashing(value):
+    """
+    True for a password_hash that is not make_password() output (a raw
+    client value). A value counts as a hash only if one of the configured
+    hashers decodes it, not merely because it starts with ``algorithm$``.
+    """
+    if is_unusable_marker(value):
+        return False
+    try:
+        hasher = identify_hasher(value)
+        return hasher.decode(value)['algorithm'] != hasher.algorithm
+    except Exception:
+        # identify_hasher raises ValueError; decode() whatever the malformed
+        # value trips over (ValueError, TypeError, binascii.Error, ...).
+        return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Hash users.User.password_hash values stored as sent by the client, "
+        "before passwords were hashed. Rows that already hold a hash are "
+        "skipped, so the command can be interrupted, re-run, and run against "
+        "a live database. Users are processed in primary-key batches and "
+        "each batch is hashed in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Number of users read per batch (default: 200).')
+        parser.add_argument('--workers', type=int, default=settings.PASSWORD_HASHING['WORKERS'],
+                            help='Hashing threads (default: PASSWORD_HASHING WORKERS).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count the users that need hashing without changing them.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        checked = hashed = 0
+        last_pk = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(
+                    User.objects.filter(pk__gt=last_pk).order_by('pk')
+                    .values_list('pk', 'password_hash')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                checked += len(batch)
+
+                pending = [(pk, value) for pk, value in batch if needs_hashing(value)]
+                if not dry_run:
+                    encoded = executor.map(make_password, [value for _, value in pending])
+                    for (pk, value), password_hash in zip(pending, encoded):
+                        # Skip users whose password changed while we hashed.
+                        User.objects.filter(pk=pk, password_hash=value).update(password_hash=password_hash)
+                hashed += len(pending)
+
+        verb = 'need hashing' if dry_run else 'hashed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, {hashed} {verb}."))
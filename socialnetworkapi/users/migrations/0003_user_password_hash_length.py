@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_following'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='password_hash',
+            field=models.CharField(max_length=128),
+        ),
+    ]
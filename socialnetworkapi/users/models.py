@@ -4,9 +4,14 @@ from django.db import models
 class User(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
-    password_hash = models.CharField(max_length=100)
+    # make_password() output. Rows written before passwords were hashed are
+    # converted by `manage.py hash_user_passwords`.
+    password_hash = models.CharField(max_length=128)
     age = models.IntegerField()
     posts = models.ManyToManyField('posts.Post', related_name='users', blank=True)
+    following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
+    # Denormalized size of ``followers``; decides fan-out-on-write vs on-read in the feed.
+    follower_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
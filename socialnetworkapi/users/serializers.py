@@ -1,19 +1,32 @@
 from rest_framework import serializers
+from socialnetworkapi.metrics import TimedListSerializer, TimedSerializerMixin
+from socialnetworkapi.passwords import hash_password
 from .models import User
 
 
-class UserSerializer(serializers.Serializer):
+class UserSerializer(TimedSerializerMixin, serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     name = serializers.CharField(max_length=100, required=True)
-    password_hash = serializers.CharField(max_length=100, required=True, write_only=True)
+    password = serializers.CharField(max_length=128, required=False, write_only=True)
+    # Deprecated spelling of ``password``; the value is hashed all the same.
+    password_hash = serializers.CharField(max_length=128, required=False, write_only=True)
     age = serializers.IntegerField(required=True)
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
 
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    def validate(self, attrs):
+        if 'password' not in attrs and 'password_hash' not in attrs:
+            raise serializers.ValidationError({'password': ['This field is required.']})
+        return attrs
+
     def create(self, validated_data):
+        password = validated_data.get('password', validated_data.get('password_hash'))
         user = User.objects.create(
             name=validated_data['name'],
-            password_hash=validated_data['password_hash'],
+            password_hash=hash_password(password),
             age=validated_data['age']
         )
         return user
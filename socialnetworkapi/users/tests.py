@@ -1,3 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .management.commands.hash_user_passwords import needs_hashing
+from .models import User
+
+
+class SerializerContractTests(TestCase):
+    """The users fast path renders the same bytes as UserSerializer."""
+
+    def test_edge_case_users(self):
+        followed = User.objects.create(name='Zoë Ωmega 😀', age=30)
+        User.objects.create(name='', age=0)
+        follower = User.objects.create(name='日本語 "quoted" \\ name', age=-1, follower_count=0)
+        follower.following.add(followed)
+
+        out = StringIO()
+        call_command('check_serializer_contract', stdout=out)
+
+        self.assertIn('users: compared 3 rows', out.getvalue())
+
+
+class HashUserPasswordsTests(TestCase):
+    def test_needs_hashing(self):
+        self.assertFalse(needs_hashing(make_password('secret')))
+        self.assertFalse(needs_hashing(make_password(None)))
+        for raw in ('hunter2', '!hunter2', '!' * 41, 'md5$not-a-hash', 'pbkdf2_sha256$abc', ''):
+            with self.subTest(raw=raw):
+                self.assertTrue(needs_hashing(raw))
+
+    def test_command_hashes_raw_values_only(self):
+        hashed = make_password('kept')
+        unusable = make_password(None)
+        raw = User.objects.create(name='raw', age=30, password_hash='!hunter2')
+        User.objects.create(name='hashed', age=30, password_hash=hashed)
+        User.objects.create(name='unusable', age=30, password_hash=unusable)
+
+        call_command('hash_user_passwords', stdout=StringIO())
+
+        raw.refresh_from_db()
+        self.assertTrue(check_password('!hunter2', raw.password_hash))
+        self.assertEqual(
+            set(User.objects.exclude(pk=raw.pk).values_list('password_hash', flat=True)), {hashed, unusable},
+        )
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(name='user', age=30)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_user_detail(self):
+        status = self.revalidate(f'/api/users/{self.user.pk}/')
+        self.assertEqual(status(), 304)
+
+        self.user.age = 31
+        self.user.save()
+
+        self.assertEqual(status(), 200)
+
+    def test_user_list(self):
+        status = self.revalidate('/api/users/')
+        self.assertEqual(status(), 304)
+
+        User.objects.create(name='another', age=30)
 
-# Create your tests here.
+        self.assertEqual(status(), 200)
@@ -1,7 +1,9 @@
 from django.urls import path
-from . import views
+from socialnetworkapi.async_views import select_view
+from . import async_views, views
 
 urlpatterns = [
-    path('users/', views.users, name='user-list'),
-    path('users/<int:id>/', views.user_detail, name='user-detail'),
+    path('users/', select_view('user-list', views.users, async_views.users), name='user-list'),
+    path('users/<int:id>/', select_view('user-detail', views.user_detail, async_views.user_detail), name='user-detail'),
+    path('users/<int:id>/follow/', views.user_follow, name='user-follow'),
 ]
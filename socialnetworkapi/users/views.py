@@ -1,6 +1,12 @@
+from django.db import transaction
+from django.db.models import Count, F, Max
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from feed.fanout import backfill_timeline, unfollow_timeline
+from socialnetworkapi.conditional import check_not_modified, make_etag, with_validators
+from socialnetworkapi.streaming import requested_stream_format, streaming_response
+from .fast_serializers import user_rows
 from .models import User
 from .serializers import UserSerializer
 
@@ -12,15 +18,26 @@ def users(request):
     List all users in the system or create a new user.
 
     GET: Returns a list of all users with their details.
+         Sends ETag and Last-Modified and answers 304 when no user changed.
+         With ?stream=json or ?stream=ndjson the users are streamed row by
+         row instead (no validators).
     POST: Creates a new user with the provided data.
 
     * Requires no authentication
     * Available to all users
     """
     if request.method == 'GET':
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        stream_format = requested_stream_format(request)
+        if stream_format:
+            return streaming_response(User.objects.order_by('pk'), UserSerializer, stream_format)
+
+        summary = User.objects.aggregate(total=Count('id'), last_updated=Max('updated_at'))
+        etag = make_etag('users', summary['total'], summary['last_updated'])
+        not_modified = check_not_modified(request, etag, summary['last_updated'])
+        if not_modified:
+            return not_modified
+
+        return with_validators(Response(user_rows(User.objects.all())), etag, summary['last_updated'])
 
     elif request.method == 'POST':
         serializer = UserSerializer(data=request.data)
@@ -44,6 +61,7 @@ def user_detail(request, id=None):
 
     Responses:
     - 200: Successful retrieval of user details
+    - 304: User not modified since the client's copy
     - 404: User not found
     """
     try:
@@ -52,5 +70,63 @@ def user_detail(request, id=None):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
+        etag = make_etag('user', user.pk, user.updated_at)
+        not_modified = check_not_modified(request, etag, user.updated_at)
+        if not_modified:
+            return not_modified
         serializer = UserSerializer(user)
-        return Response(serializer.data)
+        return with_validators(Response(serializer.data), etag, user.updated_at)
+
+@api_view(['POST', 'DELETE'])
+def user_follow(request, id=None):
+    """
+    Follow or unfollow a user.
+
+    Following is idempotent: repeating a follow or unfollow is a no-op.
+    Posts of followed users appear in the follower's feed (/api/feed/):
+    following adds the user's recent posts (FEED['BACKFILL']) to it,
+    unfollowing removes all of them.
+
+    * Requires no authentication
+    * Available to all users
+
+    POST: Follows the user
+    DELETE: Unfollows the user
+
+    Parameters:
+    - id: The unique identifier of the user to follow
+
+    Request Body:
+    - followerId: integer (optional) - The following user; defaults to the first user
+
+    Responses:
+    - 200: Follow state after the request, e.g. {"following": true, "follower_count": 12}
+    - 400: A user cannot follow themselves
+    - 404: User or follower not found
+    """
+    try:
+        user = User.objects.get(id=id)
+        follower_id = request.data.get('followerId')
+        follower = User.objects.get(id=follower_id) if follower_id is not None else User.objects.first()
+    except (User.DoesNotExist, ValueError, TypeError):
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if follower is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if follower.pk == user.pk:
+        return Response({'detail': 'A user cannot follow themselves.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    through = User.following.through
+    with transaction.atomic():
+        if request.method == 'POST':
+            _, changed = through.objects.get_or_create(from_user=follower, to_user=user)
+            delta = 1
+        else:
+            changed, _ = through.objects.filter(from_user=follower, to_user=user).delete()
+            delta = -1
+        if changed:
+            User.objects.filter(pk=user.pk).update(follower_count=F('follower_count') + delta)
+            update_timeline = backfill_timeline if request.method == 'POST' else unfollow_timeline
+            transaction.on_commit(lambda: update_timeline(follower.pk, user.pk))
+
+    follower_count = User.objects.values_list('follower_count', flat=True).get(pk=user.pk)
+    return Response({'following': request.method == 'POST', 'follower_count': follower_count})